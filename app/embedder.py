@@ -3,31 +3,192 @@ app/embedder.py
 ---------------
 Singleton wrapper around an offline SentenceTransformer model (all-MiniLM-L6-v2 ~80 MB).
 Loads lazily on first call to avoid start-up penalty.
+
+Two backends share one ``encode`` interface:
+- ``onnx``  -- the int8-quantised ONNX export run by ONNX Runtime
+  (see `app/onnx_backend.py`); used when onnxruntime is installed and an
+  export has passed its parity check against torch
+- ``torch`` -- the SentenceTransformer itself, and the fallback whenever the
+  ONNX backend is unavailable or fails to load
+
+Embeddings go through a persistent cache (see `app/embedding_cache.py`):
+repeated headings, sentences and persona/task strings are encoded once and
+then read back from disk, so only cache misses reach the model.
+
+Misses are sorted by character length (a cheap stand-in for token length)
+and encoded in batches of `BATCH_SIZE` neighbours, so a batch is padded to
+the longest of similar-length texts
+rather than to the longest text of the call; results come back in input
+order. ``max_seq_length`` truncates per call: headings and sentences need far
+fewer tokens than the model's 256 (`SHORT_SEQ_LENGTH`).
+
+When a local embedding service is running (see `app/embedding_service.py`),
+`embed_texts` sends its texts there instead, so many worker processes share
+one model; if the service cannot be reached it encodes in-process.
+
+Configuration (environment):
+    EMBEDDER_BACKEND=auto    auto | onnx (skip the parity requirement) | torch
 """
 
+import logging
+import os
+import threading
 from pathlib import Path
 from functools import lru_cache
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional
 import numpy as np
 
+from app import embedding_service, onnx_backend
+from app.embedding_cache import EmbeddingCache, embed_with_cache
+from resources import intra_op_threads
+
 
 MODEL_NAME = "models/all-MiniLM-L6-v2"
+# Embedding width of MODEL_NAME (shape of empty results, without loading the model)
+EMBEDDING_DIM = 384
+EMBEDDER_BACKEND = os.environ.get('EMBEDDER_BACKEND', 'auto')
+
+# Texts per model call; neighbours in length share a batch
+BATCH_SIZE = 32
+# Token limit for headings, sentences and persona/task strings
+SHORT_SEQ_LENGTH = 128
+
+# The model's truncation length is switched per call
+_encode_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def backend() -> str:
+    """Backend `_get_model` loads: ``onnx`` or ``torch``."""
+    if EMBEDDER_BACKEND == 'torch':
+        return 'torch'
+    if onnx_backend.runtime_available() and onnx_backend.export_ready(
+            Path(MODEL_NAME), require_parity=EMBEDDER_BACKEND != 'onnx'):
+        return 'onnx'
+    if EMBEDDER_BACKEND == 'onnx':
+        logger.warning("ONNX embedder backend unavailable (no onnxruntime or no export) - using torch")
+    return 'torch'
 
 
 @lru_cache(maxsize=1)
 def _get_model():
     """Lazy-load the transformer model once."""
+    if backend() == 'onnx':
+        try:
+            return onnx_backend.OnnxEncoder(Path(MODEL_NAME), threads=intra_op_threads())
+        except Exception as e:
+            logger.warning(f"Could not load the ONNX embedder ({e}) - falling back to torch")
+            _fall_back_to_torch()
+
     from sentence_transformers import SentenceTransformer  # local import to keep import time low
 
     return SentenceTransformer(MODEL_NAME)
 
 
-def embed_texts(texts: List[str]) -> np.ndarray:
-    """Embed a list of texts → ndarray shape (n, dim)."""
+def _fall_back_to_torch() -> None:
+    """Make `backend` report torch (and key the cache accordingly) from now on."""
+    global EMBEDDER_BACKEND
+    EMBEDDER_BACKEND = 'torch'
+    backend.cache_clear()
+    _get_cache.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _get_cache(max_seq_length: Optional[int] = None) -> EmbeddingCache:
+    # int8 and float vectors differ slightly, and truncation changes long
+    # texts, so each backend and sequence length has its own cache
+    return EmbeddingCache(f"{MODEL_NAME}:{backend()}:{max_seq_length or 'default'}")
+
+
+def _encode(texts: List[str], max_seq_length: Optional[int] = None) -> np.ndarray:
+    """Encode ``texts`` in length-sorted batches, returning rows in input order."""
     model = _get_model()
-    return model.encode(texts, convert_to_numpy=True)
+    # Character length orders texts closely enough without a tokenizer pass
+    order = np.argsort([len(text) for text in texts], kind='stable')
+    with _encode_lock:
+        default_length = model.max_seq_length
+        if max_seq_length:
+            model.max_seq_length = min(max_seq_length, default_length)
+        try:
+            batches = [model.encode([texts[i] for i in order[start:start + BATCH_SIZE]],
+                                    batch_size=BATCH_SIZE, convert_to_numpy=True)
+                       for start in range(0, len(texts), BATCH_SIZE)]
+        finally:
+            model.max_seq_length = default_length
+    if not batches:
+        return model.encode([], convert_to_numpy=True)
+    vectors = np.empty((len(texts), batches[0].shape[1]), dtype=batches[0].dtype)
+    vectors[order] = np.concatenate(batches)
+    return vectors
+
+
+def embed_texts(texts: List[str], max_seq_length: Optional[int] = None) -> np.ndarray:
+    """
+    Embed a list of texts → ndarray shape (n, dim).
+
+    ``max_seq_length`` truncates to fewer tokens than the model's limit
+    (`SHORT_SEQ_LENGTH` suits headings and sentences).
+    """
+    client = embedding_service.client()
+    if client is not None:
+        try:
+            return client.embed(texts, max_seq_length)
+        except (OSError, embedding_service.ServiceError) as e:
+            embedding_service.mark_unavailable(e)
+    return embed_local(texts, max_seq_length)
 
 
-def embed(text: str) -> np.ndarray:
+def embed_local(texts: List[str], max_seq_length: Optional[int] = None) -> np.ndarray:
+    """`embed_texts` with this process's own model (the embedding service encodes through this)."""
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    return embed_with_cache(texts, lambda misses: _encode(misses, max_seq_length), _get_cache(max_seq_length))
+
+
+def embed(text: str, max_seq_length: Optional[int] = None) -> np.ndarray:
     """Embed a single string → 1-D vector."""
-    return embed_texts([text])[0] 
\ No newline at end of file
+    return embed_texts([text], max_seq_length)[0]
+
+
+class EmbeddingPlan:
+    """
+    Collects the texts a job will need, deduplicated, and embeds them in bulk.
+
+    Callers `add` every text up front, call `encode` once per phase (only
+    texts added since the previous call are encoded, in a single
+    `embed_texts` call) and then look vectors up with `vector` / `matrix`.
+    One large call lets `embed_texts` batch by length instead of paying the
+    per-call overhead for every heading list or paragraph.
+    """
+
+    def __init__(self, max_seq_length: Optional[int] = None):
+        self.max_seq_length = max_seq_length
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+
+    def add(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            self._rows.setdefault(text, len(self._rows))
+
+    def encode(self) -> None:
+        """Embed the texts added since the last call."""
+        done = 0 if self._vectors is None else len(self._vectors)
+        pending = list(self._rows)[done:]
+        if not pending:
+            return
+        vectors = embed_texts(pending, self.max_seq_length)
+        self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+
+    def vector(self, text: str) -> np.ndarray:
+        return self._vectors[self._rows[text]]
+
+    def matrix(self, texts: List[str]) -> np.ndarray:
+        """Vectors of ``texts`` (each added and encoded) → ndarray shape (n, dim)."""
+        return self._vectors[[self._rows[text] for text in texts]]
+
+
+def cache_stats(max_seq_length: Optional[int] = None) -> Dict[str, Any]:
+    """Hit/miss counters and size of the embedding cache for one sequence length."""
+    return _get_cache(max_seq_length).stats().to_dict()
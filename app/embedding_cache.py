@@ -0,0 +1,346 @@
+"""
+app/embedding_cache.py
+----------------------
+Persistent cache of sentence embeddings, shared by every process on the host.
+
+Vectors are keyed by a 128-bit BLAKE2b hash of the normalised text (Unicode
+NFC, whitespace collapsed) and stored per model id in one directory:
+
+    keys.bin     digests, 16 bytes per row, in row order
+    vectors.f32  float32 matrix (rows × dim), read through a memory map
+    meta.json    model id, dimension and a generation token
+
+Both files are append-only: a writer takes an exclusive lock, appends the
+vectors and then their digests, so a digest on disk always has its vector.
+Readers index the digests appended since their last look and map the vector
+file read-only, so a lookup is a dict probe plus a row copy and concurrent
+`Pool` workers or web workers share one page-cache copy of the matrix. Once
+the size budget is reached new vectors are simply not stored. Every cache
+started after a clear gets a new generation token, so a process holding an
+index of the old rows drops it even if the new cache has grown as large.
+
+Configuration (environment):
+    EMBEDDING_CACHE=0              disable the cache
+    EMBEDDING_CACHE_DIR=...        cache directory (default: .cache/embeddings in the project)
+    EMBEDDING_CACHE_MAX_MB=512     size budget; no new entries beyond it
+
+Usage (every model, backend and sequence length cached under the directory):
+    python -m app.embedding_cache stats
+    python -m app.embedding_cache clear
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, single writer assumed
+    fcntl = None
+
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('EMBEDDING_CACHE_DIR',
+                                        Path(__file__).resolve().parent.parent / '.cache' / 'embeddings'))
+DEFAULT_MAX_BYTES = int(float(os.environ.get('EMBEDDING_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+DIGEST_SIZE = 16
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Text as it is embedded and hashed: NFC, whitespace runs collapsed, stripped."""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def text_digest(normalized: str) -> bytes:
+    """Cache key of already normalised text."""
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Counters for this process plus the current on-disk footprint."""
+    enabled: bool
+    directory: str
+    model_id: str
+    hits: int
+    misses: int
+    writes: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats['hit_rate'] = round(self.hit_rate, 4)
+        return stats
+
+
+class EmbeddingCache:
+    """Append-only, memory-mapped store of one model's embeddings."""
+
+    def __init__(self, model_id: str, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.logger = logging.getLogger(__name__)
+        self.model_id = model_id
+        root = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.directory = root / hashlib.sha256(model_id.encode('utf-8')).hexdigest()[:16]
+        self.max_bytes = max_bytes if max_bytes is not None else DEFAULT_MAX_BYTES
+        if enabled is None:
+            enabled = os.environ.get('EMBEDDING_CACHE', '1') != '0'
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._index: Dict[bytes, int] = {}
+        self._rows = 0
+        self._dim: Optional[int] = None
+        self._generation: Optional[str] = None
+        self._meta_identity: Optional[Tuple[int, int]] = None
+        self._matrix: Optional[np.memmap] = None
+        self._full_warned = False
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.directory / 'keys.bin'
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / 'vectors.f32'
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / 'meta.json'
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+    def get_many(self, digests: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Stored vectors for the ``digests`` that are cached (empty when disabled)."""
+        if not self.enabled or not digests:
+            return {}
+        self._refresh()
+        rows = {digest: self._index[digest] for digest in digests if digest in self._index}
+        self.hits += len(rows)
+        self.misses += len(digests) - len(rows)
+        if not rows:
+            return {}
+        # Fancy indexing copies the rows out of the map
+        block = self._vectors()[list(rows.values())]
+        return dict(zip(rows, block))
+
+    def put_many(self, digests: Sequence[bytes], vectors: np.ndarray) -> None:
+        """Append the vectors of ``digests`` not stored yet, within the size budget."""
+        if not self.enabled or not len(digests):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self._locked():
+                self._append(digests, vectors)
+        except OSError as e:
+            self.logger.warning(f"Could not write embedding cache {self.directory}: {e}")
+
+    def _append(self, digests: Sequence[bytes], vectors: np.ndarray) -> None:
+        self._refresh()
+        dim = vectors.shape[1]
+        if self._dim is None:
+            self._write_meta(dim)
+        elif dim != self._dim:
+            self.logger.warning(f"Embedding dimension {dim} does not match the cache ({self._dim}); not storing")
+            return
+
+        new = list({digest: i for i, digest in enumerate(digests) if digest not in self._index}.values())
+        row_bytes = dim * 4 + DIGEST_SIZE
+        room = max(0, (self.max_bytes - self._rows * row_bytes) // row_bytes)
+        if len(new) > room:
+            if not self._full_warned:
+                self.logger.warning(f"Embedding cache {self.directory} is full ({self.max_bytes} bytes)")
+                self._full_warned = True
+            new = new[:room]
+        if not new:
+            return
+
+        # Vectors of a writer that died before appending its digests are dropped
+        vector_bytes = self._rows * dim * 4
+        if self._vectors_path.exists() and self._vectors_path.stat().st_size > vector_bytes:
+            os.truncate(self._vectors_path, vector_bytes)
+        with open(self._vectors_path, 'ab') as f:
+            f.write(vectors[new].tobytes())
+        with open(self._keys_path, 'ab') as f:
+            f.write(b''.join(digests[i] for i in new))
+        self.writes += len(new)
+        self._refresh()
+
+    def clear(self) -> int:
+        """Remove every entry; returns the number removed."""
+        if not self.directory.is_dir():
+            return 0
+        with self._locked():
+            self._refresh()
+            removed = self._rows
+            for path in (self._keys_path, self._vectors_path, self._meta_path):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            self._reset()
+        return removed
+
+    # ------------------------------------------------------------------
+    # Index / storage
+    # ------------------------------------------------------------------
+    def _reset(self) -> None:
+        self._index.clear()
+        self._rows = 0
+        self._dim = None
+        self._generation = None
+        self._meta_identity = None
+        self._matrix = None
+
+    def _write_meta(self, dim: int) -> None:
+        """Start a new generation of the cache (called under the lock, with no rows stored)."""
+        generation = os.urandom(8).hex()
+        temp = self._meta_path.with_suffix('.tmp')
+        temp.write_text(json.dumps({'model_id': self.model_id, 'dim': dim, 'generation': generation}))
+        os.replace(temp, self._meta_path)
+        self._dim = dim
+        self._generation = generation
+        self._meta_identity = self._identity(self._meta_path.stat())
+
+    def _read_meta(self) -> Dict[str, Any]:
+        stat = self._meta_path.stat()
+        meta = json.loads(self._meta_path.read_text())
+        self._meta_identity = self._identity(stat)
+        return meta
+
+    @staticmethod
+    def _identity(stat: os.stat_result) -> Tuple[int, int]:
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _generation_changed(self) -> bool:
+        """True if the cache was cleared and restarted since this process indexed it."""
+        try:
+            if self._identity(self._meta_path.stat()) == self._meta_identity:
+                return False
+            return self._read_meta().get('generation') != self._generation
+        except (OSError, ValueError):
+            return True
+
+    def _refresh(self) -> None:
+        """Index the rows appended (by any process) since the last look."""
+        try:
+            rows = self._keys_path.stat().st_size // DIGEST_SIZE
+        except FileNotFoundError:
+            rows = 0
+        if rows < self._rows or (self._rows and self._generation_changed()):
+            # Cleared (and possibly refilled) by another process
+            self._reset()
+        if rows == self._rows:
+            return
+        if self._dim is None:
+            meta = self._read_meta()
+            self._dim = int(meta['dim'])
+            self._generation = meta.get('generation')
+        with open(self._keys_path, 'rb') as f:
+            f.seek(self._rows * DIGEST_SIZE)
+            data = f.read((rows - self._rows) * DIGEST_SIZE)
+        for i in range(len(data) // DIGEST_SIZE):
+            self._index[data[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]] = self._rows + i
+        self._rows += len(data) // DIGEST_SIZE
+        self._matrix = None  # remapped with the new length on the next read
+
+    def _vectors(self) -> np.memmap:
+        if self._matrix is None:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode='r',
+                                     shape=(self._rows, self._dim))
+        return self._matrix
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive lock against writers in other processes."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.directory / '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def stats(self) -> EmbeddingCacheStats:
+        if self.enabled:
+            self._refresh()
+        size = sum(path.stat().st_size for path in (self._keys_path, self._vectors_path) if path.exists())
+        return EmbeddingCacheStats(
+            enabled=self.enabled,
+            directory=str(self.directory),
+            model_id=self.model_id,
+            hits=self.hits,
+            misses=self.misses,
+            writes=self.writes,
+            entries=self._rows,
+            size_bytes=size,
+            max_bytes=self.max_bytes,
+        )
+
+
+def existing_caches(cache_dir: Optional[Path] = None) -> List[EmbeddingCache]:
+    """Every cache stored under ``cache_dir``, identified by the model id in its meta.json."""
+    root = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+    caches = []
+    for meta_path in sorted(root.glob('*/meta.json')):
+        try:
+            model_id = json.loads(meta_path.read_text())['model_id']
+        except (OSError, ValueError, KeyError):
+            continue
+        caches.append(EmbeddingCache(model_id, cache_dir=root, enabled=True))
+    return caches
+
+
+def embed_with_cache(texts: List[str], encode, cache: EmbeddingCache) -> np.ndarray:
+    """
+    Embeddings of ``texts`` (n × dim), encoding only what ``cache`` lacks.
+
+    Texts are normalised first; equal texts are encoded once per call, and
+    ``encode`` receives only the distinct texts that missed the cache.
+    """
+    normalized = [normalize_text(text) for text in texts]
+    digests = [text_digest(text) for text in normalized]
+    distinct = dict(zip(digests, normalized))
+    vectors = cache.get_many(list(distinct))
+    missing = [digest for digest in distinct if digest not in vectors]
+    if missing:
+        encoded = np.asarray(encode([distinct[digest] for digest in missing]), dtype=np.float32)
+        cache.put_many(missing, encoded)
+        vectors.update(zip(missing, encoded))
+    return np.stack([vectors[digest] for digest in digests])
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    if command == 'clear':
+        for cache in existing_caches():
+            print(f"Removed {cache.clear()} embeddings of {cache.model_id} from {cache.directory}")
+    elif command == 'stats':
+        print(json.dumps([cache.stats().to_dict() for cache in existing_caches()], indent=2))
+    else:
+        print("Usage: python -m app.embedding_cache [stats|clear]")
+        sys.exit(1)
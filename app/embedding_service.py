@@ -0,0 +1,429 @@
+"""
+app/embedding_service.py
+------------------------
+Optional local embedding server: one process owns the model and every other
+process (Flask workers, `main.py` / `main2.py` pool workers, the refine
+processor) sends it texts instead of loading its own copy.
+
+The server listens on a Unix socket (or a localhost TCP port). Each
+connection is handled by its own thread, which queues the request for a
+single batching thread. That thread waits up to `BATCH_WAIT_MS` for
+requests from other clients, concatenates everything that arrived (up to
+`MAX_BATCH_TEXTS` texts per sequence length) and encodes it with one
+in-process `app.embedder` call, so the embedding cache, length bucketing and
+truncation all apply to the combined batch. Vectors are then split back
+per request.
+
+`app.embedder.embed_texts` uses the service transparently: when the socket
+exists (or EMBEDDING_SERVICE names an address) it sends its texts there, and
+on any connection or server error it encodes in-process and leaves the
+service alone for `RETRY_SECONDS`.
+
+Wire format, both directions: two big-endian uint32 lengths (JSON header,
+binary payload), the UTF-8 JSON header, then the payload. Requests carry
+their texts in the header. Responses carry ``shape`` in the header and the
+float32 rows as the payload, or an ``error`` message.
+
+Configuration (environment):
+    EMBEDDING_SERVICE=               empty = use the default socket if a server is running,
+                                     0 = never, or a socket path / host:port
+    EMBEDDING_SERVICE_SOCKET=...     default socket path (.cache/embedding.sock in the project)
+    EMBEDDING_SERVICE_BATCH_MS=2     how long the server waits to batch concurrent requests
+    EMBEDDING_SERVICE_MAX_BATCH=256  texts per model call
+    EMBEDDING_SERVICE_TIMEOUT=60     client timeout in seconds before encoding in-process
+    EMBEDDING_SERVICE_ALLOW_REMOTE=0 1 = let the server listen on a non-loopback TCP host
+
+Usage:
+    python -m app.embedding_service serve [address]
+    python -m app.embedding_service stats [address]
+"""
+
+import ipaddress
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = Path(os.environ.get('EMBEDDING_SERVICE_SOCKET',
+                                     Path(__file__).resolve().parent.parent / '.cache' / 'embedding.sock'))
+BATCH_WAIT_MS = float(os.environ.get('EMBEDDING_SERVICE_BATCH_MS', '2'))
+MAX_BATCH_TEXTS = int(os.environ.get('EMBEDDING_SERVICE_MAX_BATCH', '256'))
+CLIENT_TIMEOUT = float(os.environ.get('EMBEDDING_SERVICE_TIMEOUT', '60'))
+ALLOW_REMOTE = os.environ.get('EMBEDDING_SERVICE_ALLOW_REMOTE', '0') == '1'
+
+# After a failed request, clients encode in-process this long before retrying
+RETRY_SECONDS = 30.0
+# Upper bound on either part of a message; a larger length means a corrupt stream
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+_LENGTHS = struct.Struct('!II')
+
+Address = Union[str, Tuple[str, int]]
+
+# Set in the server process, whose own embed calls must stay in-process
+_serving = False
+_unavailable_until = 0.0
+
+
+class ServiceError(RuntimeError):
+    """The embedding service failed a request or sent a malformed reply."""
+
+
+def parse_address(address: str) -> Address:
+    """``host:port`` → (host, port) for TCP; anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+def is_loopback(host: str) -> bool:
+    """True if every address ``host`` resolves to is a loopback address."""
+    try:
+        infos = socket.getaddrinfo(host or None, None, proto=socket.IPPROTO_TCP, flags=socket.AI_PASSIVE)
+    except OSError:
+        return False
+    return all(ipaddress.ip_address(info[4][0].split('%')[0]).is_loopback for info in infos)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise EOFError("connection closed")
+        received += n
+    return buffer
+
+
+def send_message(sock: socket.socket, header: Dict[str, Any], payload: bytes = b'') -> None:
+    encoded = json.dumps(header).encode('utf-8')
+    sock.sendall(_LENGTHS.pack(len(encoded), len(payload)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], bytearray]:
+    """One (header, payload) message; EOFError if the peer closed between messages."""
+    header_size, payload_size = _LENGTHS.unpack(_recv_exact(sock, _LENGTHS.size))
+    if header_size > MAX_MESSAGE_BYTES or payload_size > MAX_MESSAGE_BYTES:
+        raise ServiceError(f"message too large ({header_size} + {payload_size} bytes)")
+    header = json.loads(_recv_exact(sock, header_size).decode('utf-8'))
+    return header, _recv_exact(sock, payload_size)
+
+
+# --------------------------------------------------------------------- server
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    max_seq_length: Optional[int]
+    done: threading.Event = field(default_factory=threading.Event)
+    vectors: Optional[np.ndarray] = None
+    error: Optional[str] = None
+
+
+def _local_encode(texts: List[str], max_seq_length: Optional[int]) -> np.ndarray:
+    from app.embedder import embed_local
+    return embed_local(texts, max_seq_length)
+
+
+class EmbeddingService:
+    """
+    Micro-batching front of one in-process encoder.
+
+    `submit` is called from any number of connection threads and blocks until
+    its vectors are ready; a single batching thread owns the encoder.
+    """
+
+    def __init__(self, encode: Optional[Callable[[List[str], Optional[int]], np.ndarray]] = None,
+                 max_batch_texts: int = MAX_BATCH_TEXTS, batch_wait_ms: float = BATCH_WAIT_MS):
+        self.encode = encode or _local_encode
+        self.max_batch_texts = max(1, max_batch_texts)
+        self.batch_wait = max(0.0, batch_wait_ms) / 1000
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self._queue: 'queue.Queue[Optional[_Request]]' = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str], max_seq_length: Optional[int] = None) -> np.ndarray:
+        request = _Request(list(texts), max_seq_length)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise ServiceError(request.error)
+        return request.vectors
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'requests': self.requests, 'texts': self.texts, 'batches': self.batches,
+                'queued': self._queue.qsize()}
+
+    def _collect(self) -> Tuple[List[_Request], bool]:
+        """Block for one request, then gather others arriving within the batching window."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch, size = [first], len(first.texts)
+        deadline = time.monotonic() + self.batch_wait
+        while size < self.max_batch_texts:
+            try:
+                request = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            size += len(request.texts)
+        return batch, False
+
+    def _run(self) -> None:
+        closed = False
+        while not closed:
+            batch, closed = self._collect()
+            groups: Dict[Optional[int], List[_Request]] = {}
+            for request in batch:
+                groups.setdefault(request.max_seq_length, []).append(request)
+            for max_seq_length, requests in groups.items():
+                self._encode_group(requests, max_seq_length)
+
+    def _encode_group(self, requests: List[_Request], max_seq_length: Optional[int]) -> None:
+        texts = [text for request in requests for text in request.texts]
+        try:
+            vectors = np.asarray(self.encode(texts, max_seq_length), dtype=np.float32)
+        except Exception as e:
+            logger.exception(f"Embedding {len(texts)} texts failed")
+            for request in requests:
+                request.error = f"{type(e).__name__}: {e}"
+                request.done.set()
+            return
+        self.requests += len(requests)
+        self.texts += len(texts)
+        self.batches += 1
+        start = 0
+        for request in requests:
+            request.vectors = vectors[start:start + len(request.texts)]
+            start += len(request.texts)
+            request.done.set()
+
+
+def _embed_args(header: Dict[str, Any]) -> Tuple[List[str], Optional[int]]:
+    """Validated ``texts`` and ``max_seq_length`` of an embed request (ValueError if malformed)."""
+    texts = header.get('texts')
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        raise ValueError("'texts' must be a list of strings")
+    max_seq_length = header.get('max_seq_length')
+    if max_seq_length is not None and (not isinstance(max_seq_length, int) or max_seq_length < 1):
+        raise ValueError("'max_seq_length' must be a positive integer")
+    return texts, max_seq_length
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Serves requests on one client connection until the client closes it."""
+
+    def handle(self) -> None:
+        service: EmbeddingService = self.server.service
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except EOFError:
+                return
+            except (OSError, ValueError, ServiceError) as e:
+                logger.warning(f"Dropping embedding client: {e}")
+                return
+            try:
+                op = header['op']
+                if op == 'embed':
+                    # Checked here: a malformed request must not fail the batch it joins
+                    vectors = np.ascontiguousarray(service.submit(*_embed_args(header)), dtype=np.float32)
+                    send_message(self.request, {'shape': list(vectors.shape)}, vectors.tobytes())
+                elif op == 'stats':
+                    send_message(self.request, service.stats())
+                else:
+                    send_message(self.request, {'error': f"unknown op {op!r}"})
+            except (KeyError, TypeError, ValueError, ServiceError) as e:
+                send_message(self.request, {'error': f"{type(e).__name__}: {e}"})
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _claim_socket_path(path: Path) -> None:
+    """Remove a socket left behind by a dead server; refuse if one is still listening."""
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        path.unlink()
+    else:
+        raise RuntimeError(f"An embedding service is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def make_server(address: Address, service: EmbeddingService,
+                allow_remote: bool = ALLOW_REMOTE) -> socketserver.BaseServer:
+    """
+    Bound (not yet serving) server for ``address`` backed by ``service``.
+
+    TCP hosts other than loopback are refused unless ``allow_remote``:
+    requests carry document text in the clear.
+    """
+    if isinstance(address, tuple):
+        if not allow_remote and not is_loopback(address[0]):
+            raise ValueError(f"Refusing to serve embeddings on non-loopback host {address[0]!r} "
+                             f"(set EMBEDDING_SERVICE_ALLOW_REMOTE=1 to allow)")
+        server = _TCPServer(address, _Handler)
+    else:
+        path = Path(address)
+        _claim_socket_path(path)
+        server = _UnixServer(str(path), _Handler)
+        # Texts are document content: only this user may connect
+        os.chmod(path, 0o600)
+    server.service = service
+    return server
+
+
+def serve(address: Optional[str] = None) -> None:
+    """Load the model and serve embedding requests until interrupted."""
+    global _serving
+    _serving = True
+    if address is None:
+        setting = os.environ.get('EMBEDDING_SERVICE', '')
+        address = setting if setting not in ('', '0') else str(DEFAULT_SOCKET)
+    address = parse_address(address)
+    from app.embedder import _get_model, backend
+    _get_model()
+
+    service = EmbeddingService()
+    server = make_server(address, service)
+    logger.info(f"Embedding service ({backend()} backend) listening on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if not isinstance(address, tuple):
+            Path(address).unlink(missing_ok=True)
+
+
+# --------------------------------------------------------------------- client
+
+
+class EmbeddingClient:
+    """Sends embedding requests to a running service; one connection per call."""
+
+    def __init__(self, address: Union[str, Address], timeout: float = CLIENT_TIMEOUT):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.timeout = timeout
+
+    def _connect(self) -> socket.socket:
+        if isinstance(self.address, tuple):
+            return socket.create_connection(self.address, timeout=self.timeout)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.address))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def request(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytearray]:
+        """Send one request; any failure to decode the reply raises `ServiceError`."""
+        with self._connect() as sock:
+            send_message(sock, header)
+            try:
+                response, payload = recv_message(sock)
+            except (EOFError, ValueError) as e:
+                raise ServiceError(f"malformed reply: {e}") from e
+        if not isinstance(response, dict):
+            raise ServiceError(f"malformed reply: expected an object, got {type(response).__name__}")
+        if 'error' in response:
+            raise ServiceError(str(response['error']))
+        return response, payload
+
+    def embed(self, texts: List[str], max_seq_length: Optional[int] = None) -> np.ndarray:
+        """Embed ``texts`` on the server → float32 ndarray shape (n, dim)."""
+        response, payload = self.request({'op': 'embed', 'texts': list(texts), 'max_seq_length': max_seq_length})
+        try:
+            vectors = np.frombuffer(payload, dtype=np.float32).reshape(response['shape'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ServiceError(f"malformed reply: {e!r}") from e
+        if vectors.shape[:1] != (len(texts),):
+            raise ServiceError(f"malformed reply: shape {vectors.shape} for {len(texts)} texts")
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request({'op': 'stats'})[0]
+
+
+def configured_address() -> Optional[str]:
+    """Address clients should use, or None when no service is configured or running."""
+    setting = os.environ.get('EMBEDDING_SERVICE', '')
+    if setting == '0':
+        return None
+    if setting:
+        return setting
+    return str(DEFAULT_SOCKET) if DEFAULT_SOCKET.exists() else None
+
+
+def client() -> Optional[EmbeddingClient]:
+    """Client for the configured service, or None to encode in-process."""
+    if _serving or time.monotonic() < _unavailable_until:
+        return None
+    address = configured_address()
+    return EmbeddingClient(address) if address else None
+
+
+def mark_unavailable(error: Exception) -> None:
+    """Encode in-process for `RETRY_SECONDS` after a failed request."""
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + RETRY_SECONDS
+    logger.warning(f"Embedding service unavailable ({error}) - encoding in-process for {RETRY_SECONDS:.0f}s")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'serve'
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    if command == 'serve':
+        serve(target)
+    elif command == 'stats':
+        target = target or configured_address() or str(DEFAULT_SOCKET)
+        print(json.dumps(EmbeddingClient(target).stats(), indent=2))
+    else:
+        print("Usage: python -m app.embedding_service [serve|stats] [address]")
+        sys.exit(1)
@@ -0,0 +1,231 @@
+"""
+app/onnx_backend.py
+-------------------
+ONNX Runtime backend for the MiniLM sentence embedder.
+
+`export` converts the transformer of models/all-MiniLM-L6-v2 to ONNX (dynamic
+batch and sequence axes) and quantises its weights to int8 with ONNX
+Runtime's dynamic quantisation. It then runs `parity_check`, which compares
+the quantised model with the torch SentenceTransformer on a fixed set of
+headings and sentences. The result is written to ``onnx/parity.json`` next to
+the model, and `app.embedder` only picks an export whose check passed.
+
+`OnnxEncoder` reproduces the SentenceTransformer pipeline without torch:
+the model's own tokenizer.json (truncated to ``max_seq_length``), the ONNX
+transformer, mean pooling over the attention mask and L2 normalisation when
+the model has a Normalize module.
+
+Usage:
+    python -m app.onnx_backend export   # export + quantise + parity check
+    python -m app.onnx_backend check    # re-run the parity check and time both backends
+"""
+
+import json
+import logging
+import sys
+import time
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_SUBDIR = 'onnx'
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model_int8.onnx'
+PARITY_FILE = 'parity.json'
+
+# Lowest cosine similarity to the torch embedding any parity text may have
+PARITY_MIN_COSINE = 0.97
+ONNX_OPSET = 14
+
+PARITY_TEXTS = [
+    "Introduction",
+    "Comprehensive Guide to Major Cities in the South of France",
+    "Travel Planner Plan a trip of 4 days for a group of 10 college friends.",
+    "Coastal Adventures",
+    "Culinary Experiences: cooking classes and wine tours",
+    "The Mediterranean climate brings hot, dry summers and mild winters.",
+    "Change flattened forms to fillable (Acrobat Pro)",
+    "HR professional Create and manage fillable forms for onboarding and compliance.",
+    "Dinner menu: vegetarian lasagne, falafel wrap, ratatouille.",
+    "Table 3. Quarterly revenue by region (in millions of dollars)",
+    "3.2 Results",
+    ("Nice is known for the Promenade des Anglais, a long seafront walkway, and its old town with narrow "
+     "streets, colourful buildings and a lively market selling flowers, fruit and local specialities. "
+     "Visitors can take day trips to Monaco, Antibes and the perched village of Eze."),
+]
+
+
+def onnx_dir(model_dir: Path) -> Path:
+    return Path(model_dir) / ONNX_SUBDIR
+
+
+def runtime_available() -> bool:
+    """True if ONNX Runtime and the tokenizers library can be imported."""
+    return find_spec('onnxruntime') is not None and find_spec('tokenizers') is not None
+
+
+def export_ready(model_dir: Path, require_parity: bool = True) -> bool:
+    """True if a quantised export exists (and, with ``require_parity``, passed its parity check)."""
+    directory = onnx_dir(model_dir)
+    if not (directory / INT8_FILE).is_file():
+        return False
+    if not require_parity:
+        return True
+    try:
+        return bool(json.loads((directory / PARITY_FILE).read_text()).get('passed'))
+    except (OSError, ValueError):
+        return False
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Mean of the token vectors over the attention mask → (batch, dim)."""
+    mask = attention_mask[..., None].astype(hidden.dtype)
+    return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+class OnnxEncoder:
+    """SentenceTransformer-compatible ``encode`` on ONNX Runtime."""
+
+    def __init__(self, model_dir: Path, onnx_path: Optional[Path] = None, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        self.onnx_path = Path(onnx_path) if onnx_path is not None else onnx_dir(model_dir) / INT8_FILE
+        config = json.loads((model_dir / 'sentence_bert_config.json').read_text())
+        modules = json.loads((model_dir / 'modules.json').read_text())
+        self.normalize = any(module['type'].endswith('Normalize') for module in modules)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / 'tokenizer.json'))
+        pad_token = '[PAD]'
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+        self.max_seq_length = config.get('max_seq_length', 256)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(self.onnx_path), options, providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    @property
+    def max_seq_length(self) -> int:
+        return self._max_seq_length
+
+    @max_seq_length.setter
+    def max_seq_length(self, length: int) -> None:
+        self._max_seq_length = length
+        self.tokenizer.enable_truncation(max_length=length)
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32, convert_to_numpy: bool = True,
+               **kwargs: Any) -> np.ndarray:
+        """Embed ``texts`` → float32 ndarray shape (n, dim)."""
+        texts = list(texts)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feed = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self.input_names:
+                feed['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+            hidden = self.session.run(None, feed)[0]
+            batches.append(mean_pool(hidden, attention_mask))
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        vectors = np.concatenate(batches)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+
+def export(model_dir: Path, opset: int = ONNX_OPSET) -> Dict[str, Any]:
+    """Export, quantise and parity-check the model; returns the parity report."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = Path(model_dir)
+    directory = onnx_dir(model_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    st_model = SentenceTransformer(str(model_dir), device='cpu')
+    transformer = st_model[0].auto_model.eval()
+
+    class HiddenStates(torch.nn.Module):
+        """Transformer with its token vectors as the only output."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(*inputs)[0]
+
+    sample = st_model.tokenizer(["Export sample sentence"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+    fp32_path = directory / FP32_FILE
+    with torch.no_grad():
+        torch.onnx.export(HiddenStates(transformer), tuple(sample[name] for name in input_names), str(fp32_path),
+                          input_names=input_names, output_names=['last_hidden_state'],
+                          dynamic_axes=dynamic_axes, opset_version=opset, do_constant_folding=True)
+    quantize_dynamic(str(fp32_path), str(directory / INT8_FILE), weight_type=QuantType.QInt8)
+    logger.info(f"Exported {fp32_path} and its int8 quantisation")
+
+    report = parity_check(model_dir, torch_model=st_model)
+    (directory / PARITY_FILE).write_text(json.dumps(report, indent=2))
+    return report
+
+
+def parity_check(model_dir: Path, onnx_path: Optional[Path] = None, torch_model: Any = None,
+                 texts: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Cosine similarity of ONNX and torch embeddings of ``texts`` (plus encode timings)."""
+    if torch_model is None:
+        from sentence_transformers import SentenceTransformer
+        torch_model = SentenceTransformer(str(model_dir), device='cpu')
+    encoder = OnnxEncoder(model_dir, onnx_path)
+    texts = texts or PARITY_TEXTS
+    # Warm both up so the timings compare steady-state encoding
+    torch_model.encode(texts[:1])
+    encoder.encode(texts[:1])
+
+    start = time.perf_counter()
+    expected = torch_model.encode(texts, convert_to_numpy=True)
+    torch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = encoder.encode(texts)
+    onnx_seconds = time.perf_counter() - start
+
+    cosines = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1))
+    return {
+        'onnx_model': encoder.onnx_path.name,
+        'texts': len(texts),
+        'min_cosine': round(float(cosines.min()), 5),
+        'mean_cosine': round(float(cosines.mean()), 5),
+        'threshold': PARITY_MIN_COSINE,
+        'passed': bool(cosines.min() >= PARITY_MIN_COSINE),
+        'torch_seconds': round(torch_seconds, 4),
+        'onnx_seconds': round(onnx_seconds, 4),
+    }
+
+
+if __name__ == "__main__":
+    from app.embedder import MODEL_NAME
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    if command == 'export':
+        result = export(Path(MODEL_NAME))
+    elif command == 'check':
+        result = parity_check(Path(MODEL_NAME))
+    else:
+        print("Usage: python -m app.onnx_backend [export|check]")
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['passed'] else 1)
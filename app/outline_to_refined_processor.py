@@ -5,13 +5,16 @@ Generates ranked sections and refined paragraph snippets (subsection_analysis)
 from the outline-only JSON produced in Challenge-1B.
 
 Algorithm:
-1. Embed persona+task once (MiniLM).
+1. Embed persona+task and every heading of the collection in one batch (MiniLM).
 2. For each document outline entry:
    – Rank headings by cosine similarity text→task.
    – Take top-K.
-3. For each top heading: take its page’s raw_text and select the most
-   relevant N sentences using sentence similarity.
+3. Embed the sentences of every top heading's page in a second batch, then
+   select the most relevant N sentences of each page by sentence similarity.
 Output matches Adobe sample schema.
+
+Texts are collected and deduplicated collection-wide (`EmbeddingPlan`), so
+a collection costs two model calls instead of a few per document and heading.
 """
 
 from __future__ import annotations
@@ -25,8 +28,8 @@ from typing import Dict, Any, List
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
-from app.embedder import embed, embed_texts
-from app.subsection_selector import select_subsections
+from app.embedder import SHORT_SEQ_LENGTH, EmbeddingPlan
+from app.subsection_selector import select_subsections, split_into_sentences
 
 logger = logging.getLogger(__name__)
 
@@ -41,21 +44,28 @@ class OutlineToRefinedProcessor:
 
         persona = data.get("persona", "")
         task    = data.get("job_to_be_done", "")
-        task_vec = embed(f"{persona} {task}")
-
-        extracted_sections: List[Dict[str, Any]] = []
-        subsection_analysis: List[Dict[str, Any]] = []
+        task_text = f"{persona} {task}"
 
+        documents = []
         for doc_entry in data.get("outlines", []):
-            docname = doc_entry.get("document")
             outline = doc_entry.get("outline", [])
-            raw_pages = {p["page"]: p["text"] for p in doc_entry.get("raw_text", [])}
-            if not outline:
-                continue
+            if outline:
+                raw_pages = {p["page"]: p["text"] for p in doc_entry.get("raw_text", [])}
+                documents.append((doc_entry.get("document"), outline, raw_pages))
+
+        # 1. Task and all headings of the collection in one batch
+        plan = EmbeddingPlan(max_seq_length=SHORT_SEQ_LENGTH)
+        plan.add([task_text])
+        for _, outline, _ in documents:
+            plan.add(h["text"] for h in outline)
+        plan.encode()
+        task_vec = plan.vector(task_text)
 
+        extracted_sections: List[Dict[str, Any]] = []
+        top_headings = []
+        for docname, outline, raw_pages in documents:
             # Rank headings
-            headings_text = [h["text"] for h in outline]
-            vecs = embed_texts(headings_text)
+            vecs = plan.matrix([h["text"] for h in outline])
             scores = cosine_similarity(vecs, task_vec.reshape(1, -1)).flatten()
             top_idx = scores.argsort()[-self.TOP_SECTIONS:][::-1]
 
@@ -67,14 +77,25 @@ class OutlineToRefinedProcessor:
                     "importance_rank": rank,
                     "page_number": h["page"]
                 })
+                top_headings.append((docname, h["page"], raw_pages.get(h["page"], "")))
 
-                page_text = raw_pages.get(h["page"], "")
-                refined = select_subsections(page_text, task_vec, self.TOP_SENTENCES) if page_text else ""
-                subsection_analysis.append({
-                    "document": docname,
-                    "refined_text": refined if refined else page_text[:400],
-                    "page_number": h["page"]
-                })
+        # 2. Sentences of every top heading's page in a second batch
+        for _, _, page_text in top_headings:
+            plan.add(split_into_sentences(page_text))
+        plan.encode()
+
+        subsection_analysis: List[Dict[str, Any]] = []
+        for docname, page_number, page_text in top_headings:
+            refined = ""
+            if page_text:
+                sentences = split_into_sentences(page_text)
+                refined = select_subsections(page_text, task_vec, self.TOP_SENTENCES,
+                                             sentence_vectors=plan.matrix(sentences) if sentences else None)
+            subsection_analysis.append({
+                "document": docname,
+                "refined_text": refined if refined else page_text[:400],
+                "page_number": page_number
+            })
 
         final = {
             "metadata": {
@@ -5,25 +5,32 @@ Selects the most relevant sentences/paragraphs inside a larger section text.
 """
 
 import re
-from typing import List
+from typing import List, Optional
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
-from app.embedder import embed_texts
+from app.embedder import SHORT_SEQ_LENGTH, embed_texts
 
 
-def _split_into_sentences(text: str) -> List[str]:
+def split_into_sentences(text: str) -> List[str]:
     # naive sentence splitter
     sentences = re.split(r'(?<=[.!?])\s+', text.strip())
     return [s for s in sentences if s]
 
 
-def select_subsections(section_text: str, task_vector: np.ndarray, top_k: int = 3) -> str:
-    sentences = _split_into_sentences(section_text)
+def select_subsections(section_text: str, task_vector: np.ndarray, top_k: int = 3,
+                       sentence_vectors: Optional[np.ndarray] = None) -> str:
+    """
+    The ``top_k`` sentences of ``section_text`` closest to ``task_vector``.
+
+    ``sentence_vectors`` are the precomputed embeddings of
+    `split_into_sentences(section_text)` when the caller batched them.
+    """
+    sentences = split_into_sentences(section_text)
     if not sentences:
         return section_text
 
-    vecs = embed_texts(sentences)
+    vecs = sentence_vectors if sentence_vectors is not None else embed_texts(sentences, SHORT_SEQ_LENGTH)
     scores = cosine_similarity(vecs, task_vector.reshape(1, -1)).flatten()
     top_idx = scores.argsort()[-top_k:][::-1]
     top_sentences = [sentences[i] for i in top_idx]
@@ -0,0 +1,213 @@
+"""
+document_context.py
+-------------------
+Shared per-document state for the extraction stack.
+
+A `DocumentContext` reads the PDF bytes once, keeps a single PyMuPDF (fitz)
+handle and a single pdfplumber handle open for the lifetime of the document,
+and caches per-page derived data (`get_text()`, `get_text("dict")`, word
+lists) so that every extractor working on the same file reuses them instead of
+re-opening and re-parsing the PDF.
+
+A context can be restricted to a subset of pages (``pages=``); extractors
+then only visit those pages. This is how large documents are sharded across
+worker processes. `subset()` returns such a restricted view that shares the
+parent's handles and caches (used to escalate only some pages to the slower
+parsers).
+
+Usage:
+    with DocumentContext(pdf_path) as document:
+        outline = PDFOutlineParser().extract_outline(pdf_path, document=document)
+        pages = RawTextExtractor().extract(pdf_path, document=document)
+"""
+
+import hashlib
+import io
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import fitz  # PyMuPDF
+import pdfplumber
+
+
+# Settings used for pdfplumber word extraction; shared so the cached word
+# lists are valid for every consumer.
+WORD_SETTINGS: Dict[str, Any] = {
+    'use_text_flow': True,
+    'keep_blank_chars': True,
+    'extra_attrs': ['fontname', 'size'],
+}
+
+
+class DocumentContext:
+    """Open-once handle bundle and page cache for a single PDF."""
+
+    def __init__(self, pdf_path: Path, data: Optional[bytes] = None, pages: Optional[Sequence[int]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(pdf_path)
+        self.data = data if data is not None else self.path.read_bytes()
+        self._pages = sorted(pages) if pages is not None else None
+        self._sha256: Optional[str] = None
+        self._page_count: Optional[int] = None
+
+        # Open handles ('fitz', 'plumber'); shared with subset() views
+        self._handles: Dict[str, Any] = {}
+        self._owns_handles = True
+
+        # Per-page caches keyed by 1-indexed page number
+        self._page_texts: Dict[int, str] = {}
+        self._page_dicts: Dict[int, Dict[str, Any]] = {}
+        self._page_words: Dict[int, List[Dict[str, Any]]] = {}
+        self._page_areas: Dict[int, float] = {}
+        # Document-wide derived data (bookmarks); shared with subset() views
+        self._document_data: Dict[str, Any] = {}
+
+    def __enter__(self) -> 'DocumentContext':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Handles
+    # ------------------------------------------------------------------
+    @property
+    def fitz_doc(self) -> fitz.Document:
+        """Shared PyMuPDF document opened from the in-memory bytes."""
+        if 'fitz' not in self._handles:
+            self._handles['fitz'] = fitz.open(stream=self.data, filetype="pdf")
+        return self._handles['fitz']
+
+    @property
+    def plumber_doc(self) -> pdfplumber.PDF:
+        """Shared pdfplumber document opened from the in-memory bytes."""
+        if 'plumber' not in self._handles:
+            self._handles['plumber'] = pdfplumber.open(io.BytesIO(self.data))
+        return self._handles['plumber']
+
+    def stream(self) -> io.BytesIO:
+        """Fresh binary stream over the PDF bytes (for pdfminer and friends)."""
+        return io.BytesIO(self.data)
+
+    @property
+    def page_count(self) -> int:
+        """Pages in the document (read once, so later calls never touch the fitz handle)."""
+        if self._page_count is None:
+            self._page_count = len(self.fitz_doc)
+        return self._page_count
+
+    @property
+    def page_numbers(self) -> List[int]:
+        """1-indexed page numbers in scope (all pages unless restricted)."""
+        if self._pages is not None:
+            return list(self._pages)
+        return list(range(1, self.page_count + 1))
+
+    @property
+    def is_partial(self) -> bool:
+        """True when the context only covers some of the document's pages."""
+        return self._pages is not None and len(self._pages) < self.page_count
+
+    @property
+    def pages(self) -> Optional[List[int]]:
+        """Explicit page scope, or None when the whole document is in scope."""
+        return list(self._pages) if self._pages is not None else None
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 hex digest of the PDF bytes (computed once)."""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+    def clone(self) -> 'DocumentContext':
+        """New context over the same bytes and page scope with its own handles."""
+        return DocumentContext(self.path, data=self.data, pages=self._pages)
+
+    def subset(self, pages: Sequence[int]) -> 'DocumentContext':
+        """View restricted to ``pages`` that shares this context's handles and caches."""
+        view = DocumentContext(self.path, data=self.data, pages=pages)
+        view._handles = self._handles
+        view._owns_handles = False
+        view._page_count = self._page_count
+        view._page_texts = self._page_texts
+        view._page_dicts = self._page_dicts
+        view._page_words = self._page_words
+        view._page_areas = self._page_areas
+        view._document_data = self._document_data
+        return view
+
+    def toc(self) -> List[List[Any]]:
+        """PyMuPDF `get_toc(simple=True)` bookmark list (read once per document, views included)."""
+        if 'toc' not in self._document_data:
+            self._document_data['toc'] = self.fitz_doc.get_toc(simple=True)
+        return self._document_data['toc']
+
+    def fitz_page(self, page_num: int) -> fitz.Page:
+        return self.fitz_doc[page_num - 1]
+
+    def plumber_page(self, page_num: int) -> pdfplumber.page.Page:
+        return self.plumber_doc.pages[page_num - 1]
+
+    # ------------------------------------------------------------------
+    # Cached per-page data
+    # ------------------------------------------------------------------
+    def page_text(self, page_num: int) -> str:
+        """PyMuPDF plain text for a page."""
+        if page_num not in self._page_texts:
+            self._page_texts[page_num] = self.fitz_page(page_num).get_text()
+        return self._page_texts[page_num]
+
+    def page_dict(self, page_num: int) -> Dict[str, Any]:
+        """PyMuPDF `get_text("dict")` output for a page."""
+        if page_num not in self._page_dicts:
+            self._page_dicts[page_num] = self.fitz_page(page_num).get_text("dict")
+        return self._page_dicts[page_num]
+
+    def page_area(self, page_num: int) -> float:
+        """Page area in pt²."""
+        if page_num not in self._page_areas:
+            rect = self.fitz_page(page_num).rect
+            self._page_areas[page_num] = rect.width * rect.height
+        return self._page_areas[page_num]
+
+    def page_words(self, page_num: int) -> List[Dict[str, Any]]:
+        """pdfplumber word list for a page (see `WORD_SETTINGS`)."""
+        if page_num not in self._page_words:
+            self._page_words[page_num] = self.plumber_page(page_num).extract_words(**WORD_SETTINGS)
+        return self._page_words[page_num]
+
+    def release_pages(self, pages: Sequence[int]) -> None:
+        """Drop cached data for ``pages`` (used when streaming through a document)."""
+        for page_num in pages:
+            self._page_texts.pop(page_num, None)
+            self._page_dicts.pop(page_num, None)
+            self._page_words.pop(page_num, None)
+        plumber_doc = self._handles.get('plumber')
+        if plumber_doc is not None:
+            for page_num in pages:
+                page = plumber_doc.pages[page_num - 1]
+                page.flush_cache()
+                # pdfplumber also memoises each page's text map (with its chars)
+                textmap_cache = getattr(page, 'get_textmap', None)
+                if hasattr(textmap_cache, 'cache_clear'):
+                    textmap_cache.cache_clear()
+
+    def close(self) -> None:
+        """Release parser handles and cached page data (views leave them to their parent)."""
+        if not self._owns_handles:
+            return
+        fitz_doc = self._handles.pop('fitz', None)
+        if fitz_doc is not None:
+            fitz_doc.close()
+        plumber_doc = self._handles.pop('plumber', None)
+        if plumber_doc is not None:
+            try:
+                plumber_doc.close()
+            except Exception as e:
+                self.logger.debug(f"pdfplumber close failed: {e}")
+        self._page_texts.clear()
+        self._page_dicts.clear()
+        self._page_words.clear()
+        self._page_areas.clear()
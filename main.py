@@ -13,8 +13,7 @@ import time
 import logging
 import re
 from pathlib import Path
-from multiprocessing import Pool, cpu_count
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import json
 import io
 from datetime import datetime
@@ -24,7 +23,14 @@ from app.subsection_selector import select_subsections
 
 from parser import PDFOutlineParser
 from output_writer import OutputWriter
-from pipeline import DocumentPipeline
+from pipeline import DocumentPipeline, ShardingDeferred
+from resources import apply_thread_limits, plan_workers
+from worker_pool import make_pool
+
+
+# Write per-page NDJSON records incrementally instead of building the whole
+# result in memory
+STREAM_OUTPUT = os.environ.get('STREAM_OUTPUT', '0') == '1'
 
 
 def setup_logging() -> logging.Logger:
@@ -40,13 +46,15 @@ def setup_logging() -> logging.Logger:
     return logging.getLogger(__name__)
 
 
-def process_single_pdf(pdf_path: Path, output_dir: Path) -> Tuple[str, bool, float]:
+def process_single_pdf(pdf_path: Path, output_dir: Path, defer_sharding: bool = False) -> Tuple[str, bool, float]:
     """
     Process a single PDF file and generate its outline JSON.
     
     Args:
         pdf_path: Path to the PDF file
         output_dir: Directory to save the output JSON
+        defer_sharding: Raise `ShardingDeferred` instead of processing a
+            document too large for a pool worker
         
     Returns:
         Tuple of (filename, success, processing_time)
@@ -57,8 +65,16 @@ def process_single_pdf(pdf_path: Path, output_dir: Path) -> Tuple[str, bool, flo
     
     try:
         # Parse PDF via pipeline
-        pipeline = DocumentPipeline()
-        outline_data = pipeline.process(pdf_path)
+        pipeline = DocumentPipeline(defer_sharding=defer_sharding)
+        if STREAM_OUTPUT:
+            # Page records go to disk as they complete; memory stays bounded
+            # by a window of pages
+            outline_data = OutputWriter().write_page_stream(
+                pipeline.iter_process(pdf_path), output_dir / f"{pdf_path.stem}.pages.ndjson")
+            if outline_data is None:
+                raise RuntimeError("page stream ended before the outline was finalised")
+        else:
+            outline_data = pipeline.process(pdf_path)
         
         # Ensure output2 directory exists
         output2_dir = Path("output2")
@@ -81,6 +97,8 @@ def process_single_pdf(pdf_path: Path, output_dir: Path) -> Tuple[str, bool, flo
         logger.info(f"Successfully processed {filename} in {processing_time:.2f}s")
         return filename, True, processing_time
         
+    except ShardingDeferred:
+        raise
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"Failed to process {filename}: {str(e)}")
@@ -111,19 +129,34 @@ def process_pdf_batch(pdf_paths: List[Path], output_dir: Path) -> List[Tuple[str
     Returns:
         List of processing results
     """
-    # Determine optimal number of processes (max 8 for performance)
-    num_processes = min(cpu_count(), 8, len(pdf_paths))
+    # Split the CPU budget between worker processes and their library threads
+    plan = plan_workers(len(pdf_paths))
+    num_processes = plan.processes
+    logging.info(f"Worker plan: {plan.processes} processes x {plan.threads} threads on {plan.cpus} CPUs")
     
     if num_processes == 1:
-        # Single process for small batches
+        # Single process for small batches (large documents shard themselves)
         return [process_single_pdf(pdf_path, output_dir) for pdf_path in pdf_paths]
     
-    # Multiprocessing for larger batches
-    with Pool(processes=num_processes) as pool:
+    # Multiprocessing for larger batches; workers start with the parser
+    # modules already imported (see worker_pool.py)
+    with make_pool(num_processes, initializer=apply_thread_limits, initargs=(plan.threads,)) as pool:
         args = [(pdf_path, output_dir) for pdf_path in pdf_paths]
-        results = pool.starmap(process_single_pdf, args)
+        results = pool.starmap(_process_or_defer, args)
     
-    return results
+    # Very large documents are sharded across all cores by DocumentPipeline,
+    # which needs to run outside the (daemonic) pool workers; they keep
+    # their place in the results
+    return [result if result is not None else process_single_pdf(pdf_path, output_dir)
+            for pdf_path, result in zip(pdf_paths, results)]
+
+
+def _process_or_defer(pdf_path: Path, output_dir: Path) -> Optional[Tuple[str, bool, float]]:
+    """Pool task: `process_single_pdf`, or None for a document the parent must shard."""
+    try:
+        return process_single_pdf(pdf_path, output_dir, defer_sharding=True)
+    except ShardingDeferred:
+        return None
 
 
 def validate_directories(input_dir: Path, output_dir: Path) -> bool:
@@ -14,11 +14,12 @@ import sys
 import time
 import json
 from pathlib import Path
-from multiprocessing import Pool, cpu_count
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from pipeline import DocumentPipeline
+from pipeline import DocumentPipeline, ShardingDeferred
 from output_writer import OutputWriter
+from resources import apply_thread_limits, plan_workers
+from worker_pool import make_pool
 
 ###############################################################################
 # Logging setup
@@ -55,10 +56,10 @@ def _save_output(data: dict, out_path: Path):
         json.dump(data, f, indent=2, ensure_ascii=False)
 
 
-def _process_single(pdf_path: Path, out_dir: Path) -> Tuple[str, bool, float]:
+def _process_single(pdf_path: Path, out_dir: Path, defer_sharding: bool = False) -> Tuple[str, bool, float]:
     start = time.time()
     try:
-        outline_data = DocumentPipeline().process(pdf_path)
+        outline_data = DocumentPipeline(defer_sharding=defer_sharding).process(pdf_path)
         
         # Ensure output2 directory exists
         output2_dir = Path("output")
@@ -77,12 +78,22 @@ def _process_single(pdf_path: Path, out_dir: Path) -> Tuple[str, bool, float]:
         elapsed = time.time() - start
         LOGGER.info(f"✔ Parsed {pdf_path.name} in {elapsed:.2f}s → {out_file} & output2/{pdf_path.stem}.json")
         return pdf_path.name, True, elapsed
+    except ShardingDeferred:
+        raise
     except Exception as exc:
         elapsed = time.time() - start
         LOGGER.error(f"✗ Failed {pdf_path.name}: {exc}")
         return pdf_path.name, False, elapsed
 
 
+def _process_or_defer(pdf_path: Path, out_dir: Path) -> Optional[Tuple[str, bool, float]]:
+    """Pool task: None for a document too large for a worker (the parent shards it)."""
+    try:
+        return _process_single(pdf_path, out_dir, defer_sharding=True)
+    except ShardingDeferred:
+        return None
+
+
 def _find_pdfs(input_dir: Path) -> List[Path]:
     return sorted([p for p in input_dir.iterdir() if p.suffix.lower() == ".pdf"])
 
@@ -106,13 +117,16 @@ def main():
 
     LOGGER.info(f"Found {len(pdfs)} PDF files")
 
-    # Run in parallel (max 8 procs)
-    procs = min(cpu_count(), 8, len(pdfs))
-    if procs == 1:
+    # Run in parallel; processes x library threads stay within the CPU budget
+    plan = plan_workers(len(pdfs))
+    LOGGER.info(f"Worker plan: {plan.processes} processes x {plan.threads} threads on {plan.cpus} CPUs")
+    if plan.processes <= 1:
         results = [_process_single(p, out_dir) for p in pdfs]
     else:
-        with Pool(processes=procs) as pool:
-            results = pool.starmap(_process_single, [(p, out_dir) for p in pdfs])
+        with make_pool(plan.processes, initializer=apply_thread_limits, initargs=(plan.threads,)) as pool:
+            results = pool.starmap(_process_or_defer, [(p, out_dir) for p in pdfs])
+        # Huge documents shard themselves across all cores, outside the pool
+        results = [r if r is not None else _process_single(p, out_dir) for p, r in zip(pdfs, results)]
 
     ok = sum(1 for _, success, _ in results if success)
     fail = len(results) - ok
@@ -1,68 +1,416 @@
 """
 ocr_utils.py
 -----------
-Utility helpers for performing OCR on scanned PDF pages. Uses pdf2image to
-rasterize pages and pytesseract for text recognition.
+Utility helpers for performing OCR on scanned PDF pages. Exactly the
+requested pages are rendered with PyMuPDF and recognised by tesseract
+(pytesseract) in a bounded process pool, with a timeout per page. Results
+stream back keyed by page number as they complete.
+
+Pages are rasterised straight to 8-bit grayscale and the pixmap's sample
+buffer is written for tesseract as an uncompressed binary PGM file, which is
+passed to pytesseract by path (no PNG encode/decode, no PIL image). With
+adaptive DPI each page is rendered at the resolution that brings its glyphs
+to the height tesseract reads best, estimated from the text layer's font
+sizes or, for scans, from the text-line rows of a low-resolution preview.
+
+Recognised text is cached on disk (`result_cache.ResultCache`, namespace
+``ocr``) under a hash of the rendered page's pixels plus the tesseract
+language, config and version, so a page that repeats across documents (cover
+sheets, disclaimers, blank forms) costs a hash and a lookup after the first
+time.
 
 NOTE: OCR is only triggered for pages where no text is detected by the primary
-parsers. This keeps performance high on digital PDFs.
+parsers. This keeps performance high on digital PDFs. Pages that do have a
+text layer next to a scanned figure or stamp get region OCR instead: only the
+image placements no text span overlaps are rendered (`ocr_regions`), and their
+text is spliced into the page text before the first text block below each
+region (`insert_region_text`).
+
+Configuration (environment):
+    OCR_WORKERS=4            tesseract processes (default: CPU count, max 4)
+    OCR_PAGE_TIMEOUT=60      seconds before a page's tesseract run is killed
+    OCR_ADAPTIVE_DPI=1       0 = always render at the processor's fixed dpi
+    OCR_REGIONS=1            0 = OCR mixed pages in full instead of their image regions
+    OCR_CACHE_DIR=...        OCR cache directory (default: .cache/ocr in the project)
+    OCR_CACHE_MAX_MB=256     size budget before LRU eviction
+    RESULT_CACHE=0           also disables the OCR cache
+
+pytesseract is optional: without it the module still imports (the pipeline
+and worker preloading need it) and OCR reports tesseract as unavailable.
 """
 
+import hashlib
 import logging
+import multiprocessing
+import os
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+from document_context import DocumentContext
+from resources import apply_thread_limits, available_cpus
+from result_cache import ResultCache
 
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
-import pdfplumber
-import io
 
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', '0')) or min(available_cpus(), 4)
+OCR_PAGE_TIMEOUT = float(os.environ.get('OCR_PAGE_TIMEOUT', '60'))
+OCR_ADAPTIVE_DPI = os.environ.get('OCR_ADAPTIVE_DPI', '1') != '0'
+OCR_REGIONS = os.environ.get('OCR_REGIONS', '1') != '0'
+OCR_CACHE_DIR = Path(os.environ.get('OCR_CACHE_DIR', Path(__file__).resolve().parent / '.cache' / 'ocr'))
+OCR_CACHE_MAX_BYTES = int(float(os.environ.get('OCR_CACHE_MAX_MB', '256')) * 1024 * 1024)
 
+# Glyph (text line) height in pixels that tesseract recognises best, and the
+# resolution range adaptive DPI may choose from
+TARGET_GLYPH_PX = 32
+MIN_DPI = 150
+MAX_DPI = 400
+# Preview resolution used to measure text lines on pages without a text layer
+PREVIEW_DPI = 96
+# Preview pixels darker than this are ink
+INK_THRESHOLD = 128
+# Rows of ink shorter than this (preview px) are noise or rules, not text lines
+MIN_LINE_PX = 3
+# Image placements smaller than this (pt, either side) are logos or bullets
+MIN_REGION_PT = 36
+# Shortest text-block line (characters) used to locate a region in the page text
+MIN_ANCHOR_CHARS = 4
 
-def _pdfplumber_page_to_image(pdf_path: Path, page_num: int, dpi: int) -> Optional[Image.Image]:
-    """Render a single PDF page to a PIL.Image via pdfplumber's to_image (needs Wand)."""
+# A page (clip None) or an image region of a page to OCR
+OCRTarget = Tuple[int, Optional[fitz.Rect]]
+
+
+@lru_cache(maxsize=1)
+def tesseract_version() -> Optional[str]:
+    """Version of the tesseract binary, or None if it cannot be run."""
+    if pytesseract is None:
+        return None
     try:
-        with pdfplumber.open(str(pdf_path)) as doc:
-            page = doc.pages[page_num - 1]
-            return page.to_image(resolution=dpi).original
+        return str(pytesseract.get_tesseract_version())
     except Exception:
         return None
 
 
+def tesseract_available() -> bool:
+    """True if the tesseract binary can be run."""
+    return tesseract_version() is not None
+
+
+@dataclass
+class PageRaster:
+    """8-bit grayscale rendering of one page."""
+    page: int
+    dpi: int
+    width: int
+    height: int
+    stride: int
+    samples: Any  # pixmap sample buffer (memoryview) or a detached bytes copy
+    pixmap: Optional[fitz.Pixmap] = field(default=None, repr=False)  # keeps `samples` alive
+    clip: Optional[Tuple[float, float, float, float]] = None  # region of the page, None = whole page
+
+    def write_pgm(self, f) -> None:
+        """Write the pixels to binary file ``f`` as a binary (P5) PGM image."""
+        f.write(f"P5\n{self.width} {self.height}\n255\n".encode('ascii'))
+        if self.stride == self.width:
+            f.write(self.samples)
+            return
+        rows = memoryview(self.samples)
+        for y in range(self.height):
+            f.write(rows[y * self.stride:y * self.stride + self.width])
+
+    def detached(self) -> 'PageRaster':
+        """Picklable copy for a worker process (the pixmap stays behind)."""
+        return replace(self, samples=bytes(self.samples), pixmap=None)
+
+    def digest(self) -> str:
+        """SHA-256 of the pixels (and their layout); equal for identical renderings."""
+        digest = hashlib.sha256(f"{self.width}x{self.height}:{self.stride}:".encode('ascii'))
+        digest.update(self.samples)
+        return digest.hexdigest()
+
+
+def render_page_raster(document: DocumentContext, page_num: int, dpi: int,
+                       clip: Optional[fitz.Rect] = None) -> PageRaster:
+    """Grayscale raster of a single page (1-indexed), or of ``clip`` on it, at ``dpi``."""
+    pix = document.fitz_page(page_num).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+    return PageRaster(page=page_num, dpi=dpi, width=pix.width, height=pix.height, stride=pix.stride,
+                      samples=pix.samples_mv, pixmap=pix, clip=tuple(clip) if clip is not None else None)
+
+
+def _text_spans(page_dict: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for block in page_dict.get('blocks', ()):
+        for line in block.get('lines', ()):
+            for span in line['spans']:
+                if span['text'].strip():
+                    yield span
+
+
+def glyph_height(document: DocumentContext, page_num: int, clip: Optional[fitz.Rect] = None) -> Optional[float]:
+    """
+    Typical text height on a page (or in ``clip``) in points, or None if no text was found.
+
+    Uses the median font size of the text layer when there is one; otherwise
+    (and always for a clip, which holds no text spans) the median height of
+    the ink row runs (text lines) of a preview render.
+    """
+    if clip is None:
+        sizes = [span['size'] for span in _text_spans(document.page_dict(page_num))]
+        if sizes:
+            return float(np.median(sizes))
+
+    preview = render_page_raster(document, page_num, PREVIEW_DPI, clip=clip)
+    pixels = np.frombuffer(preview.samples, dtype=np.uint8).reshape(preview.height, preview.stride)
+    ink_rows = (pixels[:, :preview.width] < INK_THRESHOLD).any(axis=1).astype(np.int8)
+    # Start/end of every run of consecutive ink rows
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], ink_rows, [0]))))
+    runs = edges[1::2] - edges[::2]
+    runs = runs[runs >= MIN_LINE_PX]
+    if not len(runs):
+        return None
+    return float(np.median(runs)) * 72.0 / PREVIEW_DPI
+
+
+def adaptive_dpi(glyph_pt: Optional[float], default_dpi: int) -> int:
+    """Resolution that renders ``glyph_pt``-high text at `TARGET_GLYPH_PX` pixels."""
+    if not glyph_pt:
+        return default_dpi
+    return int(min(MAX_DPI, max(MIN_DPI, round(TARGET_GLYPH_PX * 72.0 / glyph_pt))))
+
+
+def ocr_regions(document: DocumentContext, page_num: int) -> List[fitz.Rect]:
+    """
+    Image placements on a page that no text span overlaps, in reading order.
+
+    Overlapping placements (tiled scans) are united into one region; images
+    with text on top (scans with an OCR layer, labelled charts) already have
+    their text and are left out, as are images below `MIN_REGION_PT`.
+    """
+    page_dict = document.page_dict(page_num)
+    page_rect = document.fitz_page(page_num).rect
+    spans = [fitz.Rect(span['bbox']) for span in _text_spans(page_dict)]
+    regions: List[fitz.Rect] = []
+    for block in page_dict.get('blocks', ()):
+        if block.get('type') != 1:
+            continue
+        rect = fitz.Rect(block['bbox']) & page_rect
+        if rect.width < MIN_REGION_PT or rect.height < MIN_REGION_PT:
+            continue
+        if any(rect.intersects(span) for span in spans):
+            continue
+        for other in [r for r in regions if r.intersects(rect)]:
+            regions.remove(other)
+            rect |= other
+        regions.append(rect)
+    return sorted(regions, key=lambda r: (r.y0, r.x0))
+
+
+def insert_region_text(text: str, page_dict: Dict[str, Any],
+                       regions: List[Tuple[fitz.Rect, str]]) -> str:
+    """
+    Splice OCR text of image regions into a page's text at their reading position.
+
+    Each region's text goes before the line holding the first text block
+    that starts below the region's top (nearest first, left to right), or at
+    the end of the page when no such block can be found in ``text``.
+    """
+    lines = text.splitlines()
+    normalised = [' '.join(line.split()) for line in lines]
+    blocks = []
+    for block in page_dict.get('blocks', ()):
+        first_line = next((' '.join(''.join(span['text'] for span in line['spans']).split())
+                           for line in block.get('lines', ())), '')
+        if len(first_line) >= MIN_ANCHOR_CHARS:
+            blocks.append((fitz.Rect(block['bbox']), first_line))
+    blocks.sort(key=lambda b: (b[0].y0, b[0].x0))
+
+    inserts: Dict[int, List[str]] = defaultdict(list)
+    for rect, region_text in regions:
+        region_text = region_text.strip()
+        if not region_text:
+            continue
+        position = len(lines)
+        for block_rect, anchor in blocks:
+            if block_rect.y0 < rect.y0:
+                continue
+            found = next((i for i, line in enumerate(normalised) if anchor in line), None)
+            if found is not None:
+                position = found
+                break
+        inserts[position].append(region_text)
+    if not inserts:
+        return text
+
+    merged: List[str] = []
+    for i in range(len(lines) + 1):
+        merged.extend(inserts.get(i, ()))
+        if i < len(lines):
+            merged.append(lines[i])
+    return '\n'.join(merged)
+
+
+def _ocr_page_image(raster: PageRaster, lang: str, config: str, timeout: float) -> Dict[str, Any]:
+    """Pool entry point: OCR one rendered page or region; failures become an ``error`` entry."""
+    result = _target_fields(raster)
+    if pytesseract is None:
+        result.update(text="", error="pytesseract not installed")
+        return result
+    # tesseract reads the PGM file as is (pytesseract passes paths through)
+    with tempfile.NamedTemporaryFile(prefix='ocr_', suffix='.pgm', delete=False) as f:
+        raster.write_pgm(f)
+    try:
+        result["text"] = pytesseract.image_to_string(f.name, lang=lang, config=config, timeout=timeout)
+    except Exception as e:
+        # pytesseract kills tesseract and raises RuntimeError on timeout
+        result.update(text="", error=str(e))
+    finally:
+        os.unlink(f.name)
+    return result
+
+
 class OCRProcessor:
     """Perform OCR on specified page numbers of a PDF and return text."""
 
-    def __init__(self, dpi: int = 300):
+    def __init__(self, dpi: int = 300, max_workers: Optional[int] = None,
+                 page_timeout: Optional[float] = None, lang: str = "eng", config: str = "",
+                 adaptive: Optional[bool] = None, cache: Optional[ResultCache] = None):
         self.logger = logging.getLogger(__name__)
-        self.dpi = dpi
-
-    def ocr_pages(self, pdf_path: Path, pages: List[int]) -> List[Dict[str, Any]]:
-        """Run OCR on the given pages list (1-indexed) and return results."""
-        if not pages:
-            return []
-
-        self.logger.info(f"[OCR] Converting {len(pages)} page(s) of {pdf_path.name} to images…")
-        # pdf2image expects 1-indexed page numbers.
-        try:
-            images: List[Image.Image] = convert_from_path(
-                str(pdf_path), dpi=self.dpi, first_page=min(pages), last_page=max(pages), fmt="png"
-            )
-        except Exception as e:
-            self.logger.warning(f"[OCR] pdf2image failed: {e}. Falling back to pdfplumber rendering.")
-            images = []
-            for p in pages:
-                img = _pdfplumber_page_to_image(pdf_path, p, self.dpi)
-                if img is not None:
-                    images.append(img)
-                else:
-                    self.logger.error(f"[OCR] Could not render page {p} for OCR")
-
-        # Mapping page number to OCR text
-        results: List[Dict[str, Any]] = []
-        for idx, image in enumerate(images):
-            page_number = pages[idx] if idx < len(pages) else pages[0] + idx
-            text = pytesseract.image_to_string(image, lang="eng")
-            results.append({"page": page_number, "text": text})
-        self.logger.info(f"[OCR] OCR complete for {len(results)} pages")
-        return results 
\ No newline at end of file
+        self.dpi = dpi  # fixed resolution, or the fallback when adaptive DPI finds no text
+        self.adaptive = OCR_ADAPTIVE_DPI if adaptive is None else adaptive
+        self.max_workers = max_workers or OCR_WORKERS
+        self.page_timeout = page_timeout if page_timeout is not None else OCR_PAGE_TIMEOUT
+        self.lang = lang
+        self.config = config
+        self.cache = cache if cache is not None else ResultCache(cache_dir=OCR_CACHE_DIR,
+                                                                 max_bytes=OCR_CACHE_MAX_BYTES)
+
+    def ocr_pages(self, pdf_path: Path, pages: List[int],
+                  document: Optional[DocumentContext] = None) -> List[Dict[str, Any]]:
+        """Run OCR on the given pages list (1-indexed) and return results in page order."""
+        return sorted(self.iter_ocr_pages(pdf_path, pages, document=document), key=lambda r: r["page"])
+
+    def iter_ocr_pages(self, pdf_path: Path, pages: List[int],
+                       document: Optional[DocumentContext] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield ``{"page", "text"}`` (plus ``"error"`` on failure) per page as OCR completes.
+
+        Pages are rendered one at a time and at most two per worker are in
+        flight, so memory stays bounded however many pages are requested.
+        """
+        targets = [(page_num, None) for page_num in sorted(set(pages))]
+        yield from self._iter_targets(pdf_path, targets, document, "page(s)")
+
+    def iter_ocr_regions(self, pdf_path: Path, regions: Dict[int, List[fitz.Rect]],
+                         document: Optional[DocumentContext] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield ``{"page", "bbox", "text"}`` (plus ``"error"``) per image region as OCR completes.
+
+        ``regions`` maps page numbers to rectangles, usually from `ocr_regions`;
+        only those clips are rendered and recognised.
+        """
+        targets = [(page_num, rect) for page_num in sorted(regions) for rect in regions[page_num]]
+        yield from self._iter_targets(pdf_path, targets, document, "image region(s)")
+
+    def _iter_targets(self, pdf_path: Path, targets: List[OCRTarget],
+                      document: Optional[DocumentContext], what: str) -> Iterator[Dict[str, Any]]:
+        if not targets:
+            return
+        if not tesseract_available():
+            self.logger.warning(f"[OCR] tesseract not available - skipping OCR of {len(targets)} {what}")
+            return
+        if document is None:
+            with DocumentContext(Path(pdf_path)) as document:
+                yield from self._iter_targets(pdf_path, targets, document, what)
+            return
+
+        resolution = "adaptive dpi" if self.adaptive else f"{self.dpi} dpi"
+        self.logger.info(f"[OCR] Recognising {len(targets)} {what} of {Path(pdf_path).name} "
+                         f"at {resolution} on {self.max_workers} worker(s)…")
+        done = 0
+        for result in self._run(document, targets):
+            if "error" in result:
+                self.logger.warning(f"[OCR] Page {result['page']} failed: {result['error']}")
+            done += 1
+            yield result
+        self.logger.info(f"[OCR] OCR complete for {done} {what}")
+
+    def _run(self, document: DocumentContext, targets: List[OCRTarget]) -> Iterator[Dict[str, Any]]:
+        args = (self.lang, self.config, self.page_timeout)
+        jobs = self._jobs(document, targets)
+        if self.max_workers < 2 or len(targets) < 2 or multiprocessing.current_process().daemon:
+            # Daemonic pool workers cannot start children; OCR in-process
+            for raster, key, hit in jobs:
+                yield hit if hit is not None else self._store(key, _ocr_page_image(raster, *args))
+            return
+
+        workers = min(self.max_workers, len(targets))
+        # tesseract's OpenMP threads share the CPUs left per worker
+        with ProcessPoolExecutor(max_workers=workers, initializer=apply_thread_limits,
+                                 initargs=(max(1, available_cpus() // workers),)) as executor:
+            in_flight: Dict[Any, Tuple[PageRaster, Optional[str]]] = {}
+
+            def top_up() -> List[Dict[str, Any]]:
+                """Submit rasters until two per worker are in flight; returns cache hits met on the way."""
+                hits = []
+                while len(in_flight) < 2 * workers:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    raster, key, hit = job
+                    if hit is not None:
+                        hits.append(hit)
+                        continue
+                    detached = raster.detached()
+                    in_flight[executor.submit(_ocr_page_image, detached, *args)] = (detached, key)
+                return hits
+
+            yield from top_up()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    raster, key = in_flight.pop(future)
+                    try:
+                        yield self._store(key, future.result())
+                    except Exception as e:
+                        yield {**_target_fields(raster), "text": "", "error": str(e)}
+                yield from top_up()
+
+    def _jobs(self, document: DocumentContext,
+              targets: List[OCRTarget]) -> Iterator[Tuple[PageRaster, Optional[str], Optional[Dict[str, Any]]]]:
+        """``(raster, cache key, cached result or None)`` per target, rendered lazily."""
+        for page_num, clip in targets:
+            raster = self.render(document, page_num, clip)
+            key = self.cache_key(raster) if self.cache.enabled else None
+            text = self.cache.get(key) if key is not None else None
+            yield raster, key, ({**_target_fields(raster), "text": text} if text is not None else None)
+
+    def cache_key(self, raster: PageRaster) -> str:
+        """OCR cache key: rendered pixels plus everything that changes tesseract's output."""
+        config = {'lang': self.lang, 'config': self.config, 'tesseract': tesseract_version()}
+        return self.cache.key(raster.digest(), 'ocr', config)
+
+    def _store(self, key: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache a successful result and pass it through."""
+        if key is not None and "error" not in result:
+            self.cache.put(key, result["text"])
+        return result
+
+    def render(self, document: DocumentContext, page_num: int, clip: Optional[fitz.Rect] = None) -> PageRaster:
+        """Grayscale raster of a page (or a region of it) at the fixed or adaptive resolution."""
+        dpi = adaptive_dpi(glyph_height(document, page_num, clip), self.dpi) if self.adaptive else self.dpi
+        return render_page_raster(document, page_num, dpi, clip)
+
+
+def _target_fields(raster: PageRaster) -> Dict[str, Any]:
+    """``page`` (and ``bbox`` for a region) identifying what a raster shows."""
+    return {"page": raster.page} if raster.clip is None else {"page": raster.page, "bbox": raster.clip}
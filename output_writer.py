@@ -8,7 +8,7 @@ Handles JSON output generation with validation and error handling.
 import json
 import logging
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional
 from datetime import datetime
 import io
 
@@ -57,6 +57,43 @@ class OutputWriter:
             self.logger.error(f"Failed to write outline to {output_path}: {str(e)}")
             return False
     
+    def write_page_stream(self, events: Iterable[Dict[str, Any]], output_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Write streamed pipeline events to an NDJSON file as they arrive.
+        
+        Args:
+            events: Events from `DocumentPipeline.iter_process`
+            output_path: Path to the output .ndjson file
+            
+        Returns:
+            The document assembled from the events, in the same shape as
+            `DocumentPipeline.process` returns (title, outline, raw_text,
+            tables), or None if the stream did not complete
+        """
+        outline_event = None
+        raw_text: List[Dict[str, Any]] = []
+        tables: List[Dict[str, Any]] = []
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+                f.flush()
+                if event.get('type') == 'page':
+                    raw_text.append({'page': event['page'], 'text': event['text']})
+                    tables.extend(event['tables'])
+                elif event.get('type') == 'outline':
+                    outline_event = event
+        
+        self.logger.info(f"Streamed page records to {output_path}")
+        if outline_event is None:
+            return None
+        return {
+            'title': outline_event.get('title', 'Untitled Document'),
+            'outline': outline_event.get('outline', []),
+            'raw_text': raw_text,
+            'tables': tables,
+        }
+    
     def _validate_outline_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Validate and clean outline data before writing.
@@ -0,0 +1,126 @@
+"""
+page_classifier.py
+------------------
+Pre-flight page classification used to route pages to the extractors.
+
+One cheap PyMuPDF pass per page looks at the text layer (character count),
+the images placed on the page (share of the page area they cover) and the
+vector drawings (path count plus the `table_detection` cues), and assigns
+each page the first matching kind:
+
+- ``scanned`` -- (almost) no text layer, page covered by images
+- ``mixed``   -- large images (that may hold text) next to a text layer or
+  covering part of the page
+- ``vector``  -- drawing-heavy or table-like (ruling lines / text grid)
+- ``blank``   -- no text, and no images or drawings worth mentioning
+- ``text``    -- born-digital text (possibly with small images such as logos)
+
+The parser only sends ``scanned``/``mixed`` pages to OCR, pages with a text
+layer to pdfplumber, and pages with table cues to the table extractors.
+Everything used here comes from the document's page cache (`page_text`,
+`page_dict`), plus one `get_drawings()` call shared with the table cues.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import fitz  # PyMuPDF
+
+from document_context import DocumentContext
+from table_detection import TableHint, detect_table_hint
+
+
+PAGE_BLANK = 'blank'
+PAGE_SCANNED = 'scanned'
+PAGE_MIXED = 'mixed'
+PAGE_VECTOR = 'vector'
+PAGE_TEXT = 'text'
+PAGE_KINDS = (PAGE_TEXT, PAGE_VECTOR, PAGE_MIXED, PAGE_SCANNED, PAGE_BLANK)
+
+# Non-whitespace characters a text layer needs to count as born-digital
+MIN_TEXT_CHARS = 20
+# Image coverage (share of the page area) of a scanned page
+SCANNED_IMAGE_COVERAGE = 0.5
+# Image coverage above which a page is mixed
+MIXED_IMAGE_COVERAGE = 0.25
+# Drawing paths that make a page vector-heavy (charts, diagrams, forms)
+VECTOR_MIN_DRAWINGS = 50
+
+
+@dataclass
+class PageProfile:
+    """Pre-flight signals and resulting kind for one page."""
+    page: int
+    kind: str
+    text_chars: int
+    image_coverage: float
+    drawings: int
+    table_hint: TableHint
+
+    @property
+    def has_text_layer(self) -> bool:
+        return self.text_chars >= MIN_TEXT_CHARS
+
+    @property
+    def needs_ocr(self) -> bool:
+        return self.kind in (PAGE_SCANNED, PAGE_MIXED)
+
+    @property
+    def has_table_cues(self) -> bool:
+        return self.table_hint.flavor is not None
+
+
+def image_coverage(page_dict: Dict[str, Any], page_area: float) -> float:
+    """Share of the page covered by image blocks (overlaps counted twice, capped at 1)."""
+    if page_area <= 0:
+        return 0.0
+    covered = 0.0
+    for block in page_dict.get('blocks', ()):
+        if block.get('type') == 1:
+            x0, y0, x1, y1 = block['bbox']
+            covered += max(0.0, x1 - x0) * max(0.0, y1 - y0)
+    return min(1.0, covered / page_area)
+
+
+def page_kind(text_chars: int, coverage: float, drawings: int, table_hint: TableHint) -> str:
+    """Kind of a page from its pre-flight signals (first matching rule wins)."""
+    if coverage >= SCANNED_IMAGE_COVERAGE and text_chars < MIN_TEXT_CHARS:
+        return PAGE_SCANNED
+    if coverage >= MIXED_IMAGE_COVERAGE:
+        return PAGE_MIXED
+    if drawings >= VECTOR_MIN_DRAWINGS or table_hint.flavor is not None:
+        return PAGE_VECTOR
+    if text_chars < MIN_TEXT_CHARS:
+        return PAGE_BLANK
+    return PAGE_TEXT
+
+
+def classify_page(page_num: int, page: fitz.Page, page_text: str, page_dict: Dict[str, Any]) -> PageProfile:
+    drawings = page.get_drawings()
+    table_hint = detect_table_hint(page_num, page, page_dict, drawings=drawings)
+    text_chars = sum(1 for char in page_text if not char.isspace())
+    coverage = image_coverage(page_dict, page.rect.width * page.rect.height)
+    return PageProfile(
+        page=page_num,
+        kind=page_kind(text_chars, coverage, len(drawings), table_hint),
+        text_chars=text_chars,
+        image_coverage=round(coverage, 4),
+        drawings=len(drawings),
+        table_hint=table_hint,
+    )
+
+
+def classify_pages(document: DocumentContext) -> List[PageProfile]:
+    """Profile of every page in the document's scope."""
+    return [
+        classify_page(page_num, document.fitz_page(page_num), document.page_text(page_num),
+                      document.page_dict(page_num))
+        for page_num in document.page_numbers
+    ]
+
+
+def kind_counts(profiles: List[PageProfile]) -> Dict[str, int]:
+    """Number of pages of each kind."""
+    counts = Counter(profile.kind for profile in profiles)
+    return {kind: counts[kind] for kind in PAGE_KINDS if counts[kind]}
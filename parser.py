@@ -7,22 +7,28 @@ Libraries used:
 - pdfplumber (layout-aware)
 - PyMuPDF (fitz) - fast and accurate
 - pdfminer.six - detailed text extraction
-- camelot - table extraction
+- camelot - optional table fallback (see table_extractor.py)
 
 Installation:
 pip install pdfplumber PyMuPDF pdfminer.six camelot-py[cv]
 """
 
 import re
+import time
 import logging
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any, Set
-from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Any, Set, Union
+from dataclasses import dataclass, field
 from collections import defaultdict, Counter
+from itertools import count
 import difflib
+import numpy as np
 import os 
 import json
 import io
+import threading
 
 
 # Core PDF libraries
@@ -31,18 +37,21 @@ import fitz  # PyMuPDF
 from pdfminer.high_level import extract_text as pdfminer_extract
 from pdfminer.layout import LAParams
 
-# Table extraction libraries
-try:
-    import camelot
-    CAMELOT_AVAILABLE = True
-except ImportError:
-    CAMELOT_AVAILABLE = False
-    logging.warning("Camelot not available - table extraction will be limited")
+from document_context import DocumentContext
+from text_quality import PageQuality, assess_page_text, document_quality_score
+from span_store import SpanTable, SpanTableBuilder
+from table_extractor import TableExtractor
+from result_cache import ResultCache
+from resources import apply_thread_limits, available_cpus
+from worker_pool import pool_context
+from text_merge import merge_page, merge_pages
+from page_classifier import PageProfile, classify_pages, kind_counts
 
 # OCR libraries for scanned PDFs
 try:
     import pytesseract
     from PIL import Image
+    from ocr_utils import OCR_REGIONS, OCRProcessor, ocr_regions, tesseract_available
     OCR_AVAILABLE = True
 except ImportError:
     OCR_AVAILABLE = False
@@ -70,27 +79,175 @@ class ParsingResult:
     execution_time: float = 0.0
 
 
+@dataclass
+class PageExtraction:
+    """Per-page extraction output for a document or a shard of its pages."""
+    results: Dict[str, ParsingResult]
+    texts: List[ExtractedText]
+    font_blocks: SpanTable
+    tables: List[Dict[str, Any]]
+    page_quality: List[PageQuality] = field(default_factory=list)
+    escalated_pages: List[int] = field(default_factory=list)
+    bookmark_outline: Optional[List[Dict[str, Any]]] = None  # validated embedded outline
+    page_profiles: List[PageProfile] = field(default_factory=list)
+
+    @classmethod
+    def merge(cls, parts: List['PageExtraction']) -> 'PageExtraction':
+        """Concatenate shard extractions (given in page order) into one."""
+        results: Dict[str, ParsingResult] = {}
+        for part in parts:
+            for name, result in part.results.items():
+                merged = results.get(name)
+                if merged is None:
+                    results[name] = ParsingResult(name, list(result.texts), result.success,
+                                                  result.error, result.execution_time)
+                    continue
+                merged.texts.extend(result.texts)
+                merged.success = merged.success and result.success
+                merged.error = merged.error or result.error
+                merged.execution_time += result.execution_time
+        return cls(
+            results=results,
+            texts=[t for part in parts for t in part.texts],
+            font_blocks=SpanTable.concat([part.font_blocks for part in parts]),
+            tables=[t for part in parts for t in part.tables],
+            page_quality=[q for part in parts for q in part.page_quality],
+            escalated_pages=[p for part in parts for p in part.escalated_pages],
+            # Bookmarks are document-wide, so every shard reads the same ones
+            bookmark_outline=parts[0].bookmark_outline if parts else None,
+            page_profiles=[p for part in parts for p in part.page_profiles],
+        )
+
+
+@dataclass
+class PageRecord:
+    """Extraction output for a single page, as yielded by `iter_page_records`."""
+    page: int
+    text: str
+    spans: SpanTable
+    headings: List[Dict[str, Any]]  # candidates under the running font statistics (no level yet)
+    tables: List[Dict[str, Any]]
+    quality: PageQuality
+    raw_text: Optional[str] = None  # see `raw_page_texts`; None if no source had text
+    profile: Optional[PageProfile] = None
+
+
+# Execution modes for running the individual parsers of one document
+EXECUTION_MODES = ('serial', 'thread', 'process')
+
+# Shared DocumentContext handle each parser touches. In thread mode only the
+# first parser claiming a handle works on the caller's context; the others get
+# a private clone over the same bytes (fitz/pdfplumber are not thread-safe).
+PARSER_HANDLES = {
+    'pdfplumber': 'plumber',
+    'pymupdf': 'fitz',
+    'pdfminer': None,
+    'ocr': 'fitz',
+}
+
+# Default per-parser timeout in the concurrent modes (0 = wait indefinitely)
+PARSER_TIMEOUT = float(os.environ.get('PARSER_TIMEOUT', '0')) or None
+
+# Parsers that only see some pages, chosen from the pre-flight page profiles
+# (see page_classifier.py); the others run on every page in scope
+PARSER_ROUTES = {
+    'pdfplumber': attrgetter('has_text_layer'),
+    'ocr': attrgetter('needs_ocr'),
+}
+
+# Heading text features
+HEADING_KEYWORD_RE = re.compile(r'chapter|section|introduction|conclusion', re.IGNORECASE)
+NUMBERED_HEADING_RE = re.compile(r'\d+(\.\d+)*\.?\s')
+
+# Slower parsers that adaptive mode only runs on pages whose PyMuPDF text
+# layer fails the quality check
+ESCALATION_PARSERS = ('pdfplumber', 'pdfminer', 'ocr')
+
+# Sources that carry whole-page text (used for page quality assessment)
+PAGE_TEXT_SOURCES = ('pdfplumber', 'pymupdf', 'pdfminer', 'ocr')
+
+# Embedded bookmarks are used as the outline only if the tree has at least
+# this many entries, nearly all of them resolve to a page, and they mostly
+# follow page order
+MIN_BOOKMARKS = 2
+MAX_UNRESOLVED_BOOKMARKS = 0.1
+MAX_BACKWARD_BOOKMARKS = 0.1
+
+# Whole-page sources the pipeline reuses as raw text, most preferred first
+RAW_TEXT_SOURCES = ('pdfminer', 'pymupdf')
+
+# Parsers still run once the embedded bookmarks are accepted as the outline:
+# raw text sources, and OCR for pages without a text layer
+BOOKMARK_PARSERS = RAW_TEXT_SOURCES + ('ocr',)
+
+# Pages extracted per step by the streaming API; cached page data is released
+# after each window
+STREAM_WINDOW = int(os.environ.get('PARSER_STREAM_WINDOW', '8'))
+
+
 class PDFOutlineParser:
     """
     Advanced PDF text extractor using multiple parsing libraries.
     Combines results from different parsers to ensure maximum text recovery.
+
+    Parsers run one after another by default. ``execution_mode='thread'`` or
+    ``'process'`` runs them concurrently in a bounded pool; results are merged
+    in the fixed parser order, so the output is identical to the serial path.
+    ``parser_timeout`` (seconds, or a per-parser dict) bounds how long the
+    concurrent modes wait for each parser before recording it as failed.
+
+    When the PDF carries a usable bookmark tree it becomes the H1-H3
+    outline directly: span-level heading analysis and pdfplumber are
+    skipped, and only page 1's spans are read for the title
+    (``use_bookmarks=False`` always uses the font heuristics).
+
+    The per-span ``text_blocks`` list is only added to the result with
+    ``include_text_blocks=True`` (or ``PARSER_TEXT_BLOCKS=1``); the spans
+    otherwise stay in the compact `SpanTable`.
+
+    With ``adaptive=True`` PyMuPDF runs first and only pages whose text layer
+    fails the quality check (empty, too sparse, garbage glyphs) are escalated
+    to pdfplumber, pdfminer and OCR.
+
+    `iter_page_records` is the streaming alternative to `extract_outline`:
+    it yields a `PageRecord` per page as windows of pages complete, and an
+    `OutlineAccumulator` resolves the title and heading levels at the end.
+
+    `extract_outline` results are cached on disk by document content and
+    parser configuration (see `result_cache.py`); pass ``use_cache=False``
+    to force a fresh extraction.
     """
 
-    def __init__(self, enable_ocr: bool = True, enable_tables: bool = True):
+    def __init__(self, enable_ocr: bool = True, enable_tables: bool = True,
+                 execution_mode: Optional[str] = None, max_workers: Optional[int] = None,
+                 parser_timeout: Optional[Union[float, Dict[str, float]]] = None,
+                 adaptive: Optional[bool] = None, cache: Optional[ResultCache] = None,
+                 use_bookmarks: bool = True, include_text_blocks: Optional[bool] = None):
         self.logger = logging.getLogger(__name__)
         self.enable_ocr = enable_ocr and OCR_AVAILABLE
         self.enable_tables = enable_tables
-        
-        # Parser configurations - only 4 parsers
+        self.execution_mode = execution_mode or os.environ.get('PARSER_EXECUTION_MODE', 'serial')
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{self.execution_mode}', expected one of {EXECUTION_MODES}")
+        self.max_workers = max_workers
+        self.parser_timeout = parser_timeout if parser_timeout is not None else PARSER_TIMEOUT
+        if adaptive is None:
+            adaptive = os.environ.get('PARSER_ADAPTIVE', '0') == '1'
+        self.adaptive = adaptive
+        self.cache = cache if cache is not None else ResultCache()
+        self.use_bookmarks = use_bookmarks
+        if include_text_blocks is None:
+            include_text_blocks = os.environ.get('PARSER_TEXT_BLOCKS', '0') == '1'
+        self.include_text_blocks = include_text_blocks
+        self.table_extractor = TableExtractor()
+        
+        # Parser configurations (tables come from the shared TableExtractor)
         self.parsers = {
             'pdfplumber': self._extract_with_pdfplumber,
             'pymupdf': self._extract_with_pymupdf,
             'pdfminer': self._extract_with_pdfminer,
         }
         
-        if self.enable_tables and CAMELOT_AVAILABLE:
-            self.parsers['camelot'] = self._extract_with_camelot
-        
         if self.enable_ocr:
             self.parsers['ocr'] = self._extract_with_ocr
 
@@ -100,135 +257,456 @@ class PDFOutlineParser:
             json.dump(data, f, indent=2, ensure_ascii=False)
 
 
-    def extract_outline(self, pdf_path: Path) -> Dict[str, Any]:
+    def extract_outline(self, pdf_path: Path, document: Optional[DocumentContext] = None,
+                        use_cache: bool = True) -> Dict[str, Any]:
         """
         Extract structured outline with headings using multi-parser approach.
         
         Args:
             pdf_path: Path to PDF file
+            document: Optional shared DocumentContext; when omitted one is
+                opened (and closed) for this call
+            use_cache: Look up / store the result in the result cache
             
         Returns:
             Dictionary with title, outline (H1,H2,H3), raw text, and tables
         """
+        pdf_path = Path(pdf_path)
+        if document is None:
+            with DocumentContext(pdf_path) as document:
+                return self.extract_outline(pdf_path, document=document, use_cache=use_cache)
+
+        cache_key = None
+        if use_cache and self.cache.enabled:
+            cache_key = self.cache.key(document.sha256, 'outline', self.cache_config(document))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.logger.info(f"Result cache hit for: {pdf_path.name}")
+                return cached
+
         self.logger.info(f"Starting multi-parser extraction for: {pdf_path.name}")
-        
-        results = {}
+        extraction = self.extract_pages(document)
+        outline_data = self.build_outline(extraction)
+        if cache_key is not None and is_cacheable(outline_data):
+            self.cache.put(cache_key, outline_data)
+        return outline_data
+
+    def worker_config(self) -> Dict[str, Any]:
+        """Picklable constructor arguments for an equivalent parser in a worker process."""
+        return {
+            'enable_ocr': self.enable_ocr,
+            'enable_tables': self.enable_tables,
+            'parser_timeout': self.parser_timeout,
+            'adaptive': self.adaptive,
+            'use_bookmarks': self.use_bookmarks,
+            'include_text_blocks': self.include_text_blocks,
+        }
+
+    def cache_config(self, document: DocumentContext) -> Dict[str, Any]:
+        """Settings that influence extraction output (part of the result cache key)."""
+        return {
+            'parsers': list(self.parsers),
+            'enable_tables': self.enable_tables,
+            'adaptive': self.adaptive,
+            'use_bookmarks': self.use_bookmarks,
+            'include_text_blocks': self.include_text_blocks,
+            'ocr_regions': OCR_REGIONS if 'ocr' in self.parsers else None,
+            'pages': document.pages,
+            'versions': {
+                'pymupdf': fitz.VersionBind,
+                'pdfplumber': pdfplumber.__version__,
+            },
+        }
+
+    def extract_pages(self, document: DocumentContext) -> PageExtraction:
+        """
+        Run the per-page extraction stages (parsers, font spans, tables).
+
+        Only the pages in the document's scope are visited, so shards of a
+        large document can be extracted independently and combined with
+        `PageExtraction.merge` before `build_outline`.
+        """
         all_texts = []
+        escalated_pages: List[int] = []
+
+        # Pre-flight pass: decides which pages OCR, pdfplumber and the table
+        # extractors get to see
+        profiles = {profile.page: profile for profile in classify_pages(document)}
+        self.logger.info(f"Page kinds: {kind_counts(list(profiles.values()))}")
+        
+        # Usable bookmarks are the outline, so only the parsers raw text needs
+        # run and spans are only collected for title detection on page 1
+        bookmark_outline = self._outline_from_bookmarks(document)
+        
+        # Run all parsers; results come back in self.parsers order
+        if bookmark_outline:
+            results, _ = self._run_parsers(document, [name for name in self.parsers if name in BOOKMARK_PARSERS],
+                                           profiles)
+            results = {name: results.get(name, ParsingResult(name, [], True)) for name in self.parsers}
+            tables = None
+        elif self.adaptive and 'pymupdf' in self.parsers:
+            results, escalated_pages = self._run_parsers_adaptive(document, profiles)
+            tables = None
+        else:
+            results, tables = self._run_parsers(document, profiles=profiles)
+        for parser_name, result in results.items():
+            if result.success:
+                all_texts.extend(result.texts)
+                self.logger.info(f"{parser_name}: extracted {len(result.texts)} text blocks in {result.execution_time:.2f}s")
+            else:
+                self.logger.warning(f"{parser_name}: failed - {result.error}")
+        
+        # 🔥 NEW: Font-enriched span blocks for outline detection
+        if bookmark_outline:
+            font_blocks = self._collect_font_blocks(document, [page for page in document.page_numbers if page == 1])
+        else:
+            font_blocks = self._collect_font_blocks(document)
+        
+        # 🔥 NEW: Extract tables (process mode already did this next to pdfplumber)
+        if tables is None:
+            tables = self._extract_tables(document, list(profiles.values()))
+        
+        return PageExtraction(results=results, texts=all_texts, font_blocks=font_blocks, tables=tables,
+                              page_quality=self._assess_pages(document, all_texts),
+                              escalated_pages=escalated_pages,
+                              bookmark_outline=bookmark_outline,
+                              page_profiles=list(profiles.values()))
+
+    def page_windows(self, document: DocumentContext, window: Optional[int] = None) -> Iterator[List[int]]:
+        """Consecutive page-number windows of ``window`` pages over the document's scope."""
+        window = max(1, window or STREAM_WINDOW)
+        page_numbers = document.page_numbers
+        for start in range(0, len(page_numbers), window):
+            yield page_numbers[start:start + window]
+
+    def iter_page_records(self, document: DocumentContext, accumulator: Optional['OutlineAccumulator'] = None,
+                          window: Optional[int] = None) -> Iterator[PageRecord]:
+        """
+        Yield a `PageRecord` per page, in page order, as extraction completes.
+
+        Pages are extracted a window at a time through `extract_pages` (so
+        execution modes and adaptive escalation apply per window) and the
+        window's cached page data is released before the next one starts.
+        Pass an `OutlineAccumulator` and call its `finalise` after the last
+        record to get the title and H1-H3 outline.
+        """
+        accumulator = accumulator if accumulator is not None else OutlineAccumulator(self)
+        for pages in self.page_windows(document, window):
+            yield from self.extract_page_records(document.subset(pages), accumulator)
+            document.release_pages(pages)
+
+    def extract_page_records(self, document: DocumentContext,
+                             accumulator: 'OutlineAccumulator') -> List[PageRecord]:
+        """Extract the pages in ``document``'s scope and split the result into page records."""
+        extraction = self.extract_pages(document)
+        accumulator.bookmark_outline = extraction.bookmark_outline
+
+        texts_by_page: Dict[int, List[ExtractedText]] = defaultdict(list)
+        for text in extraction.texts:
+            texts_by_page[text.page_num].append(text)
+        tables_by_page: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for table in extraction.tables:
+            tables_by_page[table['page']].append(table)
+        quality_by_page = {q.page: q for q in extraction.page_quality}
+        profile_by_page = {p.page: p for p in extraction.page_profiles}
+        raw_texts = raw_page_texts(extraction.results)
+        spans = extraction.font_blocks
+
+        records = []
+        for page_num in document.page_numbers:
+            record = PageRecord(
+                page=page_num,
+                text=merge_page(page_num, texts_by_page.get(page_num, [])).text,
+                spans=spans.take(np.flatnonzero(spans.page == page_num)),
+                headings=[],
+                tables=tables_by_page.get(page_num, []),
+                quality=quality_by_page[page_num],
+                raw_text=raw_texts.get(page_num),
+                profile=profile_by_page.get(page_num),
+            )
+            record.headings = accumulator.add(record)
+            records.append(record)
+        return records
+
+    def build_outline(self, extraction: PageExtraction) -> Dict[str, Any]:
+        """
+        Assemble the final outline result from (possibly merged) page data.
+
+        Font statistics are computed over every span in ``extraction``, so
+        heading levels are consistent across shards.
+        """
+        results = extraction.results
+        tables = extraction.tables
+
+        # Merge every parser's text page by page
+        merged_pages = merge_pages(extraction.texts, [q.page for q in extraction.page_quality])
         
-        # Run all parsers
-        for parser_name, parser_func in self.parsers.items():
-            self.logger.info(f"Running parser: {parser_name}")
-            try:
-                import time
-                start_time = time.time()
-                result = parser_func(pdf_path)
-                execution_time = time.time() - start_time
-                
-                result.execution_time = execution_time
-                results[parser_name] = result
-                
-                if result.success:
-                    all_texts.extend(result.texts)
-                    self.logger.info(f"{parser_name}: extracted {len(result.texts)} text blocks in {execution_time:.2f}s")
-                else:
-                    self.logger.warning(f"{parser_name}: failed - {result.error}")
-                    
-            except Exception as e:
-                self.logger.error(f"Parser {parser_name} crashed: {str(e)}")
-                results[parser_name] = ParsingResult(
-                    parser_name=parser_name,
-                    texts=[],
-                    success=False,
-                    error=str(e)
-                )
-        
-        # Merge and deduplicate results
-        merged_text = self._merge_extracted_texts(all_texts)
-        
-        # 🔥 NEW: Extract structured outline, headings, AND font blocks
-        structured_data = self._create_structured_outline(pdf_path, all_texts)
-        font_blocks = structured_data.pop('font_blocks', [])
-        
-        # 🔥 NEW: Extract tables
-        tables = self._extract_tables(pdf_path)
+        # 🔥 NEW: Extract structured outline and headings from font blocks
+        # (or from the embedded bookmarks when they pass the sanity check)
+        structured_data = self._create_structured_outline(extraction.font_blocks, extraction.bookmark_outline)
         
         # Generate final output in expected format
         final_result = {
             'title': structured_data.get('title', 'Untitled Document'),
             'outline': structured_data.get('outline', []),
-            'raw_text': [{'page': i+1, 'text': text} for i, text in enumerate(merged_text.split('\n\n'))],
+            'raw_text': [{'page': page.page, 'text': page.text} for page in merged_pages],
+            'text_provenance': [page.provenance() for page in merged_pages],
             'tables': tables,
-            'text_blocks': font_blocks,  # include rich blocks with font & style info
             'parser_results': results,
-            'statistics': self._generate_statistics(results),
-            'quality_score': self._calculate_quality_score(results)
+            'statistics': self._generate_statistics(results, extraction),
+            'quality_score': document_quality_score(extraction.page_quality)
         }
+        if self.include_text_blocks:
+            # Rich blocks with font & style info, expanded from the span table on request
+            final_result['text_blocks'] = extraction.font_blocks.to_dicts()
         
         self.logger.info(f"Extracted {len(final_result['outline'])} headings and {len(tables)} tables")
         return final_result
 
-    def _extract_with_pdfplumber(self, pdf_path: Path) -> ParsingResult:
+    def _run_parsers(self, document: DocumentContext, parser_names: Optional[List[str]] = None,
+                     profiles: Optional[Dict[int, PageProfile]] = None) -> Tuple[Dict[str, ParsingResult], Optional[List[Dict[str, Any]]]]:
+        """
+        Run the configured parsers (or ``parser_names``) using the configured execution mode.
+
+        With page ``profiles`` the routed parsers (`PARSER_ROUTES`) only see
+        their pages, and are skipped when no page qualifies.
+
+        Returns the per-parser results and, when a worker already produced
+        them, the extracted tables (None means the caller extracts tables).
+        """
+        names = list(self.parsers) if parser_names is None else parser_names
+        targets = {name: self._route(name, document, profiles) for name in names}
+        runnable = [name for name in names if targets[name] is not None]
+        tables = None
+        if self.execution_mode == 'serial' or len(runnable) < 2:
+            results = {name: self._run_parser(name, targets[name]) for name in runnable}
+        else:
+            results, tables = self._run_parsers_concurrently(targets, runnable, with_tables=parser_names is None)
+        for name in names:
+            if targets[name] is None:
+                self.logger.info(f"Skipping parser {name}: no page routed to it")
+                results[name] = ParsingResult(name, [], True)
+        return {name: results[name] for name in names}, tables
+
+    def _route(self, parser_name: str, document: DocumentContext,
+               profiles: Optional[Dict[int, PageProfile]]) -> Optional[DocumentContext]:
+        """View of ``document`` holding the pages routed to ``parser_name`` (None if there are none)."""
+        route = PARSER_ROUTES.get(parser_name)
+        if route is None or profiles is None:
+            return document
+        page_numbers = document.page_numbers
+        pages = [page_num for page_num in page_numbers if route(profiles[page_num])]
+        if len(pages) == len(page_numbers):
+            return document
+        return document.subset(pages) if pages else None
+
+    def _run_parsers_adaptive(self, document: DocumentContext,
+                              profiles: Optional[Dict[int, PageProfile]] = None) -> Tuple[Dict[str, ParsingResult], List[int]]:
+        """
+        Run PyMuPDF (plus non-text parsers) first, then escalate failing pages.
+
+        Returns results in self.parsers order and the escalated page numbers.
+        """
+        first_tier = [name for name in self.parsers if name not in ESCALATION_PARSERS]
+        escalation = [name for name in self.parsers if name in ESCALATION_PARSERS]
+        results, _ = self._run_parsers(document, first_tier, profiles)
+
+        pymupdf_pages = {t.page_num: t.text for t in results['pymupdf'].texts if t.source == 'pymupdf'}
+        failing = [
+            page_num for page_num in document.page_numbers
+            if not assess_page_text(page_num, pymupdf_pages.get(page_num, ''), document.page_area(page_num)).passed
+        ]
+
+        if failing and escalation:
+            self.logger.info(f"Adaptive mode: escalating {len(failing)}/{len(document.page_numbers)} pages to {', '.join(escalation)}")
+            escalated, _ = self._run_parsers(document.subset(failing), escalation, profiles)
+            results.update(escalated)
+        else:
+            self.logger.info("Adaptive mode: PyMuPDF text layer passed on every page")
+            for name in escalation:
+                results[name] = ParsingResult(name, [], True)
+
+        return {name: results[name] for name in self.parsers}, failing
+
+    def _assess_pages(self, document: DocumentContext, all_texts: List[ExtractedText]) -> List[PageQuality]:
+        """Quality of the best whole-page text available for every page in scope."""
+        by_page: Dict[int, List[str]] = defaultdict(list)
+        for text in all_texts:
+            if text.source in PAGE_TEXT_SOURCES:
+                by_page[text.page_num].append(text.text)
+
+        qualities = []
+        for page_num in document.page_numbers:
+            area = document.page_area(page_num)
+            candidates = [assess_page_text(page_num, text, area) for text in by_page.get(page_num, [''])]
+            qualities.append(max(candidates, key=lambda q: (q.passed, q.score)))
+        return qualities
+
+    def _run_parser(self, parser_name: str, document: DocumentContext) -> ParsingResult:
+        """Run a single parser, timing it and converting crashes into failed results."""
+        self.logger.info(f"Running parser: {parser_name}")
+        start_time = time.time()
+        try:
+            result = self.parsers[parser_name](document)
+        except Exception as e:
+            self.logger.error(f"Parser {parser_name} crashed: {str(e)}")
+            result = ParsingResult(
+                parser_name=parser_name,
+                texts=[],
+                success=False,
+                error=str(e)
+            )
+        result.execution_time = time.time() - start_time
+        return result
+
+    def _timeout_for(self, parser_name: str) -> Optional[float]:
+        if isinstance(self.parser_timeout, dict):
+            return self.parser_timeout.get(parser_name)
+        return self.parser_timeout
+
+    def _run_parsers_concurrently(self, targets: Dict[str, DocumentContext], parser_names: List[str],
+                                  with_tables: bool) -> Tuple[Dict[str, ParsingResult], Optional[List[Dict[str, Any]]]]:
+        """
+        Run the parsers in a bounded thread/process pool, each on its routed
+        document view in ``targets``.
+
+        Process mode submits to a pool shared by every call in this process
+        (see `_ParserPool`), so uploads do not each start new workers. Thread
+        mode reads the page count up front so that parsers which do not own
+        the fitz handle never touch it from their thread.
+
+        Timeouts are measured from submission. A parser that times out is
+        recorded as failed. In process mode its pool is retired and its
+        workers are terminated once no other call is using them, so a hung
+        parser does not keep running with the PDF open; a thread cannot be
+        killed and is abandoned, the pool shutting down without waiting for it.
+        Without a timeout (`PARSER_TIMEOUT`) a hung parser blocks the call.
+
+        In process mode (``with_tables``) the pdfplumber worker also extracts
+        the tables, since it already holds the parsed pages.
+        """
+        workers = self.max_workers or len(parser_names)
+        table_parser = None
+
+        if self.execution_mode == 'process':
+            if with_tables and 'pdfplumber' in parser_names:
+                table_parser = 'pdfplumber'
+            pool = _ParserPool.acquire(workers)
+            executor = pool.executor
+            futures = {
+                name: executor.submit(_run_parser_in_worker, name, targets[name].path, targets[name].data,
+                                      targets[name].pages, self.enable_ocr, self.enable_tables,
+                                      name == table_parser)
+                for name in parser_names
+            }
+        else:
+            pool = None
+            for target in targets.values():
+                target.page_count  # cached before the threads start
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-parser')
+            claimed: Set[str] = set()
+            futures = {}
+            for name in parser_names:
+                handle = PARSER_HANDLES.get(name)
+                target = targets[name]
+                if handle is not None:
+                    if handle in claimed:
+                        target = target.clone()
+                    claimed.add(handle)
+                futures[name] = executor.submit(self._run_parser_on, name, target, target is not targets[name])
+
+        start_time = time.time()
+        results: Dict[str, ParsingResult] = {}
+        tables = None
+        timed_out = False
+        try:
+            for name in parser_names:
+                timeout = self._timeout_for(name)
+                remaining = None if timeout is None else max(0.0, start_time + timeout - time.time())
+                try:
+                    result = futures[name].result(timeout=remaining)
+                    if name == table_parser:
+                        result, tables = result
+                    results[name] = result
+                except FutureTimeoutError:
+                    futures[name].cancel()
+                    timed_out = True
+                    self.logger.error(f"Parser {name} timed out after {timeout:.1f}s")
+                    results[name] = ParsingResult(name, [], False, f"timed out after {timeout:.1f}s",
+                                                  execution_time=time.time() - start_time)
+                except Exception as e:
+                    self.logger.error(f"Parser {name} crashed: {str(e)}")
+                    results[name] = ParsingResult(name, [], False, str(e))
+        finally:
+            if pool is not None:
+                pool.release(retire=timed_out)
+            else:
+                executor.shutdown(wait=False, cancel_futures=True)
+        return results, tables
+
+    def _run_parser_on(self, parser_name: str, document: DocumentContext, owned: bool) -> ParsingResult:
+        """Thread-pool entry point; closes the document if it is a private clone."""
+        try:
+            return self._run_parser(parser_name, document)
+        finally:
+            if owned:
+                document.close()
+
+    def _extract_with_pdfplumber(self, document: DocumentContext) -> ParsingResult:
         """Extract text using pdfplumber - excellent for layout preservation."""
         texts = []
         try:
-            with pdfplumber.open(str(pdf_path)) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Extract text with layout information
-                    page_text = page.extract_text(layout=True)
-                    if page_text:
+            for page_num in document.page_numbers:
+                page = document.plumber_page(page_num)
+
+                # Extract text with layout information
+                page_text = page.extract_text(layout=True)
+                if page_text:
+                    texts.append(ExtractedText(
+                        text=page_text,
+                        source='pdfplumber',
+                        page_num=page_num,
+                        confidence=0.9
+                    ))
+                
+                # Also extract words with detailed positioning
+                words = document.page_words(page_num)
+                
+                if words:
+                    # Group words into lines
+                    lines = self._group_words_into_lines(words)
+                    for line_text, bbox, font_info in lines:
                         texts.append(ExtractedText(
-                            text=page_text,
-                            source='pdfplumber',
+                            text=line_text,
+                            source='pdfplumber_detailed',
                             page_num=page_num,
-                            confidence=0.9
+                            confidence=0.95,
+                            bbox=bbox,
+                            font_info=font_info
                         ))
-                    
-                    # Also extract words with detailed positioning
-                    words = page.extract_words(
-                        use_text_flow=True,
-                        keep_blank_chars=True,
-                        extra_attrs=['fontname', 'size']
-                    )
-                    
-                    if words:
-                        # Group words into lines
-                        lines = self._group_words_into_lines(words)
-                        for line_text, bbox, font_info in lines:
-                            texts.append(ExtractedText(
-                                text=line_text,
-                                source='pdfplumber_detailed',
-                                page_num=page_num,
-                                confidence=0.95,
-                                bbox=bbox,
-                                font_info=font_info
-                            ))
             
             return ParsingResult('pdfplumber', texts, True)
             
         except Exception as e:
             return ParsingResult('pdfplumber', [], False, str(e))
 
-    def _extract_with_pymupdf(self, pdf_path: Path) -> ParsingResult:
+    def _extract_with_pymupdf(self, document: DocumentContext) -> ParsingResult:
         """Extract text using PyMuPDF - fast and handles complex layouts well."""
         texts = []
         try:
-            doc = fitz.open(str(pdf_path))
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
+            for page_num in document.page_numbers:
                 # Extract plain text
-                page_text = page.get_text()
+                page_text = document.page_text(page_num)
                 if page_text.strip():
                     texts.append(ExtractedText(
                         text=page_text,
                         source='pymupdf',
-                        page_num=page_num + 1,
+                        page_num=page_num,
                         confidence=0.9
                     ))
                 
                 # Extract text with detailed formatting
-                text_dict = page.get_text("dict")
+                text_dict = document.page_dict(page_num)
                 blocks = text_dict.get("blocks", [])
                 
                 for block in blocks:
@@ -252,19 +730,18 @@ class PDFOutlineParser:
                                 texts.append(ExtractedText(
                                     text=line_text,
                                     source='pymupdf_detailed',
-                                    page_num=page_num + 1,
+                                    page_num=page_num,
                                     confidence=0.95,
                                     bbox=line_bbox,
                                     font_info=font_info
                                 ))
             
-            doc.close()
             return ParsingResult('pymupdf', texts, True)
             
         except Exception as e:
             return ParsingResult('pymupdf', [], False, str(e))
 
-    def _extract_with_pdfminer(self, pdf_path: Path) -> ParsingResult:
+    def _extract_with_pdfminer(self, document: DocumentContext) -> ParsingResult:
         """Extract text using pdfminer - excellent for character-level accuracy."""
         texts = []
         try:
@@ -277,11 +754,13 @@ class PDFOutlineParser:
                 boxes_flow=0.5
             )
             
-            text = pdfminer_extract(str(pdf_path), laparams=laparams)
+            page_numbers = [p - 1 for p in document.page_numbers] if document.is_partial else None
+            text = pdfminer_extract(document.stream(), laparams=laparams, page_numbers=page_numbers)
             if text.strip():
-                # Split by pages (approximate)
-                pages = text.split('\f')  # Form feed character often separates pages
-                for page_num, page_text in enumerate(pages, 1):
+                # pdfminer emits a form feed after every page it processes
+                pages = text.split('\f')
+                page_labels = document.page_numbers if page_numbers is not None else count(1)
+                for page_num, page_text in zip(page_labels, pages):
                     if page_text.strip():
                         texts.append(ExtractedText(
                             text=page_text,
@@ -295,77 +774,47 @@ class PDFOutlineParser:
         except Exception as e:
             return ParsingResult('pdfminer', [], False, str(e))
 
-    def _extract_with_camelot(self, pdf_path: Path) -> ParsingResult:
-        """Extract tables using camelot."""
-        texts = []
-        if not CAMELOT_AVAILABLE:
-            return ParsingResult('camelot', [], False, "Camelot not available")
-        
-        try:
-            # Extract tables from all pages
-            tables = camelot.read_pdf(str(pdf_path), pages='all', flavor='lattice')
-            
-            for i, table in enumerate(tables):
-                table_text = table.df.to_string(index=False)
-                if table_text.strip():
-                    texts.append(ExtractedText(
-                        text=f"Table {i+1}:\n{table_text}",
-                        source='camelot',
-                        page_num=table.page,
-                        confidence=0.8
-                    ))
-            
-            # Try stream flavor as backup
-            if not texts:
-                tables = camelot.read_pdf(str(pdf_path), pages='all', flavor='stream')
-                for i, table in enumerate(tables):
-                    table_text = table.df.to_string(index=False)
-                    if table_text.strip():
-                        texts.append(ExtractedText(
-                            text=f"Table {i+1}:\n{table_text}",
-                            source='camelot_stream',
-                            page_num=table.page,
-                            confidence=0.7
-                        ))
-            
-            return ParsingResult('camelot', texts, True)
-            
-        except Exception as e:
-            return ParsingResult('camelot', [], False, str(e))
+    def _extract_with_ocr(self, document: DocumentContext) -> ParsingResult:
+        """
+        Extract text using OCR for scanned PDFs.
 
-    def _extract_with_ocr(self, pdf_path: Path) -> ParsingResult:
-        """Extract text using OCR for scanned PDFs."""
+        `_run_parsers` only routes scanned and mixed pages here (see
+        page_classifier.py). Pages without a text layer are OCRed whole; on
+        pages with one (and OCR_REGIONS on) only the image regions no text
+        overlaps are OCRed, one entry with its ``bbox`` per region, so OCR
+        never competes with the text layer for the whole page. Rendering and
+        recognition run in `OCRProcessor` (process pool, per-page timeout).
+        """
         texts = []
         if not OCR_AVAILABLE:
             return ParsingResult('ocr', [], False, "OCR libraries not available")
+        if not tesseract_available():
+            return ParsingResult('ocr', [], False, "tesseract not available")
         
         try:
-            import fitz  # Use PyMuPDF for image extraction
-            doc = fitz.open(str(pdf_path))
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Check if page contains images (likely scanned)
-                image_list = page.get_images()
-                if image_list:
-                    # Convert page to image
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better OCR
-                    img_data = pix.tobytes("png")
-                    
-                    # OCR the image
-                    img = Image.open(io.BytesIO(img_data))
-                    ocr_text = pytesseract.image_to_string(img, config='--psm 6')
-                    
-                    if ocr_text.strip():
-                        texts.append(ExtractedText(
-                            text=ocr_text,
-                            source='ocr',
-                            page_num=page_num + 1,
-                            confidence=0.6  # OCR is less reliable
-                        ))
+            # 2x zoom (144 dpi) for better OCR
+            ocr = OCRProcessor(dpi=144, config='--psm 6')
+            pages, regions = [], {}
+            for page_num in document.page_numbers:
+                if not (OCR_REGIONS and document.page_text(page_num).strip()):
+                    pages.append(page_num)
+                else:
+                    rects = ocr_regions(document, page_num)
+                    if rects:
+                        regions[page_num] = rects
+            results = list(ocr.iter_ocr_pages(document.path, pages, document=document))
+            results += ocr.iter_ocr_regions(document.path, regions, document=document)
+            for page in results:
+                if page["text"].strip():
+                    texts.append(ExtractedText(
+                        text=page["text"],
+                        source='ocr',
+                        page_num=page["page"],
+                        confidence=0.6,  # OCR is less reliable
+                        bbox=page.get("bbox"),
+                    ))
+            texts.sort(key=lambda t: (t.page_num, t.bbox[1] if t.bbox else 0))
             
-            doc.close()
             return ParsingResult('ocr', texts, True)
             
         except Exception as e:
@@ -409,90 +858,6 @@ class PDFOutlineParser:
         
         return result
 
-    def _merge_extracted_texts(self, all_texts: List[ExtractedText]) -> str:
-        """
-        Intelligently merge text from all parsers to create the most complete version.
-        """
-        if not all_texts:
-            return ""
-        
-        # Group texts by page
-        pages = defaultdict(list)
-        for text in all_texts:
-            pages[text.page_num].append(text)
-        
-        merged_pages = []
-        
-        for page_num in sorted(pages.keys()):
-            page_texts = pages[page_num]
-            
-            # Find the best text for this page
-            best_text = self._find_best_page_text(page_texts)
-            merged_pages.append(best_text)
-        
-        return '\n\n--- Page Break ---\n\n'.join(merged_pages)
-
-    def _find_best_page_text(self, page_texts: List[ExtractedText]) -> str:
-        """Find the best text representation for a single page."""
-        if not page_texts:
-            return ""
-        
-        if len(page_texts) == 1:
-            return page_texts[0].text
-        
-        # Score each text based on length, confidence, and source reliability
-        scored_texts = []
-        for text in page_texts:
-            score = (
-                len(text.text) * 0.4 +  # Length factor
-                text.confidence * 1000 +  # Confidence factor
-                self._get_source_reliability(text.source) * 500  # Source reliability
-            )
-            scored_texts.append((score, text))
-        
-        # Sort by score
-        scored_texts.sort(key=lambda x: x[0], reverse=True)
-        
-        # Take the highest scoring text as base
-        base_text = scored_texts[0][1].text
-        
-        # Try to merge missing content from other sources
-        for score, text in scored_texts[1:]:
-            base_text = self._merge_text_intelligently(base_text, text.text)
-        
-        return base_text
-
-    def _get_source_reliability(self, source: str) -> float:
-        """Get reliability score for different sources."""
-        reliability_scores = {
-            'pdfplumber_detailed': 1.0,
-            'pymupdf_detailed': 0.95,
-            'pdfplumber': 0.9,
-            'pymupdf': 0.85,
-            'pdfminer': 0.8,
-            'camelot': 0.8,
-            'camelot_stream': 0.75,
-            'ocr': 0.5
-        }
-        return reliability_scores.get(source, 0.5)
-
-    def _merge_text_intelligently(self, base_text: str, additional_text: str) -> str:
-        """Merge two text strings, adding missing content from additional_text."""
-        # Simple approach: if additional text has significantly more content,
-        # and it contains most of the base text, use the additional text
-        
-        if len(additional_text) > len(base_text) * 1.5:
-            # Check if base text is mostly contained in additional text
-            base_words = set(base_text.lower().split())
-            additional_words = set(additional_text.lower().split())
-            
-            overlap = len(base_words & additional_words) / len(base_words) if base_words else 0
-            
-            if overlap > 0.7:  # 70% overlap
-                return additional_text
-        
-        return base_text
-
     def _organize_by_page(self, all_texts: List[ExtractedText]) -> Dict[int, List[str]]:
         """Organize extracted text by page number."""
         pages = defaultdict(list)
@@ -500,13 +865,17 @@ class PDFOutlineParser:
             pages[text.page_num].append(f"[{text.source}] {text.text}")
         return dict(pages)
 
-    def _generate_statistics(self, results: Dict[str, ParsingResult]) -> Dict[str, Any]:
+    def _generate_statistics(self, results: Dict[str, ParsingResult], extraction: PageExtraction) -> Dict[str, Any]:
         """Generate statistics about the parsing results."""
         stats = {
             'total_parsers': len(results),
             'successful_parsers': sum(1 for r in results.values() if r.success),
             'failed_parsers': sum(1 for r in results.values() if not r.success),
             'total_text_blocks': sum(len(r.texts) for r in results.values()),
+            'escalated_pages': extraction.escalated_pages,
+            'outline_source': 'bookmarks' if extraction.bookmark_outline else 'fonts',
+            'page_kinds': kind_counts(extraction.page_profiles),
+            'low_quality_pages': [q.page for q in extraction.page_quality if not q.passed],
             'parser_performance': {}
         }
         
@@ -520,118 +889,90 @@ class PDFOutlineParser:
         
         return stats
 
-    def _calculate_quality_score(self, results: Dict[str, ParsingResult]) -> float:
-        """Calculate overall extraction quality score."""
-        if not results:
-            return 0.0
-        
-        successful_parsers = [r for r in results.values() if r.success]
-        if not successful_parsers:
-            return 0.0
-        
-        # Base score on number of successful parsers and text volume
-        base_score = len(successful_parsers) / len(results)
-        
-        # Bonus for high-reliability parsers
-        high_reliability_parsers = ['pdfplumber', 'pymupdf', 'pdfminer']
-        bonus = sum(0.1 for name in high_reliability_parsers 
-                   if name in results and results[name].success)
-        
-        return min(1.0, base_score + bonus)
-
-    def _create_structured_outline(self, pdf_path: Path, all_texts: List[ExtractedText]) -> Dict[str, Any]:
-        """Create structured outline with title and H1/H2/H3 headings."""
-        # Get font-enriched text blocks from PyMuPDF
-        font_blocks: List[Dict[str, Any]] = []
+    def _collect_font_blocks(self, document: DocumentContext, pages: Optional[List[int]] = None) -> SpanTable:
+        """Get font-enriched spans from PyMuPDF (shared page cache) as a columnar table."""
+        builder = SpanTableBuilder()
         try:
-            doc = fitz.open(str(pdf_path))
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                blocks = page.get_text("dict")
-                
-                for block in blocks["blocks"]:
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                if span["text"].strip():
-                                    font_blocks.append({
-                                        'text': span["text"].strip(),
-                                        'font': span["font"],
-                                        'size': span["size"],
-                                        'flags': span["flags"],
-                                        'bbox': span["bbox"],
-                                        'page': page_num + 1,
-                                        'is_bold': ("bold" in span["font"].lower()) or bool(span["flags"] & (1 << 6)) or bool(span["flags"] & (1 << 4)),
-                                        'is_italic': ("italic" in span["font"].lower()) or bool(span["flags"] & (1 << 1))
-                                    })
-            doc.close()
+            for page_num in document.page_numbers if pages is None else pages:
+                builder.add_page(page_num, document.page_dict(page_num))
         except Exception as e:
             self.logger.error(f"Failed to extract font information: {e}")
-            return {'title': 'Untitled Document', 'outline': []}
-        
-        if not font_blocks:
-            return {'title': 'Untitled Document', 'outline': []}
+            return SpanTable.empty()
+        return builder.build()
+
+    def _create_structured_outline(self, font_blocks: SpanTable,
+                                   bookmark_outline: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Create structured outline with title and H1/H2/H3 headings."""
+        if not len(font_blocks):
+            return {'title': 'Untitled Document', 'outline': bookmark_outline or []}
         
         # Analyze fonts to determine body text size
         font_stats = self._analyze_fonts(font_blocks)
-        body_font_size = font_stats.get('body_font_size', 12.0)
         
         # Detect title
         title = self._detect_title_from_blocks(font_blocks, font_stats)
         
-        # Detect headings
-        headings = self._detect_headings_from_blocks(font_blocks, font_stats)
+        # Detect headings (embedded bookmarks make span analysis unnecessary)
+        if bookmark_outline:
+            headings = bookmark_outline
+        else:
+            headings = self._detect_headings_from_blocks(font_blocks, font_stats)
         
         return {
             'title': title,
-            'outline': headings,
-            'font_blocks': font_blocks
+            'outline': headings
         }
     
-    def _analyze_fonts(self, font_blocks: List[Dict]) -> Dict[str, Any]:
+    def _analyze_fonts(self, font_blocks: SpanTable) -> Dict[str, Any]:
         """Analyze font patterns to determine body text characteristics."""
-        if not font_blocks:
+        if not len(font_blocks):
             return {'body_font_size': 12.0}
         
-        # Collect font sizes
-        font_sizes = [block['size'] for block in font_blocks if block['size'] > 0]
+        # Collect font sizes (float64 so thresholds compare like Python floats)
+        font_sizes = font_blocks.size.astype(np.float64)
+        font_sizes = font_sizes[font_sizes > 0]
         
-        if not font_sizes:
+        if not font_sizes.size:
             return {'body_font_size': 12.0}
         
-        # Find most common font size (likely body text)
-        from collections import Counter
-        size_counts = Counter(font_sizes)
-        body_font_size = size_counts.most_common(1)[0][0]
+        # Find most common font size (likely body text); ties go to the
+        # size seen first, as with Counter.most_common
+        sizes, first_seen, counts = np.unique(font_sizes, return_index=True, return_counts=True)
+        tied = np.flatnonzero(counts == counts.max())
+        body_font_size = float(sizes[tied[np.argmin(first_seen[tied])]])
         
         return {
             'body_font_size': body_font_size,
             'font_sizes': font_sizes,
-            'size_distribution': dict(size_counts),
-            'max_size': max(font_sizes),
-            'min_size': min(font_sizes)
+            'size_distribution': dict(zip(sizes.tolist(), counts.tolist())),
+            'max_size': float(sizes[-1]),
+            'min_size': float(sizes[0])
         }
     
-    def _detect_title_from_blocks(self, font_blocks: List[Dict], font_stats: Dict) -> str:
+    def _detect_title_from_blocks(self, font_blocks: SpanTable, font_stats: Dict) -> str:
         """Detect document title from font blocks."""
         # Focus on first page
-        first_page_blocks = [b for b in font_blocks if b['page'] == 1]
+        first_page = font_blocks.page == 1
         
-        if not first_page_blocks:
+        if not first_page.any():
             return "Untitled Document"
         
         body_font_size = font_stats['body_font_size']
         max_font_size = font_stats.get('max_size', body_font_size)
         
         # Find title candidates (large font on first page, upper portion)
+        sizes = font_blocks.size.astype(np.float64)
+        tops = font_blocks.bbox[:, 1].astype(np.float64)
+        mask = (first_page &
+                (sizes >= max(max_font_size * 0.9, body_font_size * 1.3)) &
+                (font_blocks.text_lengths > 3) &
+                (tops < 300))  # Upper portion of page
+        
         title_candidates = []
-        for block in first_page_blocks:
-            if (block['size'] >= max(max_font_size * 0.9, body_font_size * 1.3) and
-                len(block['text']) > 3 and
-                block['bbox'][1] < 300):  # Upper portion of page
-                
-                score = self._calculate_title_score(block, body_font_size)
-                title_candidates.append((block, score))
+        for index in np.flatnonzero(mask):
+            block = font_blocks[index]
+            score = self._calculate_title_score(block, body_font_size)
+            title_candidates.append((block, score))
         
         if title_candidates:
             title_candidates.sort(key=lambda x: (-x[1], x[0]['bbox'][1]))
@@ -664,104 +1005,133 @@ class PDFOutlineParser:
         
         return score
     
-    def _detect_headings_from_blocks(self, font_blocks: List[Dict], font_stats: Dict) -> List[Dict[str, Any]]:
+    def _detect_headings_from_blocks(self, font_blocks: SpanTable, font_stats: Dict) -> List[Dict[str, Any]]:
         """Detect and classify headings from font blocks."""
-        body_font_size = font_stats['body_font_size']
+        indices = self._heading_candidates(font_blocks, font_stats['body_font_size'])
+        
+        # Assign heading levels based on font size
+        return self._assign_heading_levels(font_blocks, indices)
+    
+    def _heading_candidates(self, font_blocks: SpanTable, body_font_size: float) -> np.ndarray:
+        """Indices of spans that qualify as headings for the given body font size."""
         heading_threshold = body_font_size * 1.15  # 15% larger than body
         
-        heading_candidates = []
+        # Size and length filters run over the columns in one pass
+        mask = heading_eligible(font_blocks) & (font_blocks.size.astype(np.float64) >= heading_threshold)
+        indices = np.flatnonzero(mask)
         
-        for block in font_blocks:
-            if (block['size'] >= heading_threshold and
-                len(block['text'].strip()) >= 3 and
-                len(block['text'].strip()) <= 200 and
-                not self._is_page_number(block['text'])):
-                
-                confidence = self._calculate_heading_confidence(block, body_font_size)
-                if confidence >= 0.4:  # Lower threshold for better recall
-                    heading_candidates.append({
-                        'text': block['text'],
-                        'page': block['page'],
-                        'font_size': block['size'],
-                        'is_bold': block['is_bold'],
-                        'confidence': confidence,
-                        'y_position': block['bbox'][1]
-                    })
+        confidence = self._calculate_heading_confidence(font_blocks, indices, body_font_size)
+        indices = indices[confidence >= 0.4]  # Lower threshold for better recall
         
-        # Assign heading levels based on font size
-        return self._assign_heading_levels(heading_candidates)
+        # Page-number check only on the few surviving candidates
+        return np.array([i for i in indices if not self._is_page_number(font_blocks.text_at(i))], dtype=np.int64)
     
-    def _calculate_heading_confidence(self, block: Dict, body_font_size: float) -> float:
-        """Calculate heading confidence score."""
-        score = 0.0
+    def _calculate_heading_confidence(self, font_blocks: SpanTable, indices: np.ndarray,
+                                      body_font_size: float) -> np.ndarray:
+        """Calculate heading confidence scores for the spans at ``indices``."""
+        if not len(indices):
+            return np.zeros(0)
         
         # Font size factor
-        size_ratio = block['size'] / body_font_size
-        if size_ratio > 1.5:
-            score += 0.4
-        elif size_ratio > 1.2:
-            score += 0.3
+        size_ratio = font_blocks.size[indices].astype(np.float64) / body_font_size
+        score = np.where(size_ratio > 1.5, 0.4, np.where(size_ratio > 1.2, 0.3, 0.0))
         
         # Bold bonus
-        if block['is_bold']:
-            score += 0.3
+        score = score + np.where(font_blocks.is_bold[indices], 0.3, 0.0)
         
         # Position (left-aligned more likely)
-        if block['bbox'][0] < 100:
-            score += 0.2
+        score = score + np.where(font_blocks.bbox[indices, 0] < 100, 0.2, 0.0)
         
-        # Pattern matching
-        text = block['text'].lower()
-        if any(pattern in text for pattern in ['chapter', 'section', 'introduction', 'conclusion']):
-            score += 0.3
+        # Pattern matching directly on the shared text buffer
+        text = font_blocks.text
+        bounds = list(zip(font_blocks.offsets[indices].tolist(), font_blocks.offsets[indices + 1].tolist()))
+        keyword = np.fromiter((HEADING_KEYWORD_RE.search(text, a, b) is not None for a, b in bounds),
+                              dtype=bool, count=len(bounds))
+        score = score + np.where(keyword, 0.3, 0.0)
         
         # Numbered headings
-        if re.match(r'^\d+(\.\d+)*\.?\s', block['text']):
-            score += 0.2
+        numbered = np.fromiter((NUMBERED_HEADING_RE.match(text, a, b) is not None for a, b in bounds),
+                               dtype=bool, count=len(bounds))
+        score = score + np.where(numbered, 0.2, 0.0)
         
-        return min(1.0, score)
+        return np.minimum(1.0, score)
     
-    def _assign_heading_levels(self, candidates: List[Dict]) -> List[Dict[str, Any]]:
-        """Assign H1, H2, H3 levels to heading candidates."""
-        if not candidates:
+    def _assign_heading_levels(self, font_blocks: SpanTable, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """Assign H1, H2, H3 levels to heading candidates (span indices)."""
+        if not len(indices):
             return []
         
-        # Sort by confidence and font size
-        candidates.sort(key=lambda x: (-x['font_size'], -x['confidence']))
+        # Cluster font sizes (rounded to 0.1pt) and rank clusters largest first
+        sizes = font_blocks.size[indices].astype(np.float64)
+        distinct_sizes, size_cluster = np.unique(sizes, return_inverse=True)
+        cluster_keys = np.array([round(float(size), 1) for size in distinct_sizes])
+        keys = cluster_keys[size_cluster]
+        level_keys = np.unique(keys)[::-1][:3]  # Only H1, H2, H3
         
-        # Group by font size
-        size_groups = {}
-        for candidate in candidates:
-            size_key = round(candidate['font_size'], 1)
-            if size_key not in size_groups:
-                size_groups[size_key] = []
-            size_groups[size_key].append(candidate)
+        levels = np.full(len(indices), -1)
+        for level_idx, key in enumerate(level_keys):
+            levels[keys == key] = level_idx
         
-        # Assign levels
-        outline = []
-        level_map = {0: "H1", 1: "H2", 2: "H3"}
+        keep = levels >= 0
+        indices, levels = indices[keep], levels[keep]
         
-        for level_idx, (size, group) in enumerate(sorted(size_groups.items(), reverse=True)):
-            if level_idx >= 3:  # Only H1, H2, H3
-                break
-            
-            level = level_map[level_idx]
-            
-            # Sort by page and position
-            group.sort(key=lambda x: (x['page'], x['y_position']))
-            
-            for heading in group:
-                outline.append({
-                    'level': level,
-                    'text': heading['text'],
-                    'page': heading['page']
-                })
-        
-        # Final sort by document order
-        outline.sort(key=lambda x: (x['page'], 
-            next((h['y_position'] for h in candidates 
-                  if h['text'] == x['text'] and h['page'] == x['page']), 0)))
+        # Document order: page, then vertical position, then span order
+        pages = font_blocks.page[indices]
+        tops = font_blocks.bbox[indices, 1]
+        order = np.lexsort((indices, tops, pages))
         
+        level_map = {0: "H1", 1: "H2", 2: "H3"}
+        return [
+            {
+                'level': level_map[int(levels[k])],
+                'text': font_blocks.text_at(indices[k]),
+                'page': int(pages[k])
+            }
+            for k in order
+        ]
+    
+    def _outline_from_bookmarks(self, document: DocumentContext) -> Optional[List[Dict[str, Any]]]:
+        """
+        Map the embedded bookmark tree to the H1/H2/H3 outline schema.
+
+        Returns None (fall back to font heuristics) when bookmarks are
+        disabled, missing, or fail the sanity check: too few entries, too
+        many that do not resolve to a page, too many out of page order, or
+        mostly "Page N" style labels.
+        """
+        if not self.use_bookmarks:
+            return None
+        try:
+            toc = document.toc()
+        except Exception as e:
+            self.logger.warning(f"Could not read bookmarks: {e}")
+            return None
+        
+        entries = [(level, ' '.join(title.split()), page) for level, title, page in toc]
+        entries = [entry for entry in entries if entry[1]]
+        if len(entries) < MIN_BOOKMARKS:
+            return None
+        
+        page_count = document.page_count
+        resolved = [entry for entry in entries if 1 <= entry[2] <= page_count]
+        backward = sum(1 for prev, cur in zip(resolved, resolved[1:]) if cur[2] < prev[2])
+        page_labels = sum(1 for _, text, _ in resolved if self._is_page_number(text))
+        if (len(resolved) < MIN_BOOKMARKS
+                or len(resolved) < len(entries) * (1 - MAX_UNRESOLVED_BOOKMARKS)
+                or backward > len(resolved) * MAX_BACKWARD_BOOKMARKS
+                or page_labels * 2 > len(resolved)):
+            self.logger.info("Embedded bookmarks failed the sanity check; using font heuristics")
+            return None
+        
+        # Only H1-H3 exist in the schema; trees not starting at level 1 are shifted
+        top_level = min(level for level, _, _ in resolved)
+        level_map = {0: "H1", 1: "H2", 2: "H3"}
+        outline = [
+            {'level': level_map[level - top_level], 'text': text, 'page': page}
+            for level, text, page in resolved
+            if level - top_level in level_map
+        ]
+        self.logger.info(f"Using {len(outline)} embedded bookmarks as the outline")
         return outline
     
     def _is_page_number(self, text: str) -> bool:
@@ -772,25 +1142,219 @@ class PDFOutlineParser:
         patterns = [r'^page\s+\d+$', r'^-\s*\d+\s*-$', r'^\d+\s*$']
         return any(re.match(pattern, text.lower()) for pattern in patterns)
     
-    def _extract_tables(self, pdf_path: Path) -> List[Dict[str, Any]]:
-        """Extract tables using pdfplumber."""
-        tables = []
-        try:
-            with pdfplumber.open(str(pdf_path)) as doc:
-                for page_idx, page in enumerate(doc.pages):
-                    page_tables = page.find_tables()
-                    for t_idx, table in enumerate(page_tables):
-                        data = table.extract()
-                        if data:
-                            tables.append({
-                                "page": page_idx + 1,
-                                "index": t_idx,
-                                "data": data
-                            })
-        except Exception as e:
-            self.logger.error(f"Table extraction failed: {e}")
-        
-        return tables
+    def _extract_tables(self, document: DocumentContext,
+                        profiles: Optional[List[PageProfile]] = None) -> List[Dict[str, Any]]:
+        """Extract every table once through the shared TableExtractor (shared handles)."""
+        if not self.enable_tables:
+            return []
+        hints = [profile.table_hint for profile in profiles] if profiles is not None else None
+        return self.table_extractor.extract_tables(document.path, document=document, hints=hints)
+
+
+class OutlineAccumulator:
+    """
+    Incremental outline state for streamed pages.
+
+    Keeps the span-size histogram (for the body font size), the first page's
+    spans (title detection) and, per page, only the spans large enough to be
+    headings under the running body size. `finalise` then gives the same
+    title and outline as `build_outline` over the whole document; pages
+    whose dropped spans would qualify under the final body size are re-read
+    from the document.
+    """
+
+    def __init__(self, parser: PDFOutlineParser):
+        self.parser = parser
+        self.logger = logging.getLogger(__name__)
+        self.page_quality: List[PageQuality] = []
+        self._size_counts: Dict[float, int] = {}  # insertion order = first seen
+        self._span_count = 0
+        self._first_page = SpanTable.empty()
+        self._candidates: Dict[int, SpanTable] = {}
+        self._dropped_max: Dict[int, float] = {}
+        # Validated embedded outline; when set, span heading analysis is skipped
+        self.bookmark_outline: Optional[List[Dict[str, Any]]] = None
+
+    def font_stats(self) -> Dict[str, Any]:
+        """Font statistics over every span added so far (see `_analyze_fonts`)."""
+        if not self._size_counts:
+            return {'body_font_size': 12.0}
+        most = max(self._size_counts.values())
+        body_font_size = next(size for size, n in self._size_counts.items() if n == most)
+        return {
+            'body_font_size': body_font_size,
+            'max_size': max(self._size_counts),
+            'min_size': min(self._size_counts),
+        }
+
+    def add(self, record: PageRecord) -> List[Dict[str, Any]]:
+        """Fold a page (added in page order) into the statistics; returns its candidate headings."""
+        spans = record.spans
+        self.page_quality.append(record.quality)
+        self._span_count += len(spans)
+        if record.page == 1:
+            self._first_page = spans
+
+        sizes = spans.size.astype(np.float64)
+        distinct, first_seen, counts = np.unique(sizes[sizes > 0], return_index=True, return_counts=True)
+        for k in np.argsort(first_seen, kind='stable'):
+            size = float(distinct[k])
+            self._size_counts[size] = self._size_counts.get(size, 0) + int(counts[k])
+
+        if self.bookmark_outline:
+            return [dict(entry) for entry in self.bookmark_outline if entry['page'] == record.page]
+
+        body_font_size = self.font_stats()['body_font_size']
+        eligible = heading_eligible(spans)
+        keep = eligible & (sizes >= body_font_size * 1.15)
+        dropped = eligible & ~keep
+        if dropped.any():
+            self._dropped_max[record.page] = float(sizes[dropped].max())
+        candidates = spans.take(np.flatnonzero(keep))
+        self._candidates[record.page] = candidates
+
+        indices = self.parser._heading_candidates(candidates, body_font_size)
+        return [
+            {'text': candidates.text_at(i), 'page': record.page, 'size': float(candidates.size[i])}
+            for i in indices
+        ]
+
+    def finalise(self, document: Optional[DocumentContext] = None) -> Dict[str, Any]:
+        """Resolve the title and H1-H3 outline over every page added."""
+        if not self._span_count:
+            return {'title': 'Untitled Document', 'outline': self.bookmark_outline or [],
+                    'quality_score': document_quality_score(self.page_quality)}
+
+        font_stats = self.font_stats()
+        if self.bookmark_outline:
+            return {
+                'title': self.parser._detect_title_from_blocks(self._first_page, font_stats),
+                'outline': self.bookmark_outline,
+                'quality_score': document_quality_score(self.page_quality),
+            }
+
+        threshold = font_stats['body_font_size'] * 1.15
+        rescan = sorted(page for page, size in self._dropped_max.items() if size >= threshold)
+        if rescan and document is None:
+            self.logger.warning(f"Body font size shifted; {len(rescan)} pages may miss headings without a document to re-read")
+        elif rescan:
+            self.logger.info(f"Body font size shifted; re-reading spans of {len(rescan)} pages")
+            for page_num in rescan:
+                builder = SpanTableBuilder()
+                builder.add_page(page_num, document.page_dict(page_num))
+                self._candidates[page_num] = builder.build()
+            document.release_pages(rescan)
+
+        candidates = SpanTable.concat([self._candidates[page] for page in sorted(self._candidates)])
+        return {
+            'title': self.parser._detect_title_from_blocks(self._first_page, font_stats),
+            'outline': self.parser._detect_headings_from_blocks(candidates, font_stats),
+            'quality_score': document_quality_score(self.page_quality),
+        }
+
+
+def heading_eligible(font_blocks: SpanTable) -> np.ndarray:
+    """Length filter shared by every heading check (3-200 characters)."""
+    lengths = font_blocks.text_lengths
+    return (lengths >= 3) & (lengths <= 200)
+
+
+def raw_page_texts(results: Dict[str, ParsingResult]) -> Dict[int, str]:
+    """
+    Whole-page text per page from the parser results, for pages that have any.
+
+    pdfminer text is preferred (it is what `RawTextExtractor` would produce),
+    then PyMuPDF (the only source for non-escalated pages in adaptive mode).
+    """
+    pages: Dict[int, str] = {}
+    for source in reversed(RAW_TEXT_SOURCES):
+        result = results.get(source)
+        if result is None or not result.success:
+            continue
+        for text in result.texts:
+            if text.source == source and text.text.strip():
+                pages[text.page_num] = text.text
+    return pages
+
+
+def is_cacheable(outline_data: Dict[str, Any]) -> bool:
+    """False if a parser timed out, since a retry may produce a fuller result."""
+    performance = outline_data.get('statistics', {}).get('parser_performance', {})
+    return not any((p.get('error') or '').startswith('timed out') for p in performance.values())
+
+
+class _ParserPool:
+    """
+    Process pool shared by the `_run_parsers_concurrently` calls of this process.
+
+    Workers are started through `worker_pool.pool_context` (a preloaded fork
+    server by default), never forked from a threaded web server. A pool with a
+    timed-out task is retired: later calls get a fresh pool, and the retired
+    one's workers are terminated when its last user releases it.
+    """
+
+    _lock = threading.Lock()
+    _current: Dict[int, '_ParserPool'] = {}
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.users = 0
+        self.retired = False
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=pool_context(),
+                                            initializer=apply_thread_limits,
+                                            initargs=(max(1, available_cpus() // workers),))
+
+    @classmethod
+    def acquire(cls, workers: int) -> '_ParserPool':
+        with cls._lock:
+            pool = cls._current.get(workers)
+            if pool is None:
+                pool = cls._current[workers] = cls(workers)
+            pool.users += 1
+            return pool
+
+    def release(self, retire: bool = False) -> None:
+        with self._lock:
+            self.users -= 1
+            # A crashed worker breaks the executor for good
+            if (retire or self.executor._broken) and not self.retired:
+                self.retired = True
+                if self._current.get(self.workers) is self:
+                    del self._current[self.workers]
+            finished = self.retired and self.users == 0
+        if finished:
+            _terminate_workers(self.executor)
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _terminate_workers(executor: ProcessPoolExecutor, grace: float = 1.0) -> None:
+    """Kill the worker processes of a pool whose remaining tasks are abandoned."""
+    processes = list((executor._processes or {}).values())
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(grace)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+def _run_parser_in_worker(parser_name: str, pdf_path: Path, data: bytes, pages: Optional[List[int]],
+                          enable_ocr: bool, enable_tables: bool, with_tables: bool = False):
+    """
+    Process-pool entry point: run one parser on a private DocumentContext.
+
+    With ``with_tables`` the tables are extracted from the same context and
+    returned as ``(result, tables)``.
+    """
+    parser = PDFOutlineParser(enable_ocr=enable_ocr, enable_tables=enable_tables, execution_mode='serial')
+    with DocumentContext(pdf_path, data=data, pages=pages) as document:
+        result = parser._run_parser(parser_name, document)
+        if with_tables:
+            return result, parser._extract_tables(document)
+        return result
 
 
 # Usage example and testing
@@ -819,7 +1383,8 @@ if __name__ == "__main__":
     
     print(f"\n=== EXTRACTION RESULTS ===")
     print(f"Quality Score: {result['quality_score']:.2f}")
-    print(f"Total Characters: {len(result['merged_text'])}")
+    merged_text = '\n\n'.join(page['text'] for page in result['raw_text'])
+    print(f"Total Characters: {len(merged_text)}")
     print(f"\n=== PARSER STATISTICS ===")
     
     for parser, stats in result['statistics']['parser_performance'].items():
@@ -827,5 +1392,5 @@ if __name__ == "__main__":
         print(f"{status} {parser}: {stats['text_blocks']} blocks, {stats['execution_time']:.2f}s")
     
     print(f"\n=== MERGED TEXT (first 1000 chars) ===")
-    print(result['merged_text'][:1000])
-    print("..." if len(result['merged_text']) > 1000 else "")
\ No newline at end of file
+    print(merged_text[:1000])
+    print("..." if len(merged_text) > 1000 else "")
\ No newline at end of file
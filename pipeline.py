@@ -3,67 +3,294 @@ pipeline.py
 -----------
 End-to-end document processing pipeline that:
 1. Extracts hierarchical outline via `PDFOutlineParser`
-2. Extracts full raw text via `RawTextExtractor`
+2. Collects full raw text from the outline parsers' per-page output, running
+   `RawTextExtractor` only for pages they left empty
 3. Detects pages with no text and applies OCR fallback via `OCRProcessor`
+   (only to pages the pre-flight classifier found scanned or mixed; pages
+   are rendered individually and recognised in a process pool). Mixed pages
+   that have text only get their text-free image regions OCRed, spliced in
+   at their reading position
 4. Merges everything into a single rich JSON output structure ready for RAG.
+
+Very large documents are split into page-range shards that are extracted on
+separate worker processes; the shards are stitched back together and the
+outline is built once over all spans so heading levels stay consistent.
+
+Results are cached on disk by document content and pipeline configuration
+(see `result_cache.py`), so re-processing an unchanged PDF is a lookup.
+
+`iter_process` streams the same data page by page (NDJSON-friendly events)
+with memory bounded by a window of pages.
 """
 
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
-from parser import PDFOutlineParser
+import fitz  # PyMuPDF
+
+from document_context import DocumentContext
+from parser import PDFOutlineParser, PageExtraction, ParsingResult, OutlineAccumulator, is_cacheable, raw_page_texts
+from page_classifier import PageProfile
 from raw_text_extractor import RawTextExtractor
-from ocr_utils import OCRProcessor
-from table_extractor import TableExtractor
+from ocr_utils import OCR_REGIONS, OCRProcessor, insert_region_text, ocr_regions, tesseract_available
+from result_cache import ResultCache
+from resources import MAX_WORKERS, apply_thread_limits, available_cpus, plan_workers
+
+
+# Documents with at least this many pages are sharded across processes
+SHARD_MIN_PAGES = int(os.environ.get('PIPELINE_SHARD_MIN_PAGES', '200'))
+# Pages per shard (several shards per worker keeps the load balanced)
+SHARD_SIZE = int(os.environ.get('PIPELINE_SHARD_SIZE', '50'))
+
+
+class ShardingDeferred(Exception):
+    """
+    A pool worker was asked to process a document that should be sharded.
+
+    Raised by `DocumentPipeline.process` with ``defer_sharding=True`` inside a
+    daemonic worker, which cannot start shard processes of its own; the
+    caller processes the document in the parent instead.
+    """
 
 
 class DocumentPipeline:
     """High-level façade for processing a PDF through all extractors."""
 
-    def __init__(self, ocr_enabled: bool = True):
+    def __init__(self, ocr_enabled: bool = True, execution_mode: Optional[str] = None,
+                 shard_min_pages: int = SHARD_MIN_PAGES, shard_size: int = SHARD_SIZE,
+                 max_workers: Optional[int] = None, cache: Optional[ResultCache] = None,
+                 ocr_regions: bool = OCR_REGIONS, parser_timeout: Optional[float] = None,
+                 defer_sharding: bool = False):
         self.logger = logging.getLogger(__name__)
-        self.outline_parser = PDFOutlineParser()
+        self.cache = cache if cache is not None else ResultCache()
+        # OCR is the pipeline's own stage (see `_apply_ocr`), not an outline parser
+        self.outline_parser = PDFOutlineParser(enable_ocr=False, execution_mode=execution_mode, cache=self.cache,
+                                               parser_timeout=parser_timeout)
         self.raw_extractor = RawTextExtractor()
         self.ocr_processor = OCRProcessor()
-        self.table_extractor = TableExtractor()
         self.ocr_enabled = ocr_enabled
+        self.ocr_regions = ocr_regions
+        self.shard_min_pages = shard_min_pages
+        self.shard_size = max(1, shard_size)
+        self.max_workers = max_workers or min(available_cpus(), MAX_WORKERS)
+        self.defer_sharding = defer_sharding
 
-    def process(self, pdf_path: Path) -> Dict[str, Any]:
-        """Run the pipeline and return rich JSON output."""
-        # 1. Outline extraction (structure & hierarchy)
-        outline_data = self.outline_parser.extract_outline(pdf_path)
-
-        # 2. Raw text extraction for completeness
-        raw_text_pages = self.raw_extractor.extract(pdf_path)
-
-        tables = self.table_extractor.extract_tables(pdf_path)
-
-        # 4. Identify missing pages text and OCR
-        pages_missing_text: List[int] = [p["page"] for p in raw_text_pages if not p["text"].strip()]
-
-        # Step 3: OCR for pages without text (disabled for now due to tesseract issues)
-        pages_without_text = [page for page in raw_text_pages if not page['text'].strip()]
-        if pages_without_text:
-            self.logger.info(f"OCR would be needed for {len(pages_without_text)} pages without text (skipping OCR)")
-            # OCR disabled - continue without it
-            # try:
-            #     from ocr_utils import OCRProcessor
-            #     ocr = OCRProcessor()
-            #     ocr_results = ocr.process_pdf(pdf_path, [p['page'] for p in pages_without_text])
-            #     
-            #     # Merge OCR results back into raw_text
-            #     ocr_map = {r['page']: r['text'] for r in ocr_results}
-            #     for page in raw_text_pages:
-            #         if page['page'] in ocr_map and not page['text'].strip():
-            #             page['text'] = ocr_map[page['page']]
-            #             
-            # except Exception as e:
-            #     self.logger.warning(f"OCR processing failed: {e}")
-            #     # Continue without OCR
-        return {
+    def _plan_shards(self, page_count: int) -> List[List[int]]:
+        """Split pages into contiguous ranges, or one range if sharding does not apply."""
+        pages = list(range(1, page_count + 1))
+        if page_count < self.shard_min_pages or self.max_workers < 2:
+            return [pages]
+        if multiprocessing.current_process().daemon:
+            # Daemonic pool workers (main.process_pdf_batch) cannot start children
+            if self.defer_sharding:
+                raise ShardingDeferred(f"{page_count} pages: shard outside the worker pool")
+            return [pages]
+        return [pages[i:i + self.shard_size] for i in range(0, page_count, self.shard_size)]
+
+    def process(self, pdf_path: Path, use_cache: bool = True) -> Dict[str, Any]:
+        """Run the pipeline and return rich JSON output (``use_cache=False`` bypasses the result cache)."""
+        # All extractors share one set of open handles and page caches
+        with DocumentContext(pdf_path) as document:
+            cache_key = None
+            if use_cache and self.cache.enabled:
+                cache_key = self.cache.key(document.sha256, 'pipeline', self._cache_config(document))
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.logger.info(f"Result cache hit for: {Path(pdf_path).name}")
+                    return cached
+
+            shards = self._plan_shards(document.page_count)
+            if len(shards) > 1:
+                outline_data, profiles, raw_text_pages, tables = self._process_sharded(document, shards)
+            else:
+                # 1. Outline extraction (structure & hierarchy); cached as a whole below
+                extraction = self.outline_parser.extract_pages(document)
+                outline_data = self.outline_parser.build_outline(extraction)
+                profiles = extraction.page_profiles
+
+                # 2. Raw text, reused from the outline parsers where they found any
+                raw_text_pages = self._raw_text_pages(pdf_path, document, outline_data["parser_results"],
+                                                      profiles=profiles)
+
+                # Tables were extracted once, alongside the outline
+                tables = outline_data.get("tables", [])
+
+            # 3. OCR for scanned / mixed pages still without text
+            ocr_failures = 0
+            if self.ocr_enabled:
+                ocr_failures = self._apply_ocr(pdf_path, document, raw_text_pages, profiles)
+
+        result = {
             "title": outline_data.get("title", "Untitled Document"),
             "outline": outline_data.get("outline", []),
             "raw_text": raw_text_pages,
             "tables": tables
-        }
\ No newline at end of file
+        }
+        if cache_key is not None and is_cacheable(outline_data) and not ocr_failures:
+            self.cache.put(cache_key, result)
+        return result
+
+    def iter_process(self, pdf_path: Path, window: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the pipeline output as events.
+
+        Yields ``{"type": "page", "page", "text", "tables", "headings",
+        "quality"}`` for every page as its window completes, then one
+        ``{"type": "outline", "title", "outline", "quality_score"}`` event once
+        heading levels are resolved. Pages are processed in-process window by
+        window (no sharding, no result cache).
+        """
+        parser = self.outline_parser
+        with DocumentContext(pdf_path) as document:
+            accumulator = OutlineAccumulator(parser)
+            for pages in parser.page_windows(document, window):
+                window_document = document.subset(pages)
+                records = parser.extract_page_records(window_document, accumulator)
+                profiles = [r.profile for r in records if r.profile is not None]
+                raw_text_pages = self._raw_text_pages(
+                    pdf_path, window_document, {}, {r.page: r.raw_text for r in records if r.raw_text is not None},
+                    profiles=profiles)
+                if self.ocr_enabled:
+                    self._apply_ocr(pdf_path, window_document, raw_text_pages, profiles)
+                raw_text = {p["page"]: p["text"] for p in raw_text_pages}
+                document.release_pages(pages)
+
+                for record in records:
+                    yield {
+                        "type": "page",
+                        "page": record.page,
+                        "text": raw_text.get(record.page, ""),
+                        "tables": record.tables,
+                        "headings": record.headings,
+                        "quality": record.quality.score,
+                    }
+
+            outline_data = accumulator.finalise(document)
+        yield {"type": "outline", **outline_data}
+
+    def _raw_text_pages(self, pdf_path: Path, document: DocumentContext, results: Dict[str, ParsingResult],
+                        texts: Optional[Dict[int, str]] = None,
+                        profiles: Optional[List[PageProfile]] = None) -> List[Dict[str, Any]]:
+        """
+        One ``{"page", "text"}`` entry per page in scope.
+
+        Text comes from the outline parsers (``results``, or ready-made
+        ``texts``); only pages without any are sent to `RawTextExtractor`
+        (pdfminer, then pdfplumber fallbacks), and with page ``profiles`` only
+        those that have a text layer at all.
+        """
+        texts = dict(texts) if texts is not None else raw_page_texts(results)
+        no_text_layer = {profile.page for profile in profiles or () if not profile.has_text_layer}
+        missing = [page_num for page_num in document.page_numbers
+                   if page_num not in texts and page_num not in no_text_layer]
+        if missing:
+            self.logger.info(f"Running RawTextExtractor on {len(missing)} pages without parser text")
+            for page in self.raw_extractor.extract(Path(pdf_path), document=document.subset(missing)):
+                texts[page["page"]] = page["text"]
+        return [{"page": page_num, "text": texts.get(page_num, "")} for page_num in document.page_numbers]
+
+    def _apply_ocr(self, pdf_path: Path, document: DocumentContext, raw_text_pages: List[Dict[str, Any]],
+                   profiles: List[PageProfile]) -> int:
+        """
+        OCR the pages that the classifier found scanned or mixed, filling
+        ``raw_text_pages`` in place. Empty pages are OCRed whole; pages with
+        text (with ``ocr_regions``) only in their text-free image regions.
+        Returns the number of pages / regions whose OCR failed (e.g. timed out).
+        """
+        needs_ocr = {profile.page for profile in profiles if profile.needs_ocr}
+        candidates = [page for page in raw_text_pages if page["page"] in needs_ocr]
+        pages = {page["page"]: page for page in candidates if not page["text"].strip()}
+        regions = {}
+        if self.ocr_regions:
+            for page in candidates:
+                if page["page"] not in pages:
+                    rects = ocr_regions(document, page["page"])
+                    if rects:
+                        regions[page["page"]] = rects
+        if not pages and not regions:
+            return 0
+
+        failures = 0
+        if pages:
+            self.logger.info(f"OCR needed for {len(pages)} pages without text")
+            for result in self.ocr_processor.iter_ocr_pages(pdf_path, list(pages), document=document):
+                if "error" in result:
+                    failures += 1
+                elif result["text"].strip():
+                    pages[result["page"]]["text"] = result["text"]
+        if regions:
+            self.logger.info(f"Region OCR for image areas on {len(regions)} pages with text")
+            region_texts = {page_num: [] for page_num in regions}
+            for result in self.ocr_processor.iter_ocr_regions(pdf_path, regions, document=document):
+                if "error" in result:
+                    failures += 1
+                else:
+                    region_texts[result["page"]].append((fitz.Rect(result["bbox"]), result["text"]))
+            for page in candidates:
+                if region_texts.get(page["page"]):
+                    page["text"] = insert_region_text(page["text"], document.page_dict(page["page"]),
+                                                      sorted(region_texts[page["page"]],
+                                                             key=lambda r: (r[0].y0, r[0].x0)))
+        return failures
+
+    def _cache_config(self, document: DocumentContext) -> Dict[str, Any]:
+        """Settings that influence the pipeline output (part of the result cache key)."""
+        return {
+            'outline': self.outline_parser.cache_config(document),
+            'ocr_enabled': self.ocr_enabled,
+            # Results computed without tesseract must not be served once it is installed
+            'ocr': {'dpi': self.ocr_processor.dpi, 'adaptive': self.ocr_processor.adaptive,
+                    'regions': self.ocr_regions, 'available': tesseract_available()} if self.ocr_enabled else None,
+        }
+
+    def _process_sharded(self, document: DocumentContext,
+                         shards: List[List[int]]) -> Tuple[Dict[str, Any], List[PageProfile],
+                                                           List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Extract page shards on worker processes and stitch the results together.
+
+        Returns the outline result, the page profiles, the raw text pages and the tables.
+        """
+        plan = plan_workers(len(shards), self.max_workers)
+        self.logger.info(f"Sharding {document.path.name}: {document.page_count} pages into "
+                         f"{len(shards)} shards on {plan.processes} workers x {plan.threads} threads")
+        parser = self.outline_parser
+        with ProcessPoolExecutor(max_workers=plan.processes, initializer=_init_shard_worker,
+                                 initargs=(document.path, document.data, plan.threads)) as executor:
+            parts = list(executor.map(_extract_shard, shards, repeat(parser.worker_config())))
+
+        # Shards come back in page order; font statistics are computed over
+        # the merged spans so every shard uses the same heading levels.
+        extraction = PageExtraction.merge(parts)
+        outline_data = parser.build_outline(extraction)
+        raw_text_pages = self._raw_text_pages(document.path, document, outline_data["parser_results"],
+                                              profiles=extraction.page_profiles)
+        return outline_data, extraction.page_profiles, raw_text_pages, outline_data["tables"]
+
+
+# Document source shared with every shard worker (set once per process)
+_SHARD_SOURCE: Optional[Tuple[Path, bytes]] = None
+
+
+def _init_shard_worker(pdf_path: Path, data: bytes, threads: int) -> None:
+    global _SHARD_SOURCE
+    _SHARD_SOURCE = (pdf_path, data)
+    apply_thread_limits(threads)
+
+
+def _extract_shard(pages: List[int], config: Dict[str, Any]) -> PageExtraction:
+    """
+    Worker entry point: run every per-page extractor over one page range.
+
+    ``config`` is the parent parser's `PDFOutlineParser.worker_config`, so a
+    shard is extracted exactly as the unsharded document would be.
+    """
+    pdf_path, data = _SHARD_SOURCE
+    parser = PDFOutlineParser(**config, execution_mode='serial', cache=ResultCache(enabled=False))
+    with DocumentContext(pdf_path, data=data, pages=pages) as document:
+        return parser.extract_pages(document)
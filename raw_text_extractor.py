@@ -8,12 +8,14 @@ fails or misses data.
 
 import logging
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from pdfminer.high_level import extract_pages
 from pdfminer.layout import LTTextContainer, LTChar
 import pdfplumber
-from itertools import groupby
+from itertools import groupby, count
+
+from document_context import DocumentContext
 
 
 class RawTextExtractor:
@@ -22,29 +24,37 @@ class RawTextExtractor:
     def __init__(self) -> None:
         self.logger = logging.getLogger(__name__)
 
-    def _extract_with_pdfplumber(self, pdf_path: Path) -> List[Dict[str, Any]]:
+    def _extract_with_pdfplumber(self, document: DocumentContext, pages: List[int]) -> List[Dict[str, Any]]:
         """Secondary extraction using pdfplumber to catch text pdfminer sometimes misses (tiny fonts, rotated)."""
         results: List[Dict[str, Any]] = []
         try:
-            with pdfplumber.open(str(pdf_path)) as doc:
-                for page_idx, page in enumerate(doc.pages):
-                    # Extract raw text including duplicate chars; keep flow.
-                    page_text = page.extract_text(x_tolerance=1, y_tolerance=1) or ""
-                    results.append({"page": page_idx+1, "text": page_text})
+            for page_num in pages:
+                # Extract raw text including duplicate chars; keep flow.
+                page_text = document.plumber_page(page_num).extract_text(x_tolerance=1, y_tolerance=1) or ""
+                results.append({"page": page_num, "text": page_text})
         except Exception as e:
             logging.getLogger(__name__).warning(f"[RawTextExtractor] pdfplumber fallback failed: {e}")
         return results
 
-    def extract(self, pdf_path: Path) -> List[Dict[str, Any]]:
+    def extract(self, pdf_path: Path, document: Optional[DocumentContext] = None) -> List[Dict[str, Any]]:
         """Return a list with one entry per page containing raw text.
 
         Each list item is a dict: {"page": page_number, "text": "..."}
+        A shared `DocumentContext` may be passed to avoid re-reading the file.
         """
+        if document is None:
+            with DocumentContext(pdf_path) as document:
+                return self.extract(pdf_path, document=document)
+
         results: List[Dict[str, Any]] = []
         self.logger.info(f"[RawTextExtractor] Extracting text from {pdf_path.name}")
 
         try:
-            for page_index, page_layout in enumerate(extract_pages(str(pdf_path))):
+            page_numbers = [p - 1 for p in document.page_numbers] if document.is_partial else None
+            layouts = extract_pages(document.stream(), page_numbers=page_numbers)
+            # pdfminer yields only the requested pages, in order
+            page_labels = document.page_numbers if page_numbers is not None else count(1)
+            for page_num, page_layout in zip(page_labels, layouts):
                 page_text_parts: List[str] = []
                 for element in page_layout:
                     if isinstance(element, LTTextContainer):
@@ -53,24 +63,22 @@ class RawTextExtractor:
                         # Rare case where text containers not detected; capture chars
                         page_text_parts.append(element.get_text())
                 page_text = "".join(page_text_parts)
-                results.append({"page": page_index + 1, "text": page_text})
+                results.append({"page": page_num, "text": page_text})
             self.logger.info(f"[RawTextExtractor] Extracted text for {len(results)} pages")
 
             # Fallback pass with pdfplumber for any pages whose text is empty
             missing_pages = [r["page"] for r in results if not r["text"].strip()]
             if missing_pages:
-                plumber_pages = self._extract_with_pdfplumber(pdf_path)
+                plumber_pages = self._extract_with_pdfplumber(document, missing_pages)
                 page_map = {p["page"]: p["text"] for p in plumber_pages}
                 for r in results:
                     if not r["text"].strip() and r["page"] in page_map:
                         r["text"] = page_map[r["page"]]
             # Final sanity: if *still* empty, concatenate char text via pdfplumber char boxes
             empties = [r for r in results if not r["text"].strip()]
-            if empties:
-                with pdfplumber.open(str(pdf_path)) as doc:
-                    for r in empties:
-                        page = doc.pages[r["page"]-1]
-                        r["text"] = "".join(ch["text"] for ch in page.chars)
+            for r in empties:
+                page = document.plumber_page(r["page"])
+                r["text"] = "".join(ch["text"] for ch in page.chars)
 
             return results
         except Exception as e:
@@ -0,0 +1,150 @@
+"""
+resources.py
+------------
+CPU budget planning for worker pools and the thread pools inside them.
+
+`available_cpus` is what the process may actually use: the CPU affinity
+mask, capped by a cgroup CPU quota (v2 ``cpu.max`` or v1
+``cpu.cfs_quota_us``), so a container limited to 2 CPUs on a 64-core host
+plans for 2 rather than `os.cpu_count()`.
+
+`plan_workers` splits that budget between processes and the intra-op
+threads of each process (torch / MKL / OpenBLAS via OpenMP, HuggingFace
+tokenizers, ONNX Runtime and tesseract's OpenMP), so that
+``processes × threads`` never exceeds the budget. Without a plan every
+library starts one thread per core in every worker, and 8 workers on 8
+cores run 64+ busy threads. `apply_thread_limits` is the pool initializer
+that enforces a plan inside each worker.
+
+Configuration (environment):
+    CPU_BUDGET=0             CPUs to plan for (0 = detect, cgroup-aware)
+    MAX_WORKERS=8            upper bound on worker processes
+    THREADS_PER_WORKER=0     intra-op threads per worker (0 = CPUs / workers);
+                             setting it trades processes for threads
+"""
+
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CPU_BUDGET = int(os.environ.get('CPU_BUDGET', '0'))
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', '8'))
+THREADS_PER_WORKER = int(os.environ.get('THREADS_PER_WORKER', '0'))
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+# OpenMP / BLAS thread pools (torch, numpy, tesseract) read these at start-up
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OMP_THREAD_LIMIT', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                   'NUMEXPR_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS')
+
+
+@dataclass(frozen=True)
+class ThreadPlan:
+    """How a CPU budget is split between worker processes and their threads."""
+    cpus: int
+    processes: int
+    threads: int  # intra-op threads per process
+
+
+def _cgroup_v2_limit() -> Optional[float]:
+    """CPU quota of this process's cgroup v2 group (falling back to the root), in CPUs."""
+    candidates = [CGROUP_ROOT / 'cpu.max']
+    try:
+        for line in Path('/proc/self/cgroup').read_text().splitlines():
+            if line.startswith('0::'):
+                candidates.insert(0, CGROUP_ROOT / line[3:].lstrip('/') / 'cpu.max')
+    except OSError:
+        pass
+    for path in candidates:
+        try:
+            quota, period = path.read_text().split()[:2]
+        except (OSError, ValueError):
+            continue
+        return None if quota == 'max' else int(quota) / int(period)
+    return None
+
+
+def _cgroup_v1_limit() -> Optional[float]:
+    try:
+        quota = int((CGROUP_ROOT / 'cpu' / 'cpu.cfs_quota_us').read_text())
+        period = int((CGROUP_ROOT / 'cpu' / 'cpu.cfs_period_us').read_text())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 and period > 0 else None
+
+
+@lru_cache(maxsize=1)
+def available_cpus() -> int:
+    """CPUs this process may use: affinity mask capped by the cgroup quota (or CPU_BUDGET)."""
+    if CPU_BUDGET > 0:
+        return CPU_BUDGET
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_v2_limit() or _cgroup_v1_limit()
+    if quota:
+        # A fractional quota is throttled, not scheduled: round down
+        cpus = min(cpus, max(1, int(quota)))
+    return max(1, cpus)
+
+
+def plan_workers(tasks: int, max_processes: Optional[int] = None, cpus: Optional[int] = None) -> ThreadPlan:
+    """
+    Processes and threads per process for ``tasks`` independent jobs.
+
+    By default one process per task up to the CPU budget (and
+    ``max_processes`` / MAX_WORKERS), with the CPUs left over shared out as
+    intra-op threads. With THREADS_PER_WORKER set, each worker gets that many
+    threads and the number of processes shrinks to fit the budget.
+    """
+    cpus = cpus or available_cpus()
+    cap = max(1, min(max_processes or MAX_WORKERS, MAX_WORKERS))
+    if THREADS_PER_WORKER > 0:
+        threads = min(THREADS_PER_WORKER, cpus)
+        processes = max(1, min(tasks, cap, cpus // threads))
+    else:
+        processes = max(1, min(tasks, cap, cpus))
+        threads = max(1, cpus // processes)
+    return ThreadPlan(cpus=cpus, processes=processes, threads=threads)
+
+
+def apply_thread_limits(threads: int) -> None:
+    """
+    Limit this process's library thread pools to ``threads``.
+
+    Used as the pool initializer in each worker. The environment variables
+    cover libraries that are loaded later, such as torch on first embed and
+    tesseract child processes. torch's intra-op pool is resized directly if
+    torch has already been imported.
+    """
+    threads = max(1, threads)
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    # The tokenizers Rust pool is per process; a single thread means no pool
+    os.environ['TOKENIZERS_PARALLELISM'] = 'true' if threads > 1 else 'false'
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def intra_op_threads() -> int:
+    """Thread count for a library pool created in this process (ONNX Runtime sessions)."""
+    try:
+        return max(1, int(os.environ['OMP_NUM_THREADS']))
+    except (KeyError, ValueError):
+        return available_cpus()
+
+
+if __name__ == "__main__":
+    import json
+
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_WORKERS
+    print(json.dumps({'available_cpus': available_cpus(), 'os_cpu_count': os.cpu_count(),
+                      'plan': plan_workers(tasks).__dict__}, indent=2))
@@ -0,0 +1,220 @@
+"""
+result_cache.py
+---------------
+On-disk, content-addressed cache for extraction results.
+
+Entries are keyed by the SHA-256 of the PDF bytes together with a namespace
+(``outline``, ``pipeline``), the caller's configuration and `CACHE_VERSION`,
+so renaming or re-uploading a file still hits while any change in the bytes,
+the parser settings or the extraction code misses. Results are stored as
+pickles (one file per entry, written atomically) and the cache is kept under
+a byte budget by evicting the least recently used entries; a hit refreshes
+the entry's modification time.
+
+Configuration (environment):
+    RESULT_CACHE=0               disable the cache (bypass)
+    RESULT_CACHE_DIR=...         cache directory (default: .cache/results in the project)
+    RESULT_CACHE_MAX_MB=512      size budget before LRU eviction
+
+Usage:
+    python result_cache.py stats
+    python result_cache.py clear
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Bump when extraction output changes so stale entries are never served
+CACHE_VERSION = 12
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('RESULT_CACHE_DIR', Path(__file__).resolve().parent / '.cache' / 'results'))
+DEFAULT_MAX_BYTES = int(float(os.environ.get('RESULT_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+_ENTRY_SUFFIX = '.pkl'
+
+
+def document_hash(data: bytes) -> str:
+    """SHA-256 hex digest of a document's bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    """Stable digest of a JSON-serialisable configuration dict."""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+@dataclass
+class CacheStats:
+    """Counters for this process plus the current on-disk footprint."""
+    enabled: bool
+    directory: str
+    hits: int
+    misses: int
+    writes: int
+    evictions: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats['hit_rate'] = round(self.hit_rate, 4)
+        return stats
+
+
+class ResultCache:
+    """Size-bounded LRU cache of pickled results in a directory."""
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else DEFAULT_MAX_BYTES
+        if enabled is None:
+            enabled = os.environ.get('RESULT_CACHE', '1') != '0'
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    def key(self, doc_hash: str, namespace: str, config: Dict[str, Any]) -> str:
+        """Cache key for a document digest under ``namespace`` and ``config``."""
+        material = f"{namespace}:{CACHE_VERSION}:{doc_hash}:{config_fingerprint(config)}"
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{_ENTRY_SUFFIX}"
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+    def get(self, key: str) -> Optional[Any]:
+        """Stored value for ``key``, or None on a miss (or when disabled)."""
+        if not self.enabled:
+            return None
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # Truncated or incompatible entry: drop it and recompute
+            self.logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key`` and evict old entries if over budget."""
+        if not self.enabled:
+            return
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_name, path)
+        except Exception as e:
+            self.logger.warning(f"Could not write cache entry {path.name}: {e}")
+            return
+        self.writes += 1
+        self._evict()
+
+    def clear(self) -> int:
+        """Remove every entry; returns the number removed."""
+        removed = 0
+        for path, _, _ in self._entries():
+            if self._remove(path):
+                removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # Eviction / stats
+    # ------------------------------------------------------------------
+    def _entries(self) -> List[Tuple[Path, int, float]]:
+        """(path, size, mtime) of every entry on disk."""
+        entries = []
+        if not self.cache_dir.is_dir():
+            return entries
+        for path in self.cache_dir.glob(f"*/*{_ENTRY_SUFFIX}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        # Oldest first
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                self.evictions += 1
+
+    def _remove(self, path: Path) -> bool:
+        try:
+            path.unlink()
+            return True
+        except OSError:
+            return False
+
+    def stats(self) -> CacheStats:
+        entries = self._entries()
+        return CacheStats(
+            enabled=self.enabled,
+            directory=str(self.cache_dir),
+            hits=self.hits,
+            misses=self.misses,
+            writes=self.writes,
+            evictions=self.evictions,
+            entries=len(entries),
+            size_bytes=sum(size for _, size, _ in entries),
+            max_bytes=self.max_bytes,
+        )
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    cache = ResultCache(enabled=True)
+    if command == 'clear':
+        print(f"Removed {cache.clear()} entries from {cache.cache_dir}")
+    elif command == 'stats':
+        print(json.dumps(cache.stats().to_dict(), indent=2))
+    else:
+        print("Usage: python result_cache.py [stats|clear]")
+        sys.exit(1)
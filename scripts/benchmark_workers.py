@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+benchmark_workers.py
+--------------------
+Measures worker start-up for each `worker_pool.make_pool` strategy: how long
+a fresh worker takes until its first task is ready to parse (imports plus a
+`DocumentPipeline`, and the embedding model with --model), and how much
+memory each worker holds (RSS, and USS = pages not shared with any other
+process, which is what copy-on-write preloading saves).
+
+Every strategy runs in its own interpreter so no imports leak between them.
+
+Usage:
+    python scripts/benchmark_workers.py [--workers 4] [--model]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# (start method, preload)
+STRATEGIES = [
+    ('spawn', False),
+    ('fork', False),
+    ('forkserver', False),
+    ('fork', True),
+    ('forkserver', True),
+]
+
+# Keeps a worker busy after its probe so that every worker reports once
+PROBE_HOLD_SECONDS = 0.5
+
+
+def _probe(args):
+    t0, model = args
+    started = time.time()
+    from pipeline import DocumentPipeline
+    DocumentPipeline()
+    if model:
+        from app.embedder import _get_model
+        _get_model()
+    ready = time.time()
+    import psutil
+    memory = psutil.Process().memory_full_info()
+    time.sleep(PROBE_HOLD_SECONDS)
+    return {
+        'pid': os.getpid(),
+        'start_s': started - t0,
+        'ready_s': ready - t0,
+        'first_task_s': ready - started,
+        'rss_mb': memory.rss / 2 ** 20,
+        'uss_mb': memory.uss / 2 ** 20,
+    }
+
+
+def run_strategy(method: str, workers: int, model: bool) -> dict:
+    """Start one pool and probe each of its workers once (runs in a fresh interpreter)."""
+    from worker_pool import make_pool
+
+    t0 = time.time()
+    with make_pool(workers, preload_model=model, method=method) as pool:
+        probes = pool.map(_probe, [(t0, model)] * workers, chunksize=1)
+    by_pid = {p['pid']: p for p in probes}.values()
+
+    def mean(key):
+        return round(sum(p[key] for p in by_pid) / len(by_pid), 3)
+
+    return {
+        'pool_wall_s': round(time.time() - t0 - PROBE_HOLD_SECONDS, 3),
+        'workers_probed': len(by_pid),
+        'first_task_s': mean('first_task_s'),
+        'ready_s': mean('ready_s'),
+        'rss_mb': mean('rss_mb'),
+        'uss_mb': mean('uss_mb'),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--workers', type=int, default=4)
+    ap.add_argument('--model', action='store_true', help='also load the embedding model in each worker')
+    ap.add_argument('--run', nargs=2, metavar=('METHOD', 'PRELOAD'), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.run:
+        print(json.dumps(run_strategy(args.run[0], args.workers, args.model)))
+        return
+
+    print(f"{'strategy':<22}{'pool wall s':>12}{'first task s':>14}{'ready s':>10}{'RSS MB':>9}{'USS MB':>9}")
+    for method, preload in STRATEGIES:
+        env = dict(os.environ, POOL_PRELOAD='1' if preload else '0')
+        command = [sys.executable, __file__, '--workers', str(args.workers), '--run', method, str(preload)]
+        if args.model:
+            command.append('--model')
+        out = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True)
+        name = f"{method}{' + preload' if preload else ''}"
+        if out.returncode != 0:
+            print(f"{name:<22} failed: {out.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{name:<22}{r['pool_wall_s']:>12.3f}{r['first_task_s']:>14.3f}{r['ready_s']:>10.3f}"
+              f"{r['rss_mb']:>9.1f}{r['uss_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+span_store.py
+-------------
+Compact columnar storage for PyMuPDF text spans.
+
+`SpanTable` replaces the list of per-span dicts previously built for outline
+detection. Numeric attributes live in NumPy arrays (size / flags / bbox /
+page / style flags), font names are interned into a small lookup list, and
+all span texts share a single string buffer addressed by offsets.
+
+The table is internal to outline detection, which runs vectorised over the
+columns. It still behaves like a read-only sequence of span dicts (`len`,
+indexing, iteration), and `to_dicts` converts it back to the plain list the
+parser result exposes as ``text_blocks`` when that is requested.
+
+Note: PyMuPDF reports sizes and bboxes as C floats, so float32 storage is
+lossless.
+"""
+
+from array import array
+from typing import Any, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+
+# PyMuPDF span flag bits
+FLAG_ITALIC = 1 << 1
+FLAG_BOLD = 1 << 4
+# Synthetic-bold bit set by some producers
+FLAG_FAKE_BOLD = 1 << 6
+
+
+class SpanTable:
+    """Columnar table of non-empty text spans in document order."""
+
+    def __init__(self, size: np.ndarray, flags: np.ndarray, bbox: np.ndarray, page: np.ndarray,
+                 font_id: np.ndarray, fonts: List[str], text: str, offsets: np.ndarray):
+        self.size = size          # float32 (n,)
+        self.flags = flags        # int32 (n,)
+        self.bbox = bbox          # float32 (n, 4): x0, y0, x1, y1
+        self.page = page          # int32 (n,), 1-indexed
+        self.font_id = font_id    # int32 (n,), index into `fonts`
+        self.fonts = fonts        # interned font names
+        self.text = text          # all span texts concatenated
+        self.offsets = offsets    # int64 (n + 1,), span i is text[offsets[i]:offsets[i + 1]]
+
+        font_bold = np.array(['bold' in f.lower() for f in fonts], dtype=bool)
+        font_italic = np.array(['italic' in f.lower() for f in fonts], dtype=bool)
+        if len(fonts):
+            self.is_bold = font_bold[font_id] | ((flags & (FLAG_BOLD | FLAG_FAKE_BOLD)) != 0)
+            self.is_italic = font_italic[font_id] | ((flags & FLAG_ITALIC) != 0)
+        else:
+            self.is_bold = np.zeros(0, dtype=bool)
+            self.is_italic = np.zeros(0, dtype=bool)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def empty(cls) -> 'SpanTable':
+        return SpanTableBuilder().build()
+
+    @classmethod
+    def concat(cls, tables: Sequence['SpanTable']) -> 'SpanTable':
+        """Concatenate tables (e.g. page shards) in the given order."""
+        tables = [t for t in tables if len(t)]
+        if not tables:
+            return cls.empty()
+        if len(tables) == 1:
+            return tables[0]
+
+        font_index: Dict[str, int] = {}
+        font_ids = []
+        for table in tables:
+            remap = np.array([font_index.setdefault(f, len(font_index)) for f in table.fonts], dtype=np.int32)
+            font_ids.append(remap[table.font_id])
+        fonts = list(font_index)
+
+        text_parts, offsets, base = [], [np.zeros(1, dtype=np.int64)], 0
+        for table in tables:
+            text_parts.append(table.text)
+            offsets.append(table.offsets[1:] + base)
+            base += len(table.text)
+
+        return cls(
+            size=np.concatenate([t.size for t in tables]),
+            flags=np.concatenate([t.flags for t in tables]),
+            bbox=np.concatenate([t.bbox for t in tables]),
+            page=np.concatenate([t.page for t in tables]),
+            font_id=np.concatenate(font_ids),
+            fonts=fonts,
+            text=''.join(text_parts),
+            offsets=np.concatenate(offsets),
+        )
+
+    def take(self, indices: Sequence[int]) -> 'SpanTable':
+        """New table holding the rows at ``indices`` (in the given order)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        texts = self.texts(indices)
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in texts], out=offsets[1:])
+        return SpanTable(
+            size=self.size[indices],
+            flags=self.flags[indices],
+            bbox=self.bbox[indices],
+            page=self.page[indices],
+            font_id=self.font_id[indices],
+            fonts=self.fonts,
+            text=''.join(texts),
+            offsets=offsets,
+        )
+
+    # ------------------------------------------------------------------
+    # Column helpers
+    # ------------------------------------------------------------------
+    @property
+    def text_lengths(self) -> np.ndarray:
+        """Character length of every span text."""
+        return np.diff(self.offsets)
+
+    def text_at(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def texts(self, indices: Sequence[int]) -> List[str]:
+        return [self.text_at(i) for i in indices]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the table."""
+        arrays = (self.size, self.flags, self.bbox, self.page, self.font_id,
+                  self.offsets, self.is_bold, self.is_italic)
+        return sum(a.nbytes for a in arrays) + len(self.text.encode('utf-8'))
+
+    # ------------------------------------------------------------------
+    # Sequence-of-dicts compatibility
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return int(self.size.shape[0])
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return {
+            'text': self.text_at(index),
+            'font': self.fonts[self.font_id[index]],
+            'size': float(self.size[index]),
+            'flags': int(self.flags[index]),
+            'bbox': [float(v) for v in self.bbox[index]],
+            'page': int(self.page[index]),
+            'is_bold': bool(self.is_bold[index]),
+            'is_italic': bool(self.is_italic[index]),
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Every span as a plain, JSON-serialisable dict."""
+        return list(self)
+
+
+class SpanTableBuilder:
+    """Accumulates spans page by page into compact buffers."""
+
+    def __init__(self):
+        self._size = array('f')
+        self._flags = array('i')
+        self._bbox = array('f')
+        self._page = array('i')
+        self._font_id = array('i')
+        self._fonts: Dict[str, int] = {}
+        self._texts: List[str] = []
+        self._offsets = array('q', [0])
+
+    def add_page(self, page_num: int, page_dict: Dict[str, Any]) -> None:
+        """Add every non-blank span of a PyMuPDF ``get_text("dict")`` page."""
+        for block in page_dict.get("blocks", []):
+            for line in block.get("lines", ()):
+                for span in line["spans"]:
+                    text = span["text"].strip()
+                    if text:
+                        self.add_span(page_num, text, span["font"], span["size"], span["flags"], span["bbox"])
+
+    def add_span(self, page_num: int, text: str, font: str, size: float, flags: int, bbox: Sequence[float]) -> None:
+        self._size.append(size)
+        self._flags.append(flags)
+        self._bbox.extend(bbox)
+        self._page.append(page_num)
+        self._font_id.append(self._fonts.setdefault(font, len(self._fonts)))
+        self._texts.append(text)
+        self._offsets.append(self._offsets[-1] + len(text))
+
+    def build(self) -> SpanTable:
+        return SpanTable(
+            size=np.frombuffer(self._size, dtype=np.float32).copy(),
+            flags=np.frombuffer(self._flags, dtype=np.int32).copy(),
+            bbox=np.frombuffer(self._bbox, dtype=np.float32).reshape(-1, 4).copy(),
+            page=np.frombuffer(self._page, dtype=np.int32).copy(),
+            font_id=np.frombuffer(self._font_id, dtype=np.int32).copy(),
+            fonts=list(self._fonts),
+            text=''.join(self._texts),
+            offsets=np.frombuffer(self._offsets, dtype=np.int64).copy(),
+        )
@@ -0,0 +1,160 @@
+"""
+table_detection.py
+------------------
+Cheap per-page table cues computed from PyMuPDF data, used to decide which
+pages are worth handing to the (slow) table extractors and how.
+
+Two signals are collected for every page:
+
+- ruling lines: horizontal and vertical segments from `page.get_drawings()`
+  (lines, hairline rectangles and the edges of boxes and shaded cells) --
+  bordered tables, suited to camelot's ``lattice`` flavor
+- text grid: rows of the `get_text("dict")` output holding several text
+  lines whose left or right edges line up with other rows -- borderless
+  tables, suited to camelot's ``stream`` flavor
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from document_context import DocumentContext
+
+
+# Segments shorter than this (pt) are glyph decoration, not table rules
+MIN_RULE_LENGTH = 10.0
+# Maximum thickness (pt) of a rule drawn as a line or a filled rectangle
+RULE_TOLERANCE = 1.5
+# A plain box (4 rules) is a frame, not a table
+MIN_TABLE_RULES = 5
+
+# Baselines within this distance (pt) belong to the same text row
+ROW_TOLERANCE = 2.0
+# Column edges within this distance (pt) are considered aligned
+ALIGN_TOLERANCE = 3.0
+# A text grid needs this many aligned columns over this many rows
+MIN_GRID_COLUMNS = 3
+MIN_GRID_ROWS = 3
+
+
+@dataclass
+class TableHint:
+    """Table cues for one page."""
+    page: int
+    horizontal_rules: int
+    vertical_rules: int
+    grid_rows: int
+    # Left edges of the aligned text columns and the bbox (x0, top, x1, bottom)
+    # of the rows taking part in the grid
+    grid_columns: List[float] = field(default_factory=list)
+    grid_bbox: Optional[Tuple[float, float, float, float]] = None
+
+    @property
+    def has_ruling(self) -> bool:
+        return (self.horizontal_rules >= 2 and self.vertical_rules >= 2
+                and self.horizontal_rules + self.vertical_rules >= MIN_TABLE_RULES)
+
+    @property
+    def has_text_grid(self) -> bool:
+        return self.grid_rows >= MIN_GRID_ROWS
+
+    @property
+    def flavor(self) -> Optional[str]:
+        """Suggested camelot flavor, or None if the page shows no table cues."""
+        if self.has_ruling:
+            return 'lattice'
+        if self.has_text_grid:
+            return 'stream'
+        return None
+
+
+def count_ruling_lines(drawings: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Number of (horizontal, vertical) ruling segments in `get_drawings()` output."""
+    horizontal = vertical = 0
+    for drawing in drawings:
+        for item in drawing.get('items', ()):
+            kind = item[0]
+            if kind == 'l':
+                dx, dy = abs(item[2].x - item[1].x), abs(item[2].y - item[1].y)
+                if dy <= RULE_TOLERANCE and dx >= MIN_RULE_LENGTH:
+                    horizontal += 1
+                elif dx <= RULE_TOLERANCE and dy >= MIN_RULE_LENGTH:
+                    vertical += 1
+            elif kind in ('re', 'qu'):
+                rect = item[1] if kind == 're' else item[1].rect
+                if rect.height <= RULE_TOLERANCE and rect.width >= MIN_RULE_LENGTH:
+                    horizontal += 1
+                elif rect.width <= RULE_TOLERANCE and rect.height >= MIN_RULE_LENGTH:
+                    vertical += 1
+                elif rect.width >= MIN_RULE_LENGTH and rect.height >= MIN_RULE_LENGTH:
+                    # Outlined or shaded cell/box: two edges each way
+                    horizontal += 2
+                    vertical += 2
+    return horizontal, vertical
+
+
+def find_text_grid(page_dict: Dict[str, Any]) -> Tuple[int, List[float], Optional[Tuple[float, float, float, float]]]:
+    """
+    Rows of text lines that form an aligned multi-column grid.
+
+    Returns the number of grid rows, the left edges of the aligned columns
+    and the bbox of the grid rows (None when there is no grid).
+    """
+    rows: Dict[int, List[Tuple[float, float, float, float]]] = defaultdict(list)
+    for block in page_dict.get('blocks', ()):
+        for line in block.get('lines', ()):
+            if not any(span['text'].strip() for span in line['spans']):
+                continue
+            x0, y0, x1, y1 = line['bbox']
+            rows[round(y1 / ROW_TOLERANCE)].append((x0, y0, x1, y1))
+
+    multi_column = [lines for lines in rows.values() if len(lines) >= MIN_GRID_COLUMNS]
+    if len(multi_column) < MIN_GRID_ROWS:
+        return 0, [], None
+
+    def left_key(line):
+        return ('l', round(line[0] / ALIGN_TOLERANCE))
+
+    def right_key(line):
+        return ('r', round(line[2] / ALIGN_TOLERANCE))
+
+    # Column edges shared by enough rows
+    edge_rows = Counter(key for lines in multi_column
+                        for key in {k for line in lines for k in (left_key(line), right_key(line))})
+    aligned = {key for key, n in edge_rows.items() if n >= MIN_GRID_ROWS}
+
+    grid_lines = []
+    grid_rows = 0
+    for lines in multi_column:
+        if sum(1 for line in lines if left_key(line) in aligned or right_key(line) in aligned) >= MIN_GRID_COLUMNS:
+            grid_rows += 1
+            grid_lines.extend(lines)
+    if not grid_rows:
+        return 0, [], None
+
+    columns = sorted({min(line[0] for line in grid_lines if left_key(line) == key)
+                      for key in {left_key(line) for line in grid_lines} if key in aligned})
+    bbox = (min(line[0] for line in grid_lines), min(line[1] for line in grid_lines),
+            max(line[2] for line in grid_lines), max(line[3] for line in grid_lines))
+    return grid_rows, columns, bbox
+
+
+def detect_table_hint(page_num: int, page: fitz.Page, page_dict: Dict[str, Any],
+                      drawings: Optional[List[Dict[str, Any]]] = None) -> TableHint:
+    """Table cues for one page (pass ``drawings`` if `get_drawings()` was already called)."""
+    if drawings is None:
+        drawings = page.get_drawings()
+    horizontal, vertical = count_ruling_lines(drawings)
+    grid_rows, grid_columns, grid_bbox = find_text_grid(page_dict)
+    return TableHint(page=page_num, horizontal_rules=horizontal, vertical_rules=vertical,
+                     grid_rows=grid_rows, grid_columns=grid_columns, grid_bbox=grid_bbox)
+
+
+def table_hints(document: DocumentContext) -> List[TableHint]:
+    """Table cues for every page in the document's scope."""
+    return [
+        detect_table_hint(page_num, document.fitz_page(page_num), document.page_dict(page_num))
+        for page_num in document.page_numbers
+    ]
@@ -1,33 +1,148 @@
 """
 table_extractor.py
 ------------------
-Extract table structures from PDFs using pdfplumber's built-in table finder.
-Returns each table as a list-of-lists (rows) preserving cell text order.
+Single table subsystem for the extraction stack: every table of a document
+is extracted once and the same canonical list feeds both the outline result
+and the pipeline output.
+
+Each page gets a strategy from the `table_detection` pre-pass:
+
+- ruled pages -> pdfplumber ``lines`` strategy
+- text-grid pages -> pdfplumber with explicit column lines at the aligned
+  text edges, cropped to the grid
+- other pages -> skipped
+
+Candidate pages where pdfplumber finds nothing are retried with camelot
+(``lattice`` or ``stream`` as suggested) when it is installed. Detections on
+the same page whose bboxes overlap are collapsed to one.
+
+Each table is returned as ``{"page", "index", "bbox", "strategy", "data"}``;
+``bbox`` is (x0, top, x1, bottom) in PDF points and ``data`` a list of rows.
 """
 
 import logging
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
+
+from document_context import DocumentContext
+from table_detection import TableHint, table_hints
+
+# Camelot is an optional fallback
+try:
+    import camelot
+    CAMELOT_AVAILABLE = True
+except ImportError:
+    CAMELOT_AVAILABLE = False
+    logging.warning("Camelot not available - table extraction will be limited")
+
+
+LINES_SETTINGS = {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
+# Share of the smaller table's area two detections must overlap to be duplicates
+DUPLICATE_OVERLAP = 0.5
+# Padding (pt) around a text grid when cropping the page
+GRID_PADDING = 1.0
 
-import pdfplumber
-import io
 
 class TableExtractor:
-    """Extract tables page-by-page."""
+    """Extract each table of a document once, choosing a strategy per page."""
 
-    def __init__(self):
+    def __init__(self, use_camelot: bool = True):
         self.logger = logging.getLogger(__name__)
+        self.use_camelot = use_camelot and CAMELOT_AVAILABLE
+
+    def extract_tables(self, pdf_path: Path, document: Optional[DocumentContext] = None,
+                       hints: Optional[Sequence[TableHint]] = None) -> List[Dict[str, Any]]:
+        """
+        Tables of every page in scope; pass ``hints`` when the table cues were
+        already computed (e.g. by `page_classifier`).
+        """
+        if document is None:
+            with DocumentContext(pdf_path) as document:
+                return self.extract_tables(pdf_path, document=document, hints=hints)
 
-    def extract_tables(self, pdf_path: Path) -> List[Dict[str, Any]]:
         tables: List[Dict[str, Any]] = []
+        candidates: List[TableHint] = []
+        missed: Dict[str, List[int]] = defaultdict(list)
         try:
-            with pdfplumber.open(str(pdf_path)) as doc:
-                for page_idx, page in enumerate(doc.pages):
-                    page_tables = page.find_tables(table_settings={"vertical_strategy":"lines","horizontal_strategy":"lines"})
-                    for t_idx, table in enumerate(page_tables):
-                        data = table.extract()
-                        tables.append({"page": page_idx+1, "index": t_idx, "data": data})
+            if hints is None:
+                hints = table_hints(document)
+            candidates = [hint for hint in hints if hint.flavor is not None]
+            for hint in candidates:
+                found = self._extract_page(document, hint)
+                if not found:
+                    missed[hint.flavor].append(hint.page)
+                tables.extend(found)
+            if self.use_camelot and missed:
+                tables.extend(self._extract_with_camelot(document, missed))
         except Exception as e:
-            self.logger.error(f"[TableExtractor] Failed on {pdf_path.name}: {e}")
-        self.logger.info(f"[TableExtractor] Found {len(tables)} tables")
-        return tables 
\ No newline at end of file
+            self.logger.error(f"[TableExtractor] Failed on {Path(pdf_path).name}: {e}")
+
+        tables = self._deduplicate(tables)
+        self.logger.info(f"[TableExtractor] Found {len(tables)} tables ({len(candidates)} candidate pages)")
+        return tables
+
+    def _extract_page(self, document: DocumentContext, hint: TableHint) -> List[Dict[str, Any]]:
+        """pdfplumber tables for one candidate page."""
+        page = document.plumber_page(hint.page)
+        tables = []
+        if hint.has_ruling:
+            for table in page.find_tables(table_settings=LINES_SETTINGS):
+                tables.append(_table_record(hint.page, table.bbox, 'lines', table.extract()))
+        if not tables and hint.has_text_grid:
+            x0, top, x1, bottom = hint.grid_bbox
+            region = page.crop((max(x0 - GRID_PADDING, page.bbox[0]), max(top - GRID_PADDING, page.bbox[1]),
+                                min(x1 + GRID_PADDING, page.bbox[2]), min(bottom + GRID_PADDING, page.bbox[3])))
+            settings = {
+                "vertical_strategy": "explicit",
+                "explicit_vertical_lines": hint.grid_columns + [region.bbox[2]],
+                "horizontal_strategy": "text",
+            }
+            for table in region.find_tables(table_settings=settings):
+                # The text strategy leaves an empty row between text rows
+                rows = [row for row in table.extract() if any(cell for cell in row)]
+                tables.append(_table_record(hint.page, table.bbox, 'text_grid', rows))
+        return [table for table in tables if table["data"]]
+
+    def _extract_with_camelot(self, document: DocumentContext,
+                              pages_by_flavor: Dict[str, Sequence[int]]) -> List[Dict[str, Any]]:
+        """Camelot tables for candidate pages pdfplumber found nothing on."""
+        tables = []
+        for flavor, pages in pages_by_flavor.items():
+            found = camelot.read_pdf(str(document.path), pages=','.join(map(str, pages)), flavor=flavor)
+            for table in found:
+                page_num = int(table.page)
+                # camelot reports bboxes in PDF space (origin bottom-left)
+                height = document.fitz_page(page_num).rect.height
+                x1, y1, x2, y2 = table._bbox
+                tables.append(_table_record(page_num, (x1, height - y2, x2, height - y1),
+                                            f'camelot_{flavor}', table.df.values.tolist()))
+        return [table for table in tables if table["data"]]
+
+    def _deduplicate(self, tables: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop detections overlapping an earlier one; order by position and renumber per page."""
+        kept: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for table in tables:
+            if not any(_overlap(table["bbox"], other["bbox"]) >= DUPLICATE_OVERLAP for other in kept[table["page"]]):
+                kept[table["page"]].append(table)
+
+        result = []
+        for page_num in sorted(kept):
+            page_tables = sorted(kept[page_num], key=lambda t: (t["bbox"][1], t["bbox"][0]))
+            for t_idx, table in enumerate(page_tables):
+                result.append({"page": page_num, "index": t_idx, **table})
+        return result
+
+
+def _table_record(page_num: int, bbox: Sequence[float], strategy: str, data: List[List[Any]]) -> Dict[str, Any]:
+    return {"page": page_num, "bbox": [round(float(v), 2) for v in bbox], "strategy": strategy, "data": data}
+
+
+def _overlap(a: Sequence[float], b: Sequence[float]) -> float:
+    """Intersection area as a share of the smaller bbox."""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return width * height / smaller if smaller > 0 else 1.0
@@ -0,0 +1,57 @@
+"""
+Shared pytest fixtures: small synthetic PDFs generated with PyMuPDF so the
+extraction tests do not depend on files outside the repository.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+fitz = pytest.importorskip("fitz")
+
+
+@pytest.fixture(autouse=True)
+def _no_result_cache(monkeypatch):
+    """Keep the on-disk caches and a running embedding service out of tests unless a test sets its own."""
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("EMBEDDING_CACHE", "0")
+    monkeypatch.setenv("EMBEDDING_SERVICE", "0")
+
+
+def build_sample_pdf(path: Path, pages: int = 3) -> Path:
+    """Write a PDF with a title, numbered headings, body text and a ruled table."""
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        y = 72
+        if p == 0:
+            page.insert_text((72, y), "Annual Performance Report", fontsize=24, fontname="hebo")
+            y += 40
+        page.insert_text((72, y), f"{p + 1}. Chapter {p + 1} Overview", fontsize=18, fontname="hebo")
+        y += 30
+        for i in range(6):
+            page.insert_text((72, y), f"Body text line {i} on page {p + 1} about results and budget.", fontsize=11)
+            y += 16
+        page.insert_text((72, y), f"{p + 1}.1 Details Section", fontsize=14, fontname="hebo")
+        y += 24
+        for i in range(4):
+            page.insert_text((72, y), f"More content sentence {i}. Travel planning is fun.", fontsize=11)
+            y += 16
+        if p % 2 == 0:
+            for r in range(3):
+                for c in range(3):
+                    rect = fitz.Rect(72 + c * 120, y + r * 20, 72 + (c + 1) * 120, y + (r + 1) * 20)
+                    page.draw_rect(rect, color=(0, 0, 0), width=0.8)
+                    page.insert_text((rect.x0 + 4, rect.y1 - 6), f"R{r}C{c}", fontsize=10)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+@pytest.fixture
+def sample_pdf(tmp_path: Path) -> Path:
+    return build_sample_pdf(tmp_path / "sample.pdf")
@@ -0,0 +1,83 @@
+"""
+Tests for the embedded-bookmark outline fast path.
+"""
+
+import fitz
+
+from document_context import DocumentContext
+from parser import PDFOutlineParser, OutlineAccumulator
+
+
+def _with_toc(pdf_path, toc):
+    doc = fitz.open(str(pdf_path))
+    doc.set_toc(toc)
+    doc.saveIncr()
+    doc.close()
+    return pdf_path
+
+
+def test_bookmarks_become_outline(sample_pdf):
+    _with_toc(sample_pdf, [
+        [1, "Chapter One", 1], [2, "Details", 1], [3, "Deep", 1], [4, "Too deep", 1],
+        [1, "Chapter  Two", 2], [1, "Chapter Three", 3],
+    ])
+    parser = PDFOutlineParser(enable_ocr=False)
+    result = parser.extract_outline(sample_pdf)
+
+    assert result['statistics']['outline_source'] == 'bookmarks'
+    assert result['title'] == "Annual Performance Report"
+    assert result['outline'] == [
+        {'level': 'H1', 'text': "Chapter One", 'page': 1},
+        {'level': 'H2', 'text': "Details", 'page': 1},
+        {'level': 'H3', 'text': "Deep", 'page': 1},
+        {'level': 'H1', 'text': "Chapter Two", 'page': 2},
+        {'level': 'H1', 'text': "Chapter Three", 'page': 3},
+    ]
+
+    with DocumentContext(sample_pdf) as document:
+        accumulator = OutlineAccumulator(parser)
+        records = list(parser.iter_page_records(document, accumulator, window=1))
+        assert accumulator.finalise(document)['outline'] == result['outline']
+    assert [h['text'] for h in records[1].headings] == ["Chapter Two"]
+
+
+def test_unusable_bookmarks_fall_back_to_fonts(sample_pdf):
+    fonts_only = PDFOutlineParser(enable_ocr=False, use_bookmarks=False).extract_outline(sample_pdf)
+    assert fonts_only['statistics']['outline_source'] == 'fonts'
+
+    _with_toc(sample_pdf, [[1, "Page 1", 1], [1, "Page 2", 2], [1, "Page 3", 3]])
+    result = PDFOutlineParser(enable_ocr=False).extract_outline(sample_pdf)
+
+    assert result['statistics']['outline_source'] == 'fonts'
+    assert result['outline'] == fonts_only['outline']
+
+
+def test_bookmarks_skip_span_scan_and_pdfplumber(sample_pdf, monkeypatch):
+    import span_store
+
+    _with_toc(sample_pdf, [[1, "Chapter One", 1], [1, "Chapter Two", 2], [1, "Chapter Three", 3]])
+    span_pages = []
+    add_page = span_store.SpanTableBuilder.add_page
+    monkeypatch.setattr(span_store.SpanTableBuilder, 'add_page',
+                        lambda self, page_num, page_dict: span_pages.append(page_num) or add_page(self, page_num, page_dict))
+
+    result = PDFOutlineParser(enable_ocr=False).extract_outline(sample_pdf)
+
+    assert result['title'] == "Annual Performance Report"
+    assert span_pages == [1]
+    assert result['parser_results']['pdfplumber'].texts == []
+    assert result['tables'] and len(result['raw_text']) == 3
+
+
+def test_streaming_reads_bookmarks_once(sample_pdf, monkeypatch):
+    _with_toc(sample_pdf, [[1, "Chapter One", 1], [1, "Chapter Two", 2], [1, "Chapter Three", 3]])
+    reads = []
+    get_toc = fitz.Document.get_toc
+    monkeypatch.setattr(fitz.Document, 'get_toc', lambda self, *args, **kwargs: reads.append(1) or get_toc(self, *args, **kwargs))
+
+    parser = PDFOutlineParser(enable_ocr=False)
+    with DocumentContext(sample_pdf) as document:
+        accumulator = OutlineAccumulator(parser)
+        assert len(list(parser.iter_page_records(document, accumulator, window=1))) == 3
+        assert [h['text'] for h in accumulator.finalise(document)['outline']][-1] == "Chapter Three"
+    assert len(reads) == 1
@@ -0,0 +1,31 @@
+"""
+Tests for the shared per-document handle and page cache.
+"""
+
+from document_context import DocumentContext
+from parser import PDFOutlineParser
+from raw_text_extractor import RawTextExtractor
+
+
+def test_page_cache_is_reused(sample_pdf):
+    with DocumentContext(sample_pdf) as document:
+        assert document.page_count == 3
+        first = document.page_dict(1)
+        assert document.page_dict(1) is first
+        assert document.page_words(2) is document.page_words(2)
+        assert "Chapter 1" in document.page_text(1)
+    assert not document._handles and not document._page_dicts
+
+
+def test_shared_context_matches_standalone_extraction(sample_pdf):
+    parser = PDFOutlineParser(enable_ocr=False)
+    standalone = parser.extract_outline(sample_pdf)
+
+    with DocumentContext(sample_pdf) as document:
+        shared = parser.extract_outline(sample_pdf, document=document)
+        raw_pages = RawTextExtractor().extract(sample_pdf, document=document)
+
+    assert shared['title'] == standalone['title'] == "Annual Performance Report"
+    assert shared['outline'] == standalone['outline']
+    assert shared['tables'] == standalone['tables']
+    assert [p['page'] for p in raw_pages] == [1, 2, 3]
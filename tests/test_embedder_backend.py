@@ -0,0 +1,95 @@
+"""
+Tests for the embedder backend selection, length-sorted encoding and the
+ONNX encoder's pooling.
+
+The parity test needs onnxruntime, sentence-transformers and the model
+weights and is skipped when any of them is missing.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app import embedder, onnx_backend
+from app.onnx_backend import INT8_FILE, PARITY_FILE, export_ready, mean_pool
+
+
+@pytest.fixture
+def backend_env(monkeypatch):
+    """Reset the lazily chosen backend around a test."""
+    embedder.backend.cache_clear()
+    yield monkeypatch
+    monkeypatch.undo()
+    embedder.backend.cache_clear()
+
+
+class RecordingModel:
+    """Fake model: vector = (word count, truncation length)."""
+    max_seq_length = 256
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        return np.array([[len(t.split()), self.max_seq_length] for t in texts], dtype=np.float32)
+
+
+def test_encode_buckets_by_length_and_keeps_input_order(monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(embedder, '_get_model', lambda: model)
+    monkeypatch.setattr(embedder, 'BATCH_SIZE', 2)
+    texts = ["a b c d e", "a", "a b c", "a b", "a b c d"]
+
+    vectors = embedder._encode(texts, max_seq_length=64)
+    assert model.batches == [["a", "a b"], ["a b c", "a b c d"], ["a b c d e"]]
+    assert vectors[:, 0].tolist() == [5, 1, 3, 2, 4]
+    # Truncation applied for the call only, and never above the model's limit
+    assert set(vectors[:, 1]) == {64} and model.max_seq_length == 256
+    assert embedder._encode(["a"], max_seq_length=1024)[0, 1] == 256
+
+
+def test_no_texts_do_not_load_the_model(monkeypatch):
+    monkeypatch.setattr(embedder, '_get_model', lambda: pytest.fail("model loaded"))
+    vectors = embedder.embed_local([])
+    assert vectors.shape == (0, embedder.EMBEDDING_DIM) and vectors.dtype == np.float32
+
+
+def test_mean_pool_ignores_padding():
+    hidden = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]])
+    assert mean_pool(hidden, np.array([[1, 1, 0]])).tolist() == [[2.0, 3.0]]
+
+
+def test_export_needs_a_passed_parity_check(tmp_path):
+    onnx_dir = tmp_path / "onnx"
+    onnx_dir.mkdir()
+    assert not export_ready(tmp_path)
+    (onnx_dir / INT8_FILE).write_bytes(b"")
+    assert not export_ready(tmp_path)
+    assert export_ready(tmp_path, require_parity=False)
+    (onnx_dir / PARITY_FILE).write_text(json.dumps({"passed": True}))
+    assert export_ready(tmp_path)
+
+
+@pytest.mark.parametrize("setting, runtime, ready, expected", [
+    ("auto", True, True, "onnx"),
+    ("auto", False, True, "torch"),
+    ("auto", True, False, "torch"),
+    ("torch", True, True, "torch"),
+    ("onnx", False, True, "torch"),
+])
+def test_backend_selection(backend_env, setting, runtime, ready, expected):
+    backend_env.setattr(embedder, 'EMBEDDER_BACKEND', setting)
+    backend_env.setattr(onnx_backend, 'runtime_available', lambda: runtime)
+    backend_env.setattr(onnx_backend, 'export_ready', lambda model_dir, require_parity=True: ready)
+    assert embedder.backend() == expected
+
+
+@pytest.mark.skipif(not export_ready(Path(embedder.MODEL_NAME)), reason="no ONNX export of the model")
+def test_onnx_matches_torch():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("sentence_transformers")
+    report = onnx_backend.parity_check(Path(embedder.MODEL_NAME))
+    assert report["passed"], report
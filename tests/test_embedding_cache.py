@@ -0,0 +1,105 @@
+"""
+Tests for the persistent embedding cache and its use in `app.embedder`.
+
+The model is replaced by a deterministic fake encoder that records what it
+is asked to encode.
+"""
+
+import numpy as np
+import pytest
+
+from app import embedder
+from app.embedding_cache import EmbeddingCache, embed_with_cache, existing_caches, normalize_text, text_digest
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, max_seq_length=None):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count(' '), sum(map(ord, t)) % 97] for t in texts], dtype=np.float32)
+
+
+def test_vectors_persist_across_instances(tmp_path):
+    cache = EmbeddingCache("model-a", cache_dir=tmp_path, enabled=True)
+    digests = [text_digest(t) for t in ("alpha", "beta")]
+    cache.put_many(digests, np.array([[1, 2], [3, 4]], dtype=np.float32))
+
+    reopened = EmbeddingCache("model-a", cache_dir=tmp_path, enabled=True)
+    found = reopened.get_many(digests + [text_digest("gamma")])
+    assert set(found) == set(digests)
+    assert found[digests[1]].tolist() == [3, 4]
+    assert (reopened.hits, reopened.misses) == (2, 1)
+    # Another model id is another cache
+    assert EmbeddingCache("model-b", cache_dir=tmp_path, enabled=True).get_many(digests) == {}
+
+
+def test_misses_are_deduplicated_and_encoded_once(tmp_path):
+    encode = FakeEncoder()
+    cache = EmbeddingCache("model-a", cache_dir=tmp_path, enabled=True)
+    texts = ["Travel  tips", "Budget", "Travel tips", "Budget\n"]
+
+    first = embed_with_cache(texts, encode, cache)
+    assert encode.calls == [["Travel tips", "Budget"]]
+    assert first.shape == (4, 3)
+    assert np.array_equal(first[0], first[2]) and np.array_equal(first[1], first[3])
+
+    second = embed_with_cache(texts + ["New heading"], encode, EmbeddingCache("model-a", cache_dir=tmp_path,
+                                                                              enabled=True))
+    assert encode.calls[1:] == [["New heading"]]
+    assert np.array_equal(second[:4], first)
+
+
+def test_size_budget_stops_new_entries(tmp_path):
+    # Room for two 3-dim rows (12 + 16 bytes each)
+    cache = EmbeddingCache("model-a", cache_dir=tmp_path, max_bytes=60, enabled=True)
+    embed_with_cache(["a", "b", "c"], FakeEncoder(), cache)
+    assert cache.stats().entries == 2
+    assert cache.clear() == 2 and cache.stats().entries == 0
+
+
+def test_clear_and_refill_by_another_process_is_noticed(tmp_path):
+    writer = EmbeddingCache("model-a", cache_dir=tmp_path, enabled=True)
+    reader = EmbeddingCache("model-a", cache_dir=tmp_path, enabled=True)
+    old = [text_digest(t) for t in ("alpha", "beta")]
+    writer.put_many(old, np.array([[1, 1], [2, 2]], dtype=np.float32))
+    assert len(reader.get_many(old)) == 2
+
+    # Cleared and refilled with at least as many rows before the reader looks again
+    writer.clear()
+    new = [text_digest(t) for t in ("gamma", "delta", "epsilon")]
+    writer.put_many(new, np.array([[3, 3], [4, 4], [5, 5]], dtype=np.float32))
+
+    assert reader.get_many(old) == {}
+    assert reader.get_many(new[:1])[new[0]].tolist() == [3, 3]
+
+
+def test_existing_caches_finds_every_model_id(tmp_path):
+    # The embedder keys its caches by model, backend and sequence length
+    ids = ["models/m:torch:default", "models/m:torch:128", "models/m:onnx:128"]
+    for model_id in ids:
+        EmbeddingCache(model_id, cache_dir=tmp_path, enabled=True).put_many(
+            [text_digest("alpha")], np.array([[1, 2]], dtype=np.float32))
+
+    caches = existing_caches(tmp_path)
+    assert sorted(cache.model_id for cache in caches) == sorted(ids)
+    assert [cache.clear() for cache in caches] == [1, 1, 1]
+    assert existing_caches(tmp_path) == []
+
+
+def test_embed_texts_uses_the_cache(tmp_path, monkeypatch):
+    encode = FakeEncoder()
+    monkeypatch.setattr(embedder, '_encode', encode)
+    cache = EmbeddingCache("fake", cache_dir=tmp_path, enabled=True)
+    monkeypatch.setattr(embedder, '_get_cache', lambda max_seq_length=None: cache)
+
+    vectors = embedder.embed_texts(["Persona task", "Heading"])
+    assert np.array_equal(embedder.embed(" Persona   task "), vectors[0])
+    assert encode.calls == [["Persona task", "Heading"]]
+
+
+@pytest.mark.parametrize("text, normalized", [("  spaced\tout\n ", "spaced out"), ("cafe\u0301", "caf\u00e9"),
+                                              ("Case Kept", "Case Kept")])
+def test_normalisation_is_whitespace_and_unicode_only(text, normalized):
+    assert normalize_text(text) == normalized
@@ -0,0 +1,226 @@
+"""
+Tests for the local embedding service: micro-batching of concurrent clients,
+the socket protocol, and `app.embedder` using the service or falling back to
+in-process encoding.
+
+The served encoder is a deterministic fake that records its calls.
+"""
+
+import json
+import socket
+import struct
+import threading
+
+import numpy as np
+import pytest
+
+from app import embedder, embedding_service
+from app.embedding_service import (EmbeddingClient, EmbeddingService, ServiceError, make_server, parse_address,
+                                   recv_message, send_message)
+
+
+class FakeEncoder:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, texts, max_seq_length=None):
+        self.calls.append((list(texts), max_seq_length))
+        if self.fail:
+            raise RuntimeError("model exploded")
+        return np.array([[len(t), max_seq_length or 0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """Start a service on a Unix socket (or TCP port) in a thread; returns its address."""
+    running = []
+
+    def start(encoder, tcp=False, **options):
+        service = EmbeddingService(encoder, **options)
+        server = make_server(('127.0.0.1', 0) if tcp else str(tmp_path / 'embed.sock'), service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        running.append((server, service))
+        return server.server_address if tcp else str(tmp_path / 'embed.sock')
+
+    yield start
+    for server, service in running:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+@pytest.fixture
+def service_available(monkeypatch):
+    """Let clients retry the service even if an earlier test marked it unavailable."""
+    monkeypatch.setattr(embedding_service, '_unavailable_until', 0.0)
+    return monkeypatch
+
+
+def test_parse_address():
+    assert parse_address('127.0.0.1:7301') == ('127.0.0.1', 7301)
+    assert parse_address(':7301') == ('127.0.0.1', 7301)
+    assert parse_address('.cache/embedding.sock') == '.cache/embedding.sock'
+    assert parse_address('/run/x:1/embed.sock') == '/run/x:1/embed.sock'
+
+
+@pytest.mark.parametrize('tcp', [False, True])
+def test_concurrent_clients_share_batches(serve, tcp):
+    encoder = FakeEncoder()
+    address = serve(encoder, tcp=tcp, batch_wait_ms=200)
+    clients = 6
+    barrier = threading.Barrier(clients)
+    results = {}
+
+    def run(i):
+        texts = ['x' * (i + 1), 'y' * (i + 10)]
+        barrier.wait()
+        results[i] = EmbeddingClient(address).embed(texts, 64)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i, vectors in results.items():
+        assert vectors.tolist() == [[i + 1, 64], [i + 10, 64]]
+    # Requests arriving within the window were encoded together
+    assert len(encoder.calls) < clients
+    stats = EmbeddingClient(address).stats()
+    assert (stats['requests'], stats['texts'], stats['batches']) == (clients, 2 * clients, len(encoder.calls))
+
+
+def test_sequence_lengths_are_encoded_separately():
+    encoder = FakeEncoder()
+    service = EmbeddingService(encoder, batch_wait_ms=200)
+    try:
+        threads = [threading.Thread(target=service.submit, args=(['a', 'bb'], length)) for length in (None, 128, 128)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        service.close()
+    assert sorted(length or 0 for _, length in encoder.calls) == [0, 128]
+    assert [texts for texts, length in encoder.calls if length == 128] == [['a', 'bb', 'a', 'bb']]
+
+
+def test_encoder_errors_reach_the_client(serve):
+    address = serve(FakeEncoder(fail=True))
+    with pytest.raises(ServiceError, match="model exploded"):
+        EmbeddingClient(address).embed(['a'])
+
+
+def test_embed_texts_uses_the_service(serve, service_available, monkeypatch):
+    encoder = FakeEncoder()
+    service_available.setenv('EMBEDDING_SERVICE', serve(encoder))
+    monkeypatch.setattr(embedder, 'embed_local', lambda *args: pytest.fail("encoded in-process"))
+
+    vectors = embedder.embed_texts(['one', 'three'], embedder.SHORT_SEQ_LENGTH)
+    assert vectors.tolist() == [[3, embedder.SHORT_SEQ_LENGTH], [5, embedder.SHORT_SEQ_LENGTH]]
+    assert encoder.calls == [(['one', 'three'], embedder.SHORT_SEQ_LENGTH)]
+
+
+@pytest.mark.parametrize('failure', ['unreachable', 'server error'])
+def test_embed_texts_falls_back_in_process(serve, service_available, tmp_path, monkeypatch, failure):
+    if failure == 'unreachable':
+        address = str(tmp_path / 'missing.sock')
+    else:
+        address = serve(FakeEncoder(fail=True))
+    service_available.setenv('EMBEDDING_SERVICE', address)
+    local = FakeEncoder()
+    monkeypatch.setattr(embedder, 'embed_local', local)
+
+    assert embedder.embed_texts(['ab']).tolist() == [[2, 0]]
+    # The service is left alone for a while rather than retried on every call
+    assert embedding_service.client() is None
+    embedder.embed_texts(['abc'])
+    assert [texts for texts, _ in local.calls] == [['ab'], ['abc']]
+
+
+def _reply_once(path, reply: bytes):
+    """Unix socket server that answers one request with raw ``reply`` bytes."""
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    listener.listen(1)
+
+    def run():
+        connection, _ = listener.accept()
+        with connection, listener:
+            recv_message(connection)
+            connection.sendall(reply)
+
+    threading.Thread(target=run, daemon=True).start()
+    return str(path)
+
+
+def _frame(header: bytes, payload: bytes = b'') -> bytes:
+    return struct.pack('!II', len(header), len(payload)) + header + payload
+
+
+@pytest.mark.parametrize('reply', [
+    _frame(json.dumps({'shape': [1, 3]}).encode(), b'\0' * 8),     # payload does not match the shape
+    _frame(json.dumps({'shape': [2, 2]}).encode(), b'\0' * 16),    # rows for other texts
+    _frame(json.dumps({'rows': 1}).encode(), b'\0' * 8),           # no shape
+    _frame(b'{not json'),
+    _frame(b'[1, 2]'),
+    b'\0\0',                                                       # truncated
+])
+def test_malformed_replies_fall_back_in_process(service_available, tmp_path, monkeypatch, reply):
+    service_available.setenv('EMBEDDING_SERVICE', _reply_once(tmp_path / 'bad.sock', reply))
+    local = FakeEncoder()
+    monkeypatch.setattr(embedder, 'embed_local', local)
+
+    assert embedder.embed_texts(['ab']).tolist() == [[2, 0]]
+    assert embedding_service.client() is None
+
+
+def test_service_disabled_or_absent(monkeypatch, tmp_path):
+    monkeypatch.setattr(embedding_service, 'DEFAULT_SOCKET', tmp_path / 'embedding.sock')
+    monkeypatch.setenv('EMBEDDING_SERVICE', '')
+    assert embedding_service.configured_address() is None
+    (tmp_path / 'embedding.sock').touch()
+    assert embedding_service.configured_address() == str(tmp_path / 'embedding.sock')
+    monkeypatch.setenv('EMBEDDING_SERVICE', '0')
+    assert embedding_service.configured_address() is None
+
+
+def test_stale_socket_is_replaced_but_a_live_one_is_not(serve, tmp_path):
+    stale = tmp_path / 'stale.sock'
+    stale.touch()
+    service = EmbeddingService(FakeEncoder())
+    make_server(str(stale), service).server_close()
+
+    address = serve(FakeEncoder())
+    with pytest.raises(RuntimeError, match="already listening"):
+        make_server(address, service)
+    service.close()
+
+
+def test_malformed_requests_get_an_error_reply(serve):
+    encoder = FakeEncoder()
+    address = serve(encoder)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(address)
+        for header in ({'texts': ['a']}, {'op': 'embed'}, {'op': 'embed', 'texts': 'abc'},
+                       {'op': 'embed', 'texts': [1, 2]}, {'op': 'embed', 'texts': ['a'], 'max_seq_length': 'x'}):
+            send_message(sock, header)
+            reply, _ = recv_message(sock)
+            assert 'error' in reply, header
+        # The connection and the batching thread survive
+        send_message(sock, {'op': 'embed', 'texts': ['abc']})
+        reply, payload = recv_message(sock)
+    assert reply == {'shape': [1, 2]} and np.frombuffer(payload, dtype=np.float32).tolist() == [3, 0]
+    assert encoder.calls == [(['abc'], None)]
+
+
+def test_non_loopback_hosts_are_refused_unless_allowed():
+    service = EmbeddingService(FakeEncoder())
+    try:
+        with pytest.raises(ValueError, match="non-loopback"):
+            make_server(parse_address('0.0.0.0:0'), service)
+        make_server(parse_address('localhost:0'), service).server_close()
+        make_server(parse_address('0.0.0.0:0'), service, allow_remote=True).server_close()
+    finally:
+        service.close()
@@ -0,0 +1,198 @@
+"""
+Tests for page-exact OCR rendering, the OCR process pool and the pipeline OCR stage.
+
+tesseract itself is replaced by a fake that reports the rendered image size,
+so the tests check which page each result belongs to.
+"""
+
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import fitz
+import pytest
+from PIL import Image
+
+import ocr_utils
+from document_context import DocumentContext
+from ocr_utils import (MAX_DPI, MIN_DPI, OCRProcessor, adaptive_dpi, glyph_height, insert_region_text,
+                       ocr_regions, render_page_raster)
+from result_cache import ResultCache
+from page_classifier import PAGE_MIXED, classify_pages
+from pipeline import DocumentPipeline
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    def image_to_string(path, lang=None, config='', timeout=0):
+        with Image.open(path) as image:
+            assert image.format == 'PPM'  # PIL's name for the PGM family
+            image.load()
+        if image.width == 1:
+            raise RuntimeError("Tesseract process timeout")
+        return f"{image.width}x{image.height}"
+
+    monkeypatch.setattr(ocr_utils, 'tesseract_available', lambda: True)
+    monkeypatch.setattr(ocr_utils.pytesseract, 'image_to_string', image_to_string)
+
+
+def _sized_pdf(path, widths):
+    doc = fitz.open()
+    for width in widths:
+        doc.new_page(width=width, height=100)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_raster_is_grayscale_over_the_pixmap_buffer(tmp_path):
+    pdf_path = _sized_pdf(tmp_path / "sized.pdf", [72, 144, 216])
+    with DocumentContext(pdf_path) as document:
+        raster = render_page_raster(document, 2, dpi=72)
+        pgm = io.BytesIO()
+        raster.write_pgm(pgm)
+        image = Image.open(io.BytesIO(pgm.getvalue()))
+        assert (image.mode, image.size) == ('L', (144, 100))
+        assert image.tobytes() == bytes(raster.samples)
+        assert pgm.getvalue().endswith(bytes(raster.samples))
+        assert raster.detached().pixmap is None
+
+
+def test_modules_import_without_pytesseract():
+    script = ("import sys; sys.modules['pytesseract'] = None; "
+              "import ocr_utils, pipeline, parser; "
+              "assert not ocr_utils.tesseract_available() and not parser.OCR_AVAILABLE; "
+              "raster = ocr_utils.PageRaster(page=1, dpi=72, width=1, height=1, stride=1, samples=b'\\0'); "
+              "print(ocr_utils._ocr_page_image(raster, 'eng', '', 1)['error'])")
+    output = subprocess.run([sys.executable, '-c', script], cwd=Path(__file__).resolve().parent.parent,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "pytesseract not installed"
+
+
+def test_adaptive_dpi_follows_glyph_size(tmp_path):
+    text_pdf = tmp_path / "text.pdf"
+    doc = fitz.open()
+    page = doc.new_page()
+    for i in range(20):
+        page.insert_text((72, 72 + 20 * i), "Small print line of scanned text", fontsize=8)
+    doc.save(text_pdf)
+    # Same page as an image only (a scan)
+    scan = fitz.open()
+    scanned = scan.new_page()
+    scanned.insert_image(scanned.rect, pixmap=doc[0].get_pixmap(dpi=200))
+    scan_pdf = tmp_path / "scan.pdf"
+    scan.save(scan_pdf)
+    doc.close()
+    scan.close()
+
+    with DocumentContext(text_pdf) as document:
+        assert glyph_height(document, 1) == 8
+    with DocumentContext(scan_pdf) as document:
+        assert 6 <= glyph_height(document, 1) <= 10
+    assert adaptive_dpi(8, 300) == 288
+    assert adaptive_dpi(2, 300) == MAX_DPI
+    assert adaptive_dpi(40, 300) == MIN_DPI
+    assert adaptive_dpi(None, 300) == 300
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_results_are_keyed_by_requested_page(tmp_path, fake_tesseract, workers):
+    pdf_path = _sized_pdf(tmp_path / "sized.pdf", [72 * n for n in range(1, 8)])
+    results = OCRProcessor(dpi=72, max_workers=workers).ocr_pages(pdf_path, [6, 2])
+    assert results == [{"page": 2, "text": "144x100"}, {"page": 6, "text": "432x100"}]
+
+
+def test_page_failures_are_reported_per_page(tmp_path, fake_tesseract):
+    pdf_path = _sized_pdf(tmp_path / "sized.pdf", [1, 72])
+    results = OCRProcessor(dpi=72, max_workers=1).ocr_pages(pdf_path, [1, 2])
+    assert results[0]["page"] == 1 and "timeout" in results[0]["error"]
+    assert results[1] == {"page": 2, "text": "72x100"}
+
+
+def test_repeated_renderings_are_served_from_the_cache(tmp_path, fake_tesseract, monkeypatch):
+    calls = []
+    image_to_string = ocr_utils.pytesseract.image_to_string
+    monkeypatch.setattr(ocr_utils.pytesseract, 'image_to_string',
+                        lambda path, **kwargs: calls.append(Image.open(path).size) or image_to_string(path, **kwargs))
+    pdf_path = _sized_pdf(tmp_path / "sized.pdf", [72, 144, 72, 1])
+    cache = ResultCache(cache_dir=tmp_path / "ocr", enabled=True)
+
+    first = OCRProcessor(dpi=72, max_workers=1, cache=cache).ocr_pages(pdf_path, [1, 2, 3, 4])
+    # Page 3 renders exactly like page 1; the failed page 4 is not cached
+    assert calls == [(72, 100), (144, 100), (1, 100)]
+    assert [r["text"] for r in first[:3]] == ["72x100", "144x100", "72x100"]
+
+    calls.clear()
+    second = OCRProcessor(dpi=72, max_workers=1, cache=cache).ocr_pages(pdf_path, [1, 2, 3, 4])
+    assert calls == [(1, 100)]
+    assert second == first
+    assert OCRProcessor(dpi=72, max_workers=1, lang="deu", cache=cache).ocr_pages(pdf_path, [2])
+    assert calls[-1] == (144, 100)
+
+
+def test_pipeline_ocrs_only_scanned_pages(sample_pdf, tmp_path, fake_tesseract):
+    pdf_path = tmp_path / "scanned.pdf"
+    doc = fitz.open(sample_pdf)
+    scanned = doc.new_page(width=200, height=100)
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 40, 20), False)
+    pix.clear_with(200)
+    scanned.insert_image(scanned.rect, pixmap=pix)
+    doc.new_page()  # blank: nothing to OCR
+    doc.save(pdf_path)
+    doc.close()
+
+    pipeline = DocumentPipeline()
+    pipeline.ocr_processor = OCRProcessor(dpi=72, max_workers=1)
+    raw_text = pipeline.process(pdf_path)['raw_text']
+
+    assert raw_text[3] == {"page": 4, "text": "200x100"}
+    assert raw_text[4] == {"page": 5, "text": ""}
+    assert "on page 1" in raw_text[0]["text"]
+
+
+def _mixed_pdf(path):
+    """Text above and below a 300x100pt figure, plus a captioned photo and a logo."""
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=500)
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 30, 10), False)
+    pix.clear_with(220)
+    page.insert_text((50, 80), "Introduction paragraph before the figure", fontsize=11)
+    page.insert_image(fitz.Rect(50, 100, 350, 200), pixmap=pix)  # figure: OCR region
+    page.insert_text((50, 240), "Discussion paragraph after the figure", fontsize=11)
+    page.insert_image(fitz.Rect(50, 300, 350, 400), pixmap=pix)  # photo with text on top
+    page.insert_text((60, 350), "Caption printed over the photo", fontsize=11)
+    page.insert_image(fitz.Rect(370, 20, 390, 40), pixmap=pix)  # logo: too small
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_regions_are_text_free_image_areas(tmp_path):
+    with DocumentContext(_mixed_pdf(tmp_path / "mixed.pdf")) as document:
+        assert ocr_regions(document, 1) == [fitz.Rect(50, 100, 350, 200)]
+
+
+def test_region_text_is_inserted_at_reading_position(tmp_path):
+    with DocumentContext(_mixed_pdf(tmp_path / "mixed.pdf")) as document:
+        page_dict = document.page_dict(1)
+        text = "Introduction paragraph before the figure\nDiscussion paragraph after the figure\n"
+        merged = insert_region_text(text, page_dict, [(fitz.Rect(50, 100, 350, 200), "Figure 1: sales\n")])
+        assert merged.splitlines() == ["Introduction paragraph before the figure", "Figure 1: sales",
+                                       "Discussion paragraph after the figure"]
+        # Nothing below the region: appended
+        assert insert_region_text(text, page_dict, [(fitz.Rect(50, 440, 350, 490), "Footer stamp")]
+                                  ).splitlines()[-1] == "Footer stamp"
+
+
+def test_pipeline_ocrs_only_image_regions_of_mixed_pages(tmp_path, fake_tesseract):
+    pdf_path = _mixed_pdf(tmp_path / "mixed.pdf")
+    pipeline = DocumentPipeline(ocr_regions=True)
+    pipeline.ocr_processor = OCRProcessor(dpi=72, max_workers=1, adaptive=False)
+    with DocumentContext(pdf_path) as document:
+        assert classify_pages(document)[0].kind == PAGE_MIXED
+    lines = [line.strip() for line in pipeline.process(pdf_path)["raw_text"][0]["text"].splitlines() if line.strip()]
+
+    # Only the 300x100pt figure was rendered, and its text sits between the paragraphs
+    figure = lines.index("300x100")
+    assert "before the figure" in lines[figure - 1] and "after the figure" in lines[figure + 1]
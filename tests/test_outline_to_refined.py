@@ -0,0 +1,79 @@
+"""
+Tests for collection-wide embedding batching in `OutlineToRefinedProcessor`.
+
+The model is a fake whose vectors depend on a few keywords, so rankings are
+predictable and every `encode` call is recorded.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from app import embedder
+from app.embedder import EmbeddingPlan
+from app.outline_to_refined_processor import OutlineToRefinedProcessor
+
+KEYWORDS = ("beach", "food", "museum")
+
+
+class FakeModel:
+    max_seq_length = 256
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.calls.append(list(texts))
+        return np.array([[t.lower().count(k) + 0.01 for k in KEYWORDS] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(embedder, '_get_model', lambda: model)
+    return model
+
+
+def _outline_json(path, documents):
+    path.write_text(json.dumps({
+        "persona": "Travel planner",
+        "job_to_be_done": "Find the beach",
+        "outlines": documents,
+    }))
+    return path
+
+
+def test_collection_is_embedded_in_two_batches(tmp_path, model):
+    documents = [
+        {"document": f"doc{d}.pdf",
+         "outline": [{"text": "Beach days", "page": 1}, {"text": "Food markets", "page": 2},
+                     {"text": "Museum tours", "page": 2}],
+         "raw_text": [{"page": 1, "text": "Go to the beach. Eat food. The beach is warm."},
+                      {"page": 2, "text": "Museum entry is free. Street food is cheap."}]}
+        for d in range(4)
+    ]
+    out = OutlineToRefinedProcessor().generate_refined_output(
+        _outline_json(tmp_path / "outline.json", documents), tmp_path / "refined.json")
+
+    # Task + distinct headings, then distinct sentences of the top pages
+    assert len(model.calls) == 2
+    assert len(model.calls[0]) == 4
+    assert len(model.calls[1]) == len(set(model.calls[1])) == 5
+    sections = [s for s in out["extracted_sections"] if s["document"] == "doc0.pdf"]
+    assert [s["section_title"] for s in sections][0] == "Beach days"
+    assert "beach" in out["subsection_analysis"][0]["refined_text"].split(". ")[0]
+    assert json.loads((tmp_path / "refined.json").read_text()) == out
+
+
+def test_plan_encodes_only_new_texts(model):
+    plan = EmbeddingPlan()
+    plan.add(["beach", "food", "beach"])
+    plan.encode()
+    plan.add(["food", "museum"])
+    plan.encode()
+    plan.encode()
+    assert [sorted(call) for call in model.calls] == [["beach", "food"], ["museum"]]
+    assert plan.matrix(["museum", "beach"]).argmax(axis=1).tolist() == [2, 0]
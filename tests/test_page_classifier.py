@@ -0,0 +1,70 @@
+"""
+Tests for the pre-flight page classifier and parser routing.
+"""
+
+import fitz
+
+from document_context import DocumentContext
+from page_classifier import classify_pages
+from parser import PDFOutlineParser
+
+
+def _image(page, rect):
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 40, 40), False)
+    pix.clear_with(180)
+    page.insert_image(rect, pixmap=pix)
+
+
+def _build_mixed_pdf(sample_pdf, path):
+    doc = fitz.open(sample_pdf)  # pages 1-3: ruled table, text, ruled table
+    scanned = doc.new_page()
+    _image(scanned, scanned.rect)
+    mixed = doc.new_page()
+    mixed.insert_text((72, 72), "A caption above a large photograph of the site.", fontsize=11)
+    _image(mixed, fitz.Rect(72, 100, 500, 500))
+    logo = doc.new_page()
+    logo.insert_text((72, 120), "Body text of a normal report page next to a small logo.", fontsize=11)
+    _image(logo, fitz.Rect(500, 20, 560, 60))
+    doc.new_page()  # blank
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_pages_are_classified(sample_pdf, tmp_path):
+    pdf_path = _build_mixed_pdf(sample_pdf, tmp_path / "mixed.pdf")
+    with DocumentContext(pdf_path) as document:
+        profiles = classify_pages(document)
+
+    assert [p.kind for p in profiles] == ['vector', 'text', 'vector', 'scanned', 'mixed', 'text', 'blank']
+    assert [p.page for p in profiles if p.needs_ocr] == [4, 5]
+    assert [p.page for p in profiles if not p.has_text_layer] == [4, 7]
+    assert [p.page for p in profiles if p.has_table_cues] == [1, 3]
+
+
+def test_parsers_only_see_routed_pages(sample_pdf, tmp_path):
+    pdf_path = _build_mixed_pdf(sample_pdf, tmp_path / "mixed.pdf")
+    parser = PDFOutlineParser(enable_ocr=False)
+    with DocumentContext(pdf_path) as document:
+        profiles = {p.page: p for p in classify_pages(document)}
+        assert parser._route('ocr', document, profiles).page_numbers == [4, 5]
+        assert parser._route('pdfplumber', document, profiles).page_numbers == [1, 2, 3, 5, 6]
+        assert parser._route('pymupdf', document, profiles) is document
+        assert parser._route('ocr', document.subset([1, 2]), profiles) is None
+
+        extraction = parser.extract_pages(document)
+
+    plumber_pages = {t.page_num for t in extraction.results['pdfplumber'].texts}
+    assert plumber_pages <= {1, 2, 3, 5, 6}
+    assert {t['page'] for t in extraction.tables} == {1, 3}
+
+
+def test_page_profiles_stay_out_of_the_outline_result(sample_pdf, tmp_path):
+    import json
+
+    pdf_path = _build_mixed_pdf(sample_pdf, tmp_path / "mixed.pdf")
+    result = PDFOutlineParser(enable_ocr=False).extract_outline(pdf_path)
+
+    assert 'page_profiles' not in result
+    assert result['statistics']['page_kinds']['scanned'] == 1
+    json.dumps({key: value for key, value in result.items() if key != 'parser_results'})
@@ -0,0 +1,177 @@
+"""
+Tests for concurrent parser execution inside PDFOutlineParser.extract_outline.
+"""
+
+import threading
+import time
+
+import pytest
+
+from parser import PDFOutlineParser
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_concurrent_modes_match_serial(sample_pdf, mode):
+    serial = PDFOutlineParser(enable_ocr=False).extract_outline(sample_pdf)
+    concurrent = PDFOutlineParser(enable_ocr=False, execution_mode=mode).extract_outline(sample_pdf)
+
+    for key in ('title', 'outline', 'raw_text', 'tables'):
+        assert concurrent[key] == serial[key]
+    assert list(concurrent['parser_results']) == list(serial['parser_results'])
+
+
+def test_parser_timeout_marks_parser_failed(sample_pdf):
+    parser = PDFOutlineParser(enable_ocr=False, execution_mode='thread', parser_timeout={'pdfminer': 0.2})
+    slow = parser.parsers['pdfminer']
+    parser.parsers['pdfminer'] = lambda document: (time.sleep(1.0), slow(document))[1]
+
+    result = parser.extract_outline(sample_pdf)
+
+    assert not result['parser_results']['pdfminer'].success
+    assert 'timed out' in result['parser_results']['pdfminer'].error
+    assert result['parser_results']['pymupdf'].success
+
+
+def test_timed_out_parser_process_is_terminated(sample_pdf, monkeypatch):
+    import multiprocessing
+    import parser as parser_module
+
+    psutil = pytest.importorskip("psutil")
+    # Forked workers inherit the patched parser; a fresh pool is forked for this test
+    monkeypatch.setattr(parser_module, 'pool_context', lambda: multiprocessing.get_context('fork'))
+    monkeypatch.setattr(parser_module._ParserPool, '_current', {})
+    monkeypatch.setattr(PDFOutlineParser, '_extract_with_pdfminer', lambda self, document: time.sleep(60))
+    parser = PDFOutlineParser(enable_ocr=False, execution_mode='process', parser_timeout={'pdfminer': 0.5})
+
+    def live_children():
+        return {child.pid for child in psutil.Process().children(recursive=True)
+                if child.is_running() and child.status() != psutil.STATUS_ZOMBIE}
+
+    before = live_children()
+    start = time.time()
+    result = parser.extract_outline(sample_pdf)
+
+    assert 'timed out' in result['parser_results']['pdfminer'].error
+    assert time.time() - start < 30
+    assert not live_children() - before
+
+
+def test_process_mode_reuses_one_pool(sample_pdf, monkeypatch):
+    import parser as parser_module
+
+    monkeypatch.setattr(parser_module._ParserPool, '_current', {})
+    parser = PDFOutlineParser(enable_ocr=False, execution_mode='process')
+    parser.extract_outline(sample_pdf, use_cache=False)
+    pools = dict(parser_module._ParserPool._current)
+    parser.extract_outline(sample_pdf, use_cache=False)
+
+    assert parser_module._ParserPool._current == pools and len(pools) == 1
+    assert next(iter(pools.values())).users == 0
+
+
+def test_thread_mode_reads_page_count_before_dispatch(sample_pdf, monkeypatch):
+    from document_context import DocumentContext
+
+    main_thread = threading.get_ident()
+    fitz_doc = DocumentContext.fitz_doc.fget
+    touched = []
+
+    def tracking_fitz_doc(self):
+        touched.append(threading.get_ident())
+        return fitz_doc(self)
+
+    monkeypatch.setattr(DocumentContext, 'fitz_doc', property(tracking_fitz_doc))
+    parser = PDFOutlineParser(enable_ocr=False, execution_mode='thread')
+    with DocumentContext(sample_pdf) as document:
+        parser.extract_outline(sample_pdf, document=document, use_cache=False)
+        threads_on_shared = {ident for ident in touched if ident != main_thread}
+
+    # Only the pymupdf parser (which owns the fitz handle) used it off the main thread
+    assert len(threads_on_shared) <= 1
+
+
+def test_unknown_execution_mode_rejected():
+    with pytest.raises(ValueError):
+        PDFOutlineParser(execution_mode='gpu')
+
+
+def test_sharded_pipeline_matches_single_pass(tmp_path):
+    from conftest import build_sample_pdf
+    from pipeline import DocumentPipeline
+
+    pdf = build_sample_pdf(tmp_path / "long.pdf", pages=9)
+    single = DocumentPipeline(shard_min_pages=1000).process(pdf)
+    sharded = DocumentPipeline(shard_min_pages=4, shard_size=4, max_workers=2).process(pdf)
+
+    assert sharded == single
+    assert [p['page'] for p in sharded['raw_text']] == list(range(1, 10))
+
+
+@pytest.mark.parametrize("setting", [{'adaptive': True}, {'use_bookmarks': False}])
+def test_sharded_pipeline_keeps_parser_settings(tmp_path, setting):
+    from conftest import build_sample_pdf
+    from pipeline import DocumentPipeline
+
+    pdf = build_sample_pdf(tmp_path / "long.pdf", pages=9)
+    single = DocumentPipeline(shard_min_pages=1000)
+    sharded = DocumentPipeline(shard_min_pages=4, shard_size=4, max_workers=2)
+    for pipeline in (single, sharded):
+        for name, value in setting.items():
+            setattr(pipeline.outline_parser, name, value)
+
+    assert sharded.process(pdf) == single.process(pdf)
+
+
+def test_batch_defers_large_documents_and_keeps_input_order(tmp_path, monkeypatch):
+    import functools
+    import multiprocessing
+
+    import main
+    import pipeline as pipeline_module
+    from conftest import build_sample_pdf
+    from resources import ThreadPlan
+
+    pdfs = [build_sample_pdf(tmp_path / "a.pdf", pages=2), build_sample_pdf(tmp_path / "large.pdf", pages=9),
+            build_sample_pdf(tmp_path / "c.pdf", pages=3)]
+    monkeypatch.chdir(tmp_path)
+    # Forked workers see the lowered shard threshold
+    monkeypatch.setattr(main, 'DocumentPipeline', functools.partial(
+        pipeline_module.DocumentPipeline, shard_min_pages=4, shard_size=4, max_workers=2))
+    monkeypatch.setattr(main, 'plan_workers', lambda tasks: ThreadPlan(cpus=2, processes=2, threads=1))
+    monkeypatch.setattr(main, 'make_pool', lambda processes, **kwargs: multiprocessing.get_context('fork').Pool(
+        processes, **kwargs))
+    sharded = []
+    process_sharded = pipeline_module.DocumentPipeline._process_sharded
+    monkeypatch.setattr(pipeline_module.DocumentPipeline, '_process_sharded',
+                        lambda self, document, shards: sharded.append(document.path.name)
+                        or process_sharded(self, document, shards))
+
+    results = main.process_pdf_batch(pdfs, tmp_path / "out")
+
+    assert [(name, ok) for name, ok, _ in results] == [("a.pdf", True), ("large.pdf", True), ("c.pdf", True)]
+    # The large document came back from the pool and was sharded in this process
+    assert sharded == ["large.pdf"]
+    assert (tmp_path / "out" / "large.json").exists()
+
+
+def test_defer_sharding_only_applies_in_pool_workers(tmp_path):
+    import multiprocessing
+
+    from conftest import build_sample_pdf
+    from pipeline import DocumentPipeline
+
+    pdf = build_sample_pdf(tmp_path / "long.pdf", pages=9)
+    pipeline = DocumentPipeline(shard_min_pages=4, shard_size=4, max_workers=2, defer_sharding=True)
+    with multiprocessing.get_context('fork').Pool(1) as pool:
+        assert pool.apply(_deferred, (pipeline, pdf))
+    assert pipeline.process(pdf)['raw_text']
+
+
+def _deferred(pipeline, pdf):
+    from pipeline import ShardingDeferred
+
+    try:
+        pipeline.process(pdf)
+    except ShardingDeferred:
+        return True
+    return False
@@ -0,0 +1,66 @@
+"""
+Tests for raw text reuse between the outline parsers and the pipeline.
+"""
+
+import fitz
+
+from document_context import DocumentContext
+from pipeline import DocumentPipeline
+from raw_text_extractor import RawTextExtractor
+
+
+def _words(text):
+    return text.split()
+
+
+def test_raw_text_reuses_parser_pages(sample_pdf, monkeypatch):
+    expected = RawTextExtractor().extract(sample_pdf)
+    pipeline = DocumentPipeline(ocr_enabled=False)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("RawTextExtractor should not run when every page has parser text")
+
+    monkeypatch.setattr(pipeline.raw_extractor, 'extract', fail)
+    raw_text = pipeline.process(sample_pdf)['raw_text']
+
+    assert [p['page'] for p in raw_text] == [p['page'] for p in expected]
+    assert [_words(p['text']) for p in raw_text] == [_words(p['text']) for p in expected]
+
+
+def _spy_on_raw_extractor(pipeline, monkeypatch):
+    calls = []
+    extract = pipeline.raw_extractor.extract
+
+    def spy(pdf_path, document=None):
+        calls.append(document.page_numbers)
+        return extract(pdf_path, document=document)
+
+    monkeypatch.setattr(pipeline.raw_extractor, 'extract', spy)
+    return calls
+
+
+def test_blank_pages_are_not_sent_to_raw_text_extractor(sample_pdf, tmp_path, monkeypatch):
+    pdf_path = tmp_path / "with_blank.pdf"
+    doc = fitz.open(sample_pdf)
+    doc.new_page(pno=1)  # blank page 2
+    doc.save(pdf_path)
+    doc.close()
+
+    pipeline = DocumentPipeline(ocr_enabled=False)
+    calls = _spy_on_raw_extractor(pipeline, monkeypatch)
+    raw_text = pipeline.process(pdf_path)['raw_text']
+
+    assert calls == []
+    assert [p['page'] for p in raw_text] == [1, 2, 3, 4]
+    assert raw_text[1]['text'] == ""
+
+
+def test_raw_text_extractor_fills_pages_without_parser_text(sample_pdf, monkeypatch):
+    pipeline = DocumentPipeline(ocr_enabled=False)
+    calls = _spy_on_raw_extractor(pipeline, monkeypatch)
+    with DocumentContext(sample_pdf) as document:
+        raw_text = pipeline._raw_text_pages(sample_pdf, document, {}, texts={1: "parser text"})
+
+    assert calls == [[2, 3]]
+    assert raw_text[0] == {'page': 1, 'text': "parser text"}
+    assert "on page 3" in raw_text[2]['text']
@@ -0,0 +1,68 @@
+"""
+Tests for the CPU budget planner: cgroup quota detection, the split between
+processes and threads, and the per-worker thread limits.
+"""
+
+import os
+
+import pytest
+
+import resources
+from resources import THREAD_ENV_VARS, apply_thread_limits, plan_workers
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    monkeypatch.setattr(resources, 'CGROUP_ROOT', tmp_path)
+    monkeypatch.setattr(resources, 'CPU_BUDGET', 0)
+    resources.available_cpus.cache_clear()
+    yield tmp_path
+    resources.available_cpus.cache_clear()
+
+
+def test_cgroup_v2_quota_caps_cpus(cgroup, monkeypatch):
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(16)), raising=False)
+    assert resources.available_cpus() == 16
+    (cgroup / 'cpu.max').write_text("250000 100000\n")
+    resources.available_cpus.cache_clear()
+    assert resources.available_cpus() == 2
+    (cgroup / 'cpu.max').write_text("max 100000\n")
+    resources.available_cpus.cache_clear()
+    assert resources.available_cpus() == 16
+
+
+def test_cgroup_v1_quota_caps_cpus(cgroup, monkeypatch):
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(16)), raising=False)
+    (cgroup / 'cpu').mkdir()
+    (cgroup / 'cpu' / 'cpu.cfs_quota_us').write_text("50000")
+    (cgroup / 'cpu' / 'cpu.cfs_period_us').write_text("100000")
+    assert resources.available_cpus() == 1
+
+
+@pytest.mark.parametrize("tasks, threads_per_worker, expected", [
+    (20, 0, (8, 1)),   # one thread per worker when there is a job per CPU
+    (3, 0, (3, 2)),    # fewer jobs: the spare CPUs become threads
+    (1, 0, (1, 8)),
+    (20, 2, (4, 2)),   # fixed threads per worker: fewer processes
+    (20, 16, (1, 8)),
+])
+def test_plan_fits_the_budget(monkeypatch, tasks, threads_per_worker, expected):
+    monkeypatch.setattr(resources, 'THREADS_PER_WORKER', threads_per_worker)
+    plan = plan_workers(tasks, cpus=8)
+    assert (plan.processes, plan.threads) == expected
+    assert plan.processes * plan.threads <= plan.cpus
+
+
+def test_plan_respects_max_workers(monkeypatch):
+    monkeypatch.setattr(resources, 'MAX_WORKERS', 4)
+    assert plan_workers(20, cpus=16).processes == 4
+    assert plan_workers(20, max_processes=2, cpus=16).processes == 2
+
+
+def test_thread_limits_reach_the_environment(monkeypatch):
+    for var in THREAD_ENV_VARS + ('TOKENIZERS_PARALLELISM',):
+        monkeypatch.setenv(var, "64")
+    apply_thread_limits(1)
+    assert {os.environ[var] for var in THREAD_ENV_VARS} == {"1"}
+    assert os.environ['TOKENIZERS_PARALLELISM'] == 'false'
+    assert resources.intra_op_threads() == 1
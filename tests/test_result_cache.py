@@ -0,0 +1,72 @@
+"""
+Tests for the content-addressed result cache.
+"""
+
+from parser import PDFOutlineParser
+from pipeline import DocumentPipeline
+from result_cache import ResultCache
+
+
+def test_outline_served_from_cache_on_second_call(sample_pdf, tmp_path):
+    cache = ResultCache(tmp_path / "cache", enabled=True)
+    parser = PDFOutlineParser(enable_ocr=False, cache=cache)
+
+    first = parser.extract_outline(sample_pdf)
+    # Same bytes under another name still hit
+    copy = tmp_path / "renamed.pdf"
+    copy.write_bytes(sample_pdf.read_bytes())
+    second = parser.extract_outline(copy)
+
+    assert second['outline'] == first['outline'] and second['title'] == first['title']
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.writes, stats.entries) == (1, 1, 1, 1)
+
+    parser.extract_outline(sample_pdf, use_cache=False)
+    assert cache.stats().hits == 1
+
+    # Configuration is part of the key
+    PDFOutlineParser(enable_ocr=False, enable_tables=False, cache=cache).extract_outline(sample_pdf)
+    assert cache.stats().entries == 2
+
+
+def test_pipeline_cache_and_lru_eviction(sample_pdf, tmp_path):
+    cache = ResultCache(tmp_path / "cache", enabled=True)
+    pipeline = DocumentPipeline(ocr_enabled=False, cache=cache)
+    result = pipeline.process(sample_pdf)
+    assert pipeline.process(sample_pdf) == result
+    assert cache.hits == 1
+
+    cache.max_bytes = 0
+    cache.put("0" * 64, {"filler": True})
+    assert cache.stats().entries == 0 and cache.evictions == 2
+
+
+def test_disabled_cache_is_a_bypass(tmp_path):
+    cache = ResultCache(tmp_path / "cache", enabled=False)
+    cache.put("ab" * 32, 1)
+    assert cache.get("ab" * 32) is None
+    assert not (tmp_path / "cache").exists()
+
+
+def test_default_cache_locations_do_not_follow_the_working_directory(tmp_path):
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    project = Path(__file__).resolve().parent.parent
+    env = {k: v for k, v in os.environ.items()
+           if k not in ('RESULT_CACHE_DIR', 'OCR_CACHE_DIR', 'EMBEDDING_CACHE_DIR', 'EMBEDDING_SERVICE_SOCKET')}
+    env['PYTHONPATH'] = str(project)
+    script = ("import result_cache, ocr_utils; from app import embedding_cache, embedding_service; "
+              "print(result_cache.DEFAULT_CACHE_DIR, ocr_utils.OCR_CACHE_DIR, "
+              "embedding_cache.DEFAULT_CACHE_DIR, embedding_service.DEFAULT_SOCKET, sep='\\n')")
+    output = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True).stdout
+
+    assert [Path(line) for line in output.split()] == [
+        project / '.cache' / 'results',
+        project / '.cache' / 'ocr',
+        project / '.cache' / 'embeddings',
+        project / '.cache' / 'embedding.sock',
+    ]
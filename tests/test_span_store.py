@@ -0,0 +1,102 @@
+"""
+Tests for the columnar span table used by outline detection.
+"""
+
+from document_context import DocumentContext
+from span_store import SpanTable, SpanTableBuilder
+
+
+def _table(spans):
+    builder = SpanTableBuilder()
+    for page, text, font, size, flags, bbox in spans:
+        builder.add_span(page, text, font, size, flags, bbox)
+    return builder.build()
+
+
+def test_rows_round_trip_as_dicts():
+    table = _table([
+        (1, "Title", "Helvetica-Bold", 24.0, 0, (72.0, 40.5, 300.0, 70.25)),
+        (2, "body", "Times-Italic", 11.0, 0, (72.0, 100.0, 200.0, 112.0)),
+    ])
+    assert len(table) == 2
+    assert table[0] == {
+        'text': "Title", 'font': "Helvetica-Bold", 'size': 24.0, 'flags': 0,
+        'bbox': [72.0, 40.5, 300.0, 70.25], 'page': 1, 'is_bold': True, 'is_italic': False,
+    }
+    assert table[-1]['is_italic'] and table[-1]['page'] == 2
+    assert list(table.text_lengths) == [5, 4]
+
+
+def test_concat_remaps_fonts_and_offsets():
+    a = _table([(1, "alpha", "F1", 10.0, 16, (0, 0, 1, 1))])
+    b = _table([(2, "beta", "F2", 12.0, 0, (0, 0, 1, 1)), (2, "gamma", "F1", 10.0, 0, (0, 0, 1, 1))])
+    merged = SpanTable.concat([a, SpanTable.empty(), b])
+
+    assert [row['text'] for row in merged] == ["alpha", "beta", "gamma"]
+    assert [row['font'] for row in merged] == ["F1", "F2", "F1"]
+    assert merged.fonts == ["F1", "F2"]
+    assert merged[0]['is_bold'] and not merged[2]['is_bold']
+
+
+def test_builder_reads_page_dicts(sample_pdf):
+    with DocumentContext(sample_pdf) as document:
+        builder = SpanTableBuilder()
+        for page_num in document.page_numbers:
+            builder.add_page(page_num, document.page_dict(page_num))
+        table = builder.build()
+
+    assert table[0]['text'] == "Annual Performance Report"
+    assert set(table.page.tolist()) == {1, 2, 3}
+    assert table.nbytes() < 100 * len(table)
+
+
+def test_headings_levelled_and_ordered_by_position():
+    from parser import PDFOutlineParser
+
+    table = _table([
+        (2, "2. Results", "Helvetica-Bold", 16.0, 0, (72.0, 80.0, 300.0, 96.0)),
+        (1, "Body text that is clearly not a heading", "Helvetica", 11.0, 0, (72.0, 120.0, 400.0, 131.0)),
+        (1, "2.1 Detail", "Helvetica-Bold", 13.0, 0, (72.0, 200.0, 300.0, 213.0)),
+        (1, "1. Introduction", "Helvetica-Bold", 16.0, 0, (72.0, 60.0, 300.0, 76.0)),
+        (1, "More body text for the font statistics", "Helvetica", 11.0, 0, (72.0, 140.0, 400.0, 151.0)),
+        (2, "Closing body paragraph on the last page", "Helvetica", 11.0, 0, (72.0, 120.0, 400.0, 131.0)),
+    ])
+    parser = PDFOutlineParser(enable_ocr=False, enable_tables=False)
+    headings = parser._detect_headings_from_blocks(table, parser._analyze_fonts(table))
+
+    assert [(h['text'], h['level'], h['page']) for h in headings] == [
+        ("1. Introduction", "H1", 1),
+        ("2.1 Detail", "H2", 1),
+        ("2. Results", "H1", 2),
+    ]
+
+
+def test_outline_text_blocks_are_opt_in_plain_dicts(sample_pdf):
+    import json
+    from parser import PDFOutlineParser
+
+    assert 'text_blocks' not in PDFOutlineParser(enable_ocr=False, enable_tables=False).extract_outline(sample_pdf)
+    result = PDFOutlineParser(enable_ocr=False, enable_tables=False,
+                              include_text_blocks=True).extract_outline(sample_pdf)
+
+    blocks = result['text_blocks']
+    assert isinstance(blocks, list) and isinstance(blocks[0], dict)
+    assert blocks[0]['text'] == "Annual Performance Report"
+    assert isinstance(blocks[0]['bbox'], list)
+    json.dumps(blocks)
+
+
+def test_default_outline_result_stays_compact(tmp_path):
+    """Without text_blocks no per-span dicts survive extraction, so results stay small."""
+    import pickle
+    from conftest import build_sample_pdf
+    from parser import PDFOutlineParser
+
+    pdf = build_sample_pdf(tmp_path / "long.pdf", pages=40)
+    compact = PDFOutlineParser(enable_ocr=False, enable_tables=False).extract_outline(pdf)
+    expanded = PDFOutlineParser(enable_ocr=False, enable_tables=False,
+                                include_text_blocks=True).extract_outline(pdf)
+
+    span_dicts = len(pickle.dumps(expanded['text_blocks']))
+    assert len(pickle.dumps(compact)) < len(pickle.dumps(expanded)) - span_dicts / 2
+    assert span_dicts > 2 * len(pickle.dumps(compact['raw_text']))
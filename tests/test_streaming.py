@@ -0,0 +1,57 @@
+"""
+Tests for the page-by-page streaming extraction API.
+"""
+
+from document_context import DocumentContext
+from parser import PDFOutlineParser, OutlineAccumulator
+from pipeline import DocumentPipeline
+
+
+def test_streamed_outline_matches_batch(sample_pdf):
+    parser = PDFOutlineParser(enable_ocr=False)
+    batch = parser.extract_outline(sample_pdf)
+
+    with DocumentContext(sample_pdf) as document:
+        accumulator = OutlineAccumulator(parser)
+        records = list(parser.iter_page_records(document, accumulator, window=2))
+        final = accumulator.finalise(document)
+        assert not document._page_dicts  # windows release their cached pages
+
+    assert [r.page for r in records] == [1, 2, 3]
+    assert final['title'] == batch['title']
+    assert final['outline'] == batch['outline']
+    assert sum(len(r.tables) for r in records) == len(batch['tables'])
+    assert any(h['text'] == "1. Chapter 1 Overview" for h in records[0].headings)
+
+
+def test_pipeline_iter_process_events(sample_pdf):
+    pipeline = DocumentPipeline(ocr_enabled=False)
+    expected = pipeline.process(sample_pdf)
+    events = list(pipeline.iter_process(sample_pdf, window=1))
+
+    pages, outline = events[:-1], events[-1]
+    assert [e['type'] for e in pages] == ['page'] * 3
+    assert [{'page': e['page'], 'text': e['text']} for e in pages] == expected['raw_text']
+    assert [t for e in pages for t in e['tables']] == expected['tables']
+    assert outline['type'] == 'outline'
+    assert (outline['title'], outline['outline']) == (expected['title'], expected['outline'])
+
+
+def test_main_writes_the_same_document_when_streaming(sample_pdf, tmp_path, monkeypatch):
+    import json
+    import main
+
+    monkeypatch.chdir(tmp_path)  # main.py also writes output2/ under the working directory
+    documents = {}
+    for streaming in (False, True):
+        monkeypatch.setattr(main, 'STREAM_OUTPUT', streaming)
+        output_dir = tmp_path / f"out-{streaming}"
+        assert main.process_single_pdf(sample_pdf, output_dir)[1]
+        documents[streaming] = (json.loads((tmp_path / "output2" / "sample.json").read_text()),
+                                json.loads((output_dir / "sample.json").read_text()))
+
+    assert documents[True] == documents[False]
+    full, _ = documents[True]
+    assert set(full) == {'title', 'outline', 'raw_text', 'tables'}
+    assert len(full['raw_text']) == 3 and full['tables']
+    assert (tmp_path / "out-True" / "sample.pages.ndjson").exists()
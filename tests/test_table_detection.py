@@ -0,0 +1,37 @@
+"""
+Tests for the PyMuPDF table pre-pass.
+"""
+
+import fitz
+
+from document_context import DocumentContext
+from table_detection import table_hints
+
+
+def test_ruled_pages_suggest_lattice(sample_pdf):
+    with DocumentContext(sample_pdf) as document:
+        hints = table_hints(document)
+
+    # The sample draws a ruled 3x3 table on odd pages only
+    assert [h.flavor for h in hints] == ['lattice', None, 'lattice']
+    assert hints[0].horizontal_rules >= 2 and hints[0].vertical_rules >= 2
+
+
+def test_aligned_text_suggests_stream_and_frames_are_ignored(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page()
+    for r in range(4):
+        for x in (72, 200, 330):
+            page.insert_text((x, 100 + r * 14), f"cell {r}", fontsize=10)
+    page = doc.new_page()
+    page.draw_rect(fitz.Rect(50, 50, 550, 750))
+    for i in range(10):
+        page.insert_text((72, 100 + i * 14), "A single column of running text.", fontsize=11)
+    path = tmp_path / "grid.pdf"
+    doc.save(str(path))
+
+    with DocumentContext(path) as document:
+        hints = table_hints(document)
+
+    assert [h.flavor for h in hints] == ['stream', None]
+    assert hints[0].grid_rows == 4
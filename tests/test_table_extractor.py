@@ -0,0 +1,45 @@
+"""
+Tests for the unified table engine.
+"""
+
+import fitz
+
+from pipeline import DocumentPipeline
+from table_extractor import TableExtractor
+
+
+def test_tables_extracted_once_and_shared(sample_pdf):
+    result = DocumentPipeline(ocr_enabled=False).process(sample_pdf)
+
+    assert [(t['page'], t['index'], t['strategy']) for t in result['tables']] == [(1, 0, 'lines'), (3, 0, 'lines')]
+    assert result['tables'][0]['data'] == [['R0C0', 'R0C1', 'R0C2'], ['R1C0', 'R1C1', 'R1C2'], ['R2C0', 'R2C1', 'R2C2']]
+    x0, top, x1, bottom = result['tables'][0]['bbox']
+    assert x0 < x1 and top < bottom
+
+
+def test_text_grid_page_uses_column_edges(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 60), "A paragraph above the table that should stay out of it.", fontsize=11)
+    for r in range(4):
+        for c, x in enumerate((72, 200, 330)):
+            page.insert_text((x, 100 + r * 14), f"item {r}{c}", fontsize=10)
+    path = tmp_path / "grid.pdf"
+    doc.save(str(path))
+
+    tables = TableExtractor(use_camelot=False).extract_tables(path)
+
+    assert len(tables) == 1 and tables[0]['strategy'] == 'text_grid'
+    assert tables[0]['data'] == [[f"item {r}{c}" for c in range(3)] for r in range(4)]
+
+
+def test_overlapping_detections_are_collapsed():
+    extractor = TableExtractor(use_camelot=False)
+    tables = extractor._deduplicate([
+        {'page': 1, 'bbox': [10, 100, 200, 300], 'strategy': 'lines', 'data': [['a']]},
+        {'page': 1, 'bbox': [12, 102, 198, 290], 'strategy': 'camelot_lattice', 'data': [['a']]},
+        {'page': 1, 'bbox': [10, 20, 200, 60], 'strategy': 'lines', 'data': [['b']]},
+        {'page': 2, 'bbox': [10, 100, 200, 300], 'strategy': 'lines', 'data': [['c']]},
+    ])
+
+    assert [(t['page'], t['index'], t['data']) for t in tables] == [(1, 0, [['b']]), (1, 1, [['a']]), (2, 0, [['c']])]
@@ -0,0 +1,52 @@
+"""
+Tests for the per-page multi-parser text merge.
+"""
+
+from parser import ExtractedText, PDFOutlineParser
+from text_merge import merge_page, merge_pages
+
+
+def _text(source, text, page=1):
+    return ExtractedText(text=text, source=source, page_num=page)
+
+
+def test_merge_keeps_base_and_adds_only_missing_lines():
+    base = "Quarterly results improved across all regions.\nR0C0\nR0C1\nR1C0\nR1C1"
+    texts = [
+        _text('pymupdf', base),
+        _text('pdfminer', base),
+        # Same table cells read row by row: nothing new
+        _text('pdfplumber_detailed', "R0C0 R0C1"),
+        _text('pdfplumber_detailed', "R1C0 R1C1"),
+        _text('pdfplumber_detailed', "Footnote text that only pdfplumber recovered."),
+    ]
+    merged = merge_page(1, texts)
+
+    assert merged.base_source == 'pymupdf'
+    assert merged.text == base + "\nFootnote text that only pdfplumber recovered."
+    assert merged.added_lines == {'pdfplumber_detailed': 1}
+    assert merged.sources == ['pdfminer', 'pdfplumber_detailed', 'pymupdf']
+    assert merged.agreement == 1.0
+
+
+def test_merge_pages_keeps_real_page_boundaries():
+    texts = [
+        _text('pymupdf', "First paragraph.\n\nSecond paragraph.", page=1),
+        _text('pymupdf', "Third page text.", page=3),
+    ]
+    merged = merge_pages(texts, [1, 2, 3])
+
+    assert [m.page for m in merged] == [1, 2, 3]
+    assert merged[0].text == "First paragraph.\n\nSecond paragraph."
+    assert merged[1].text == "" and merged[1].base_source is None
+    assert merged[2].provenance()['base_source'] == 'pymupdf'
+
+
+def test_outline_raw_text_is_keyed_by_page(sample_pdf):
+    result = PDFOutlineParser(enable_ocr=False).extract_outline(sample_pdf)
+
+    assert [p['page'] for p in result['raw_text']] == [1, 2, 3]
+    assert [p['page'] for p in result['text_provenance']] == [1, 2, 3]
+    for page in result['raw_text']:
+        assert f"on page {page['page']} " in page['text']
+        assert "Page Break" not in page['text']
@@ -0,0 +1,45 @@
+"""
+Tests for per-page text quality metrics and adaptive parser escalation.
+"""
+
+from parser import PDFOutlineParser
+from text_quality import assess_page_text, document_quality_score
+
+LETTER_AREA = 612 * 792
+
+
+def test_clean_page_passes():
+    quality = assess_page_text(1, "Clean body text. " * 60, LETTER_AREA)
+    assert quality.passed
+    assert quality.garbage_ratio == 0.0
+    assert quality.score == 1.0
+
+
+def test_empty_and_garbage_pages_fail():
+    assert not assess_page_text(1, "  \n ", LETTER_AREA).passed
+    garbled = assess_page_text(2, "(cid:12)(cid:40)�� text " * 20, LETTER_AREA)
+    assert garbled.garbage_ratio > 0.5
+    assert not garbled.passed
+
+
+def test_document_score_is_mean_of_pages():
+    pages = [assess_page_text(1, "word " * 200, LETTER_AREA), assess_page_text(2, "", LETTER_AREA)]
+    assert document_quality_score(pages) == 0.5
+    assert document_quality_score([]) == 0.0
+
+
+def test_adaptive_mode_escalates_only_failing_pages(sample_pdf):
+    import fitz
+
+    doc = fitz.open(str(sample_pdf))
+    doc.new_page()
+    doc.saveIncr()
+    doc.close()
+
+    full = PDFOutlineParser(enable_ocr=False).extract_outline(sample_pdf)
+    adaptive = PDFOutlineParser(enable_ocr=False, adaptive=True).extract_outline(sample_pdf)
+
+    assert adaptive['statistics']['escalated_pages'] == [4]
+    assert {t.page_num for t in adaptive['parser_results']['pdfminer'].texts} <= {4}
+    assert adaptive['outline'] == full['outline']
+    assert adaptive['title'] == full['title']
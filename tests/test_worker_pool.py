@@ -0,0 +1,30 @@
+"""
+Tests for preloaded worker pools: workers must start with the parser modules
+already imported, under each available start method.
+"""
+
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+import worker_pool
+from worker_pool import make_pool
+
+
+def _already_imported(name):
+    return name in sys.modules, os.environ.get('WORKER_POOL_PRELOAD')
+
+
+@pytest.mark.parametrize("method", [m for m in ('fork', 'forkserver') if m in multiprocessing.get_all_start_methods()])
+def test_workers_inherit_preloaded_modules(method):
+    with make_pool(2, method=method) as pool:
+        results = pool.map(_already_imported, ['pipeline', 'fitz'])
+    assert results == [(True, None), (True, None)]
+    assert 'WORKER_POOL_PRELOAD' not in os.environ
+
+
+def test_unavailable_method_falls_back_to_the_default(monkeypatch):
+    monkeypatch.setattr(multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+    assert worker_pool.start_method('forkserver') == multiprocessing.get_start_method()
@@ -0,0 +1,195 @@
+"""
+text_merge.py
+-------------
+Page-accurate merge of the text produced by several parsers.
+
+Every parser reports text per page, either as the whole page (``pdfplumber``,
+``pymupdf``, ``pdfminer``, ``ocr``) or line by line (``*_detailed``). For each
+page the outputs are grouped into one candidate per source and tokenised
+once. Then:
+
+1. the base text is the whole-page candidate whose words are best confirmed
+   by the other sources (weighted by source reliability);
+2. lines from the remaining candidates are appended only when they bring
+   new words and most of their word shingles (hashed 3-word windows) are
+   missing from what has been merged so far.
+
+All comparisons are set lookups on the precomputed tokens and hashes (shingles
+are only computed for lines with new words), so a page merges in time linear
+in its text. Each merged page records which source supplied
+the base, how many lines other sources added and how far the sources agree.
+"""
+
+import re
+import textwrap
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Words per shingle
+SHINGLE_SIZE = 3
+# A line is added when more than this fraction of its shingles is new
+NOVEL_LINE_RATIO = 0.5
+
+# Relative trust in each source when choosing the base text
+SOURCE_RELIABILITY = {
+    'pdfplumber_detailed': 1.0,
+    'pymupdf_detailed': 0.95,
+    'pdfplumber': 0.9,
+    'pymupdf': 0.85,
+    'pdfminer': 0.8,
+    'ocr': 0.5,
+}
+DEFAULT_RELIABILITY = 0.5
+
+# Line-level sources lose block reading order, so they only contribute lines
+LINE_SOURCE_SUFFIX = '_detailed'
+
+_TOKEN_RE = re.compile(r'\w+')
+_BLANK_RUN_RE = re.compile(r'\n{3,}')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of ``text``."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def shingle_hashes(tokens: List[str], size: int = SHINGLE_SIZE) -> Set[int]:
+    """Hashes of the ``size``-word shingles of ``tokens`` (one shingle if shorter)."""
+    if len(tokens) <= size:
+        return {hash(tuple(tokens))} if tokens else set()
+    return {hash(tuple(tokens[i:i + size])) for i in range(len(tokens) - size + 1)}
+
+
+def source_reliability(source: str) -> float:
+    return SOURCE_RELIABILITY.get(source, DEFAULT_RELIABILITY)
+
+
+class PageCandidate:
+    """One source's text for a page, tokenised once."""
+
+    def __init__(self, source: str, text: str):
+        self.source = source
+        self.text = text
+        self.lines: List[str] = []
+        self.line_tokens: List[List[str]] = []
+        self.tokens: Set[str] = set()
+        for line in text.splitlines():
+            tokens = tokenize(line)
+            if not tokens:
+                continue
+            self.lines.append(line.rstrip())
+            self.line_tokens.append(tokens)
+            self.tokens.update(tokens)
+        self._shingles: Optional[Set[int]] = None
+
+    @property
+    def shingles(self) -> Set[int]:
+        if self._shingles is None:
+            self._shingles = set()
+            for tokens in self.line_tokens:
+                self._shingles |= shingle_hashes(tokens)
+        return self._shingles
+
+    @property
+    def is_line_source(self) -> bool:
+        return self.source.endswith(LINE_SOURCE_SUFFIX)
+
+
+@dataclass
+class MergedPage:
+    """Merged text of one page with its provenance."""
+    page: int
+    text: str
+    base_source: Optional[str] = None
+    sources: List[str] = field(default_factory=list)
+    added_lines: Dict[str, int] = field(default_factory=dict)
+    # Fraction of the base words that at least one other source also produced
+    agreement: float = 0.0
+
+    def provenance(self) -> Dict[str, Any]:
+        return {
+            'page': self.page,
+            'base_source': self.base_source,
+            'sources': self.sources,
+            'added_lines': self.added_lines,
+            'agreement': round(self.agreement, 3),
+        }
+
+
+def page_candidates(texts: Iterable[Any]) -> List[PageCandidate]:
+    """
+    One candidate per source from a page's extracted texts.
+
+    ``texts`` are `ExtractedText`-like objects (``source`` and ``text``); the
+    entries of a line-level source are joined in their extraction order.
+    """
+    by_source: Dict[str, List[str]] = defaultdict(list)
+    for text in texts:
+        by_source[text.source].append(text.text)
+    candidates = [PageCandidate(source, '\n'.join(parts)) for source, parts in by_source.items()]
+    return [c for c in candidates if c.lines]
+
+
+def merge_page(page_num: int, texts: Iterable[Any]) -> MergedPage:
+    """Merge every source's text for one page."""
+    candidates = page_candidates(texts)
+    if not candidates:
+        return MergedPage(page=page_num, text='')
+
+    # How many sources produced each word
+    support = Counter(t for c in candidates for t in c.tokens)
+
+    def score(candidate: PageCandidate) -> float:
+        return sum(support[t] for t in candidate.tokens) * source_reliability(candidate.source)
+
+    ranked = sorted(candidates, key=score, reverse=True)
+    whole_page = [c for c in ranked if not c.is_line_source]
+    base = whole_page[0] if whole_page else ranked[0]
+
+    merged_lines = [line.rstrip() for line in base.text.splitlines()]
+    merged_tokens = set(base.tokens)
+    merged_shingles: Optional[Set[int]] = None
+    added_lines: Dict[str, int] = {}
+    for candidate in ranked:
+        if candidate is base or merged_tokens.issuperset(candidate.tokens):
+            continue
+        added = 0
+        for line, tokens in zip(candidate.lines, candidate.line_tokens):
+            # Words already merged in another layout (table cells read row by
+            # row instead of cell by cell) are not new content
+            if merged_tokens.issuperset(tokens):
+                continue
+            shingles = shingle_hashes(tokens)
+            if len(tokens) >= SHINGLE_SIZE:
+                if merged_shingles is None:
+                    merged_shingles = set(base.shingles)
+                if len(shingles - merged_shingles) <= NOVEL_LINE_RATIO * len(shingles):
+                    continue
+            merged_lines.append(line)
+            merged_tokens.update(tokens)
+            if merged_shingles is not None:
+                merged_shingles |= shingles
+            added += 1
+        if added:
+            added_lines[candidate.source] = added
+
+    confirmed = sum(1 for t in base.tokens if support[t] > 1)
+    agreement = confirmed / len(base.tokens) if len(candidates) > 1 else 1.0
+    return MergedPage(
+        page=page_num,
+        # Layout-preserving sources pad every line with the page margin
+        text=textwrap.dedent(_BLANK_RUN_RE.sub('\n\n', '\n'.join(merged_lines))).strip('\n'),
+        base_source=base.source,
+        sources=sorted(c.source for c in candidates),
+        added_lines=added_lines,
+        agreement=agreement,
+    )
+
+
+def merge_pages(texts: Iterable[Any], page_numbers: Iterable[int]) -> List[MergedPage]:
+    """Merged text for every page in ``page_numbers`` (empty pages included)."""
+    by_page: Dict[int, List[Any]] = defaultdict(list)
+    for text in texts:
+        by_page[text.page_num].append(text)
+    return [merge_page(page_num, by_page.get(page_num, ())) for page_num in page_numbers]
@@ -0,0 +1,82 @@
+"""
+text_quality.py
+---------------
+Per-page text-layer quality metrics.
+
+Used by `PDFOutlineParser` to decide which pages need the slower parsers
+(pdfplumber, pdfminer, OCR) in adaptive mode, and to report the overall
+extraction quality score. A page is judged on:
+
+- character density: non-whitespace characters per 1000 pt² of page area
+- glyph garbage ratio: share of characters that are undecodable glyphs
+  (U+FFFD, private-use code points, control characters, pdfminer "(cid:N)")
+- emptiness: no text at all
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, List
+
+
+# Undecodable glyph markers emitted by the different text extractors
+_GARBAGE_RE = re.compile(r'\(cid:\d+\)|[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0e-\x1f]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Below this density a page is treated as having no usable text layer
+# (~10 characters on a Letter/A4 page)
+MIN_CHAR_DENSITY = 0.02
+# Above this share of garbage glyphs the text layer is considered broken
+MAX_GARBAGE_RATIO = 0.1
+# Density of a normal full page of body text; scores saturate here
+FULL_PAGE_DENSITY = 1.0
+
+
+@dataclass
+class PageQuality:
+    """Quality metrics for the text extracted from one page."""
+    page: int
+    char_count: int
+    char_density: float
+    garbage_ratio: float
+
+    @property
+    def is_empty(self) -> bool:
+        return self.char_count == 0
+
+    @property
+    def passed(self) -> bool:
+        """True if the text layer is good enough to skip escalation."""
+        return (not self.is_empty
+                and self.char_density >= MIN_CHAR_DENSITY
+                and self.garbage_ratio <= MAX_GARBAGE_RATIO)
+
+    @property
+    def score(self) -> float:
+        """Quality in [0, 1]: clean text scores at least 0.5, full clean pages 1.0."""
+        if self.is_empty:
+            return 0.0
+        fill = min(1.0, self.char_density / FULL_PAGE_DENSITY)
+        return round((1.0 - self.garbage_ratio) * (0.5 + 0.5 * fill), 4)
+
+
+def assess_page_text(page: int, text: str, page_area: float) -> PageQuality:
+    """Compute quality metrics for ``text`` extracted from a page of ``page_area`` pt²."""
+    text = text or ""
+    compact = _WHITESPACE_RE.sub('', text)
+    char_count = len(compact)
+    garbage = sum(len(m) for m in _GARBAGE_RE.findall(compact))
+    area_units = max(page_area, 1.0) / 1000.0
+    return PageQuality(
+        page=page,
+        char_count=char_count,
+        char_density=char_count / area_units,
+        garbage_ratio=min(1.0, garbage / char_count) if char_count else 0.0,
+    )
+
+
+def document_quality_score(pages: Iterable[PageQuality]) -> float:
+    """Mean page score; 0.0 for a document without pages."""
+    scores: List[float] = [p.score for p in pages]
+    if not scores:
+        return 0.0
+    return round(sum(scores) / len(scores), 4)
@@ -10,13 +10,14 @@ import logging
 import tempfile
 from pathlib import Path
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, Response, request, jsonify, render_template, send_file
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 
 # Import our existing PDF processing modules
 from parser import PDFOutlineParser
 from pipeline import DocumentPipeline
+from result_cache import ResultCache
 from app.embedder import embed
 from app.ranker import rank_sections
 from app.outline_to_refined_processor import OutlineToRefinedProcessor
@@ -34,6 +35,12 @@ app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 UPLOAD_FOLDER = 'uploads'
 RESULTS_FOLDER = 'results'
 ALLOWED_EXTENSIONS = {'pdf'}
+# Interactive uploads run the parsers of a document concurrently to cut latency
+PARSER_EXECUTION_MODE = os.environ.get('PARSER_EXECUTION_MODE', 'process')
+# Seconds before a hung parser is given up (and its worker process killed)
+PARSER_TIMEOUT = float(os.environ.get('PARSER_TIMEOUT', '120')) or None
+# Re-uploads of the same PDF are served from the on-disk result cache
+RESULT_CACHE = ResultCache()
 
 # Ensure directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -43,22 +50,24 @@ def allowed_file(filename):
     """Check if file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def process_pdf_basic(pdf_path):
+def process_pdf_basic(pdf_path, use_cache=True):
     """Process PDF using basic pipeline (Round-1A)."""
     try:
-        pipeline = DocumentPipeline()
-        result = pipeline.process(Path(pdf_path))
+        pipeline = DocumentPipeline(execution_mode=PARSER_EXECUTION_MODE, cache=RESULT_CACHE,
+                                    parser_timeout=PARSER_TIMEOUT)
+        result = pipeline.process(Path(pdf_path), use_cache=use_cache)
         return result, None
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}")
         return None, str(e)
 
-def process_pdf_advanced(pdf_path, persona="General User", task="Extract key information"):
+def process_pdf_advanced(pdf_path, persona="General User", task="Extract key information", use_cache=True):
     """Process PDF with AI-powered analysis (Round-1B style)."""
     try:
         # First get basic outline
-        parser = PDFOutlineParser()
-        outline_data = parser.extract_outline(Path(pdf_path))
+        parser = PDFOutlineParser(execution_mode=PARSER_EXECUTION_MODE, cache=RESULT_CACHE,
+                                  parser_timeout=PARSER_TIMEOUT)
+        outline_data = parser.extract_outline(Path(pdf_path), use_cache=use_cache)
         
         # Create task vector for ranking
         task_vector = embed(f"{persona} {task}")
@@ -123,12 +132,13 @@ def upload_file():
         processing_type = request.form.get('processing_type', 'basic')
         persona = request.form.get('persona', 'General User')
         task = request.form.get('task', 'Extract key information')
+        use_cache = request.form.get('no_cache', '0') != '1'
         
         # Process the PDF
         if processing_type == 'advanced':
-            result, error = process_pdf_advanced(file_path, persona, task)
+            result, error = process_pdf_advanced(file_path, persona, task, use_cache=use_cache)
         else:
-            result, error = process_pdf_basic(file_path)
+            result, error = process_pdf_basic(file_path, use_cache=use_cache)
         
         if error:
             return jsonify({'error': error}), 500
@@ -153,6 +163,38 @@ def upload_file():
         logger.error(f"Upload error: {str(e)}")
         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
 
+@app.route('/api/upload/stream', methods=['POST'])
+def upload_file_stream():
+    """Handle file upload and stream page records back as NDJSON while processing."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Only PDF files are allowed'}), 400
+    
+    filename = secure_filename(file.filename)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    file_path = os.path.join(UPLOAD_FOLDER, f"{timestamp}_{filename}")
+    file.save(file_path)
+    
+    def generate():
+        try:
+            pipeline = DocumentPipeline(execution_mode=PARSER_EXECUTION_MODE, cache=RESULT_CACHE,
+                                        parser_timeout=PARSER_TIMEOUT)
+            for event in pipeline.iter_process(Path(file_path)):
+                yield json.dumps(event, ensure_ascii=False) + '\n'
+        except Exception as e:
+            logger.error(f"Streaming error: {str(e)}")
+            yield json.dumps({'type': 'error', 'error': f'Processing failed: {str(e)}'}) + '\n'
+        finally:
+            os.remove(file_path)
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
 @app.route('/api/download/<filename>')
 def download_result(filename):
     """Download result file."""
@@ -174,6 +216,11 @@ def health_check():
         'version': '1.0.0'
     })
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Result cache statistics."""
+    return jsonify(RESULT_CACHE.stats().to_dict())
+
 @app.route('/api/challenge1b')
 def process_challenge1b():
     """Process Challenge 1B collections (using pre-processed results for speed)."""
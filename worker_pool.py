@@ -0,0 +1,126 @@
+"""
+worker_pool.py
+--------------
+Process pools whose workers start with the heavy modules already imported
+(and, for embedding work, the MiniLM weights already loaded).
+
+Without this, each worker imports fitz / pdfplumber / pdfminer / camelot
+(and torch + the model for embedding work) on its own. On short batches that
+start-up rivals the actual processing time, and every worker holds a private
+copy. `make_pool` loads everything once and lets the workers inherit it
+copy-on-write:
+
+- ``forkserver`` (default where available): the fork server imports
+  `PRELOAD_MODULES` (and loads the model) once; every worker is forked from
+  that clean, single-threaded process, so no thread pools or locks of the
+  parent are inherited.
+- ``fork``: the parent preloads, then forks its workers directly.
+- ``spawn``: no sharing possible; workers import on their own.
+
+With a local embedding service running (`app/embedding_service.py`) the model
+is not preloaded at all: workers send their texts to the service.
+
+`python scripts/benchmark_workers.py` measures per-worker start-up time and memory
+for each strategy.
+
+Configuration (environment):
+    POOL_START_METHOD=forkserver   forkserver | fork | spawn
+    POOL_PRELOAD=1                 0 = workers import modules themselves
+"""
+
+import importlib
+import logging
+import multiprocessing
+import os
+from multiprocessing import forkserver
+from multiprocessing.context import BaseContext
+from multiprocessing.pool import Pool
+from typing import Any, Callable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+POOL_START_METHOD = os.environ.get('POOL_START_METHOD', 'forkserver')
+POOL_PRELOAD = os.environ.get('POOL_PRELOAD', '1') != '0'
+
+# Imported once by the fork server (or the parent) for every worker
+PRELOAD_MODULES = (
+    'numpy', 'fitz', 'pdfplumber', 'pdfminer.high_level', 'PIL.Image',
+    'document_context', 'parser', 'pipeline', 'table_extractor', 'ocr_utils', 'output_writer',
+)
+
+# Tells the fork server, which imports this module, what to preload
+_PRELOAD_ENV = 'WORKER_POOL_PRELOAD'
+
+
+def preload(model: bool = False) -> None:
+    """Import `PRELOAD_MODULES` (skipping missing optional ones) and optionally load the embedder."""
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            # Optional dependency missing (or broken): the workers import it lazily
+            logger.debug(f"Not preloading {name}: {e}")
+    if model:
+        try:
+            from app import embedding_service
+            if embedding_service.configured_address():
+                # Workers embed through the shared service; no private copy
+                return
+            from app.embedder import _get_model
+            _get_model()
+        except Exception as e:
+            # The fork server must survive a missing model; workers load lazily then
+            logger.warning(f"Could not preload the embedding model: {e}")
+
+
+def start_method(method: Optional[str] = None) -> str:
+    """Requested start method, or the platform default if it is unavailable."""
+    method = method or POOL_START_METHOD
+    if method not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_start_method()
+    return method
+
+
+def pool_context(preload_model: bool = False, method: Optional[str] = None) -> BaseContext:
+    """
+    Multiprocessing context whose new processes start with `PRELOAD_MODULES` loaded.
+
+    For ``forkserver`` the fork server is started here, with the preload
+    request, so it does not matter which pool (or `ProcessPoolExecutor`)
+    launches the first worker.
+    """
+    method = start_method(method)
+    context = multiprocessing.get_context(method)
+    if not POOL_PRELOAD or method == 'spawn':
+        return context
+    if method == 'fork':
+        preload(model=preload_model)
+        return context
+
+    # The fork server imports this module at start-up and preloads what the
+    # marker asks for (a server that is already running keeps its modules)
+    context.set_forkserver_preload([__name__])
+    os.environ[_PRELOAD_ENV] = 'model' if preload_model else 'modules'
+    try:
+        forkserver.ensure_running()
+    finally:
+        os.environ.pop(_PRELOAD_ENV, None)
+    return context
+
+
+def make_pool(processes: int, initializer: Optional[Callable[..., Any]] = None, initargs: Sequence[Any] = (),
+              preload_model: bool = False, method: Optional[str] = None) -> Pool:
+    """
+    ``multiprocessing.Pool`` whose workers inherit preloaded modules (and model).
+
+    ``preload_model`` is for pools whose tasks embed text; parse-only pools
+    should not pay for loading the model.
+    """
+    context = pool_context(preload_model=preload_model, method=method)
+    return context.Pool(processes=processes, initializer=initializer, initargs=tuple(initargs))
+
+
+if os.environ.get(_PRELOAD_ENV):
+    # Imported by the fork server: preload once, and keep the marker from
+    # the workers' environment
+    preload(model=os.environ.pop(_PRELOAD_ENV) == 'model')